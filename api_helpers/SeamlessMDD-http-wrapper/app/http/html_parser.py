@@ -1,9 +1,80 @@
+import bisect
+
 import AdvancedHTMLParser
+from AdvancedHTMLParser.xpath import XPathExpression
+
+
+class _ChildIndex:
+    """
+    Positions of a node's children bucketed by (nodeName, _id) and by (nodeName, text),
+    so merge_nodes finds the first child matching either key without scanning every
+    sibling.
+    """
+
+    def __init__(self, children):
+        self._by_id = {}
+        self._by_text = {}
+        self._keys = []
+        for child in children:
+            self.add(child)
+
+    @classmethod
+    def _id_key(cls, node):
+        if "_id" in node.attributes:
+            return node.nodeName, node.attributes["_id"]
+        return None
+
+    def add(self, child):
+        self._keys.append(None)
+        self._insert(len(self._keys) - 1, child)
+
+    def update(self, position, child):
+        """Re-buckets the child at position after a merge changed its _id or text."""
+        id_key, text_key = self._keys[position]
+        if (self._id_key(child), (child.nodeName, child.innerText)) == (
+            id_key,
+            text_key,
+        ):
+            return
+        if id_key is not None:
+            self._by_id[id_key].remove(position)
+        self._by_text[text_key].remove(position)
+        self._insert(position, child)
+
+    def _insert(self, position, child):
+        id_key = self._id_key(child)
+        text_key = child.nodeName, child.innerText
+        if id_key is not None:
+            bisect.insort(self._by_id.setdefault(id_key, []), position)
+        bisect.insort(self._by_text.setdefault(text_key, []), position)
+        self._keys[position] = id_key, text_key
+
+    def find(self, node):
+        """Position of the first child with node's name and either its _id or its text."""
+        candidates = []
+        id_key = self._id_key(node)
+        if id_key is not None and self._by_id.get(id_key):
+            candidates.append(self._by_id[id_key][0])
+        positions = self._by_text.get((node.nodeName, node.innerText))
+        if positions:
+            candidates.append(positions[0])
+        return min(candidates) if candidates else None
 
 
 class MyHTMLParser:
     def __init__(self, file_path=None):
         self.parser = AdvancedHTMLParser.AdvancedHTMLParser(file_path, encoding="utf-8")
+        # Memoized node paths keyed by AdvancedTag.uid, valid for _xpath_root only.
+        self._xpath_root = None
+        self._element_xpaths = {}
+        self._xpath_prefixes = {}
+        self._xpath_parts = {}
+        # Elements selected by each resolved path prefix, dropped on every mutation.
+        self._resolved_paths = {}
+        self._modified = False
+        self._saved_root = self.parser.root
+        # Preview snapshot: state at begin_snapshot, serialized on the first mutation.
+        self._snapshot = None
 
     def get_element_by_id(self, id_):
         return self.parser.getElementById(str(id_))
@@ -37,10 +108,12 @@ class MyHTMLParser:
 
     def replace_element_by_id(self, id_, new_element):
         element = self.get_element_by_id(id_)
+        self.invalidate_xpaths(element)
         self.update_node(element, new_element)
 
     def remove_element_by_id(self, id_):
         element = self.get_element_by_id(id_)
+        self.invalidate_xpaths(element)
         element.parentNode.removeNode(element)
 
     def get_elements_by_jinja_variable(self, variable_name):
@@ -68,24 +141,70 @@ class MyHTMLParser:
 
         return result_nodes
 
-    @classmethod
-    def get_element_xpath(cls, element):
-        xpath = element.nodeName
-        while element.parentNode is not None:
-            element = element.parentNode
-            xpath = element.nodeName + "/" + xpath
+    def _check_xpath_root(self):
+        # parseStr (also called from outside) swaps the whole tree.
+        if self.parser.root is not self._xpath_root:
+            self.clear_xpath_cache()
+            self._xpath_root = self.parser.root
+
+    def clear_xpath_cache(self):
+        self._element_xpaths.clear()
+        self._xpath_prefixes.clear()
+        self._xpath_parts.clear()
+        self._resolved_paths.clear()
+
+    def invalidate_xpaths(self, element, subtree=True):
+        """
+        Drops the memoized paths a mutation at element can change: the paths of its
+        subtree and the text predicates of its ancestors. Pass subtree=False when
+        children were only added to element. Resolved path prefixes are always
+        dropped. Every mutating method calls this, so it also marks the document
+        modified.
+        """
+        self._copy_on_write()
+        self._modified = True
+        self._resolved_paths.clear()
+        nodes = [element]
+        if subtree:
+            nodes.extend(element.getAllChildNodes())
+        for node in nodes:
+            self._element_xpaths.pop(node.uid, None)
+            self._xpath_prefixes.pop(node.uid, None)
+            self._xpath_parts.pop(node.uid, None)
+
+        ancestor = element.parentNode
+        while ancestor is not None:
+            self._xpath_parts.pop(ancestor.uid, None)
+            ancestor = ancestor.parentNode
+
+    def get_element_xpath(self, element):
+        self._check_xpath_root()
+        return self._get_element_xpath(element)
+
+    def _get_element_xpath(self, element):
+        xpath = self._element_xpaths.get(element.uid)
+        if xpath is None:
+            if element.parentNode is None:
+                xpath = "/" + element.nodeName
+            else:
+                xpath = (
+                    self._get_element_xpath(element.parentNode) + "/" + element.nodeName
+                )
+            self._element_xpaths[element.uid] = xpath
 
-        return "/" + xpath
+        return xpath
 
     def update_element_by_id(self, id_, attribute_name, new_value, important_data=None):
         elements = self.get_element_by_id(str(id_))
         for element in elements:
+            self.invalidate_xpaths(element)
             element.attributes[attribute_name] = new_value
 
     def update_element(self, old_element, new_element_text, important_data=None):
         new_parser = MyHTMLParser()
         new_parser.parser.parseStr(new_element_text)
         # error handling
+        self.invalidate_xpaths(old_element)
         self.update_node(old_element, new_parser.parser.root, important_data)
 
     # def update_element_by_path(self, old_element_path, new_element_content, important_data=None):
@@ -124,26 +243,29 @@ class MyHTMLParser:
                 "Xpath " + new_element_path + "does not selects single node."
             )
         new_element = new_element[0]
+        self.invalidate_xpaths(old_element)
         self.update_node(old_element, new_element, important_data)
 
     def merge_nodes(self, first_subtree, second_subtree, important_data=None):
+        self.invalidate_xpaths(first_subtree)
+        self._merge_nodes(first_subtree, second_subtree, important_data)
+
+    def _merge_nodes(self, first_subtree, second_subtree, important_data=None):
         self.update_node(first_subtree, second_subtree, important_data)
         if len(first_subtree.children) == 0:
             for second_child in second_subtree.children:
                 first_subtree.appendChild(second_child)
         else:
+            first_children = _ChildIndex(first_subtree.children)
             for second_child in second_subtree.children:
-                for first_child in first_subtree.children:
-                    if second_child.nodeName == first_child.nodeName:
-                        if (
-                            "_id" in second_child.attributes
-                            and second_child.attributes["_id"]
-                            == first_child.attributes["_id"]
-                        ) or second_child.innerText == first_child.innerText:
-                            self.merge_nodes(first_child, second_child, important_data)
-                            break
-                else:
+                position = first_children.find(second_child)
+                if position is None:
                     first_subtree.appendChild(second_child)
+                    first_children.add(second_child)
+                else:
+                    first_child = first_subtree.children[position]
+                    self._merge_nodes(first_child, second_child, important_data)
+                    first_children.update(position, first_child)
 
     @classmethod
     def update_node(cls, first_node, second_node, important_data=None):
@@ -170,29 +292,41 @@ class MyHTMLParser:
         return False
 
     def get_xpath_for_element(self, element):
-
-        path = element.nodeName
-        text = " ".join(element.innerText.split())
-        if text:
-            path += "[ text() = '" + element.innerText + "' ]"
-
-        if "_id" in element.attributes:
-            path += "[ @_id = '" + element.attributes["_id"] + "' ]"
-
-        current_element = element
-        while current_element.parentElement is not None:
-            current_element = current_element.parentElement
-            relative_element_path = current_element.nodeName
-            if "_id" in current_element.attributes and not self.is_jinja_variable(
-                current_element.attributes["_id"]
+        self._check_xpath_root()
+
+        path = self._xpath_parts.get(element.uid)
+        if path is None:
+            path = element.nodeName
+            text = " ".join(element.innerText.split())
+            if text:
+                path += "[ text() = '" + element.innerText + "' ]"
+
+            if "_id" in element.attributes:
+                path += "[ @_id = '" + element.attributes["_id"] + "' ]"
+            self._xpath_parts[element.uid] = path
+
+        return self._get_xpath_prefix(element.parentElement) + "/" + path
+
+    def _get_xpath_prefix(self, element):
+        if element is None:
+            return ""
+
+        prefix = self._xpath_prefixes.get(element.uid)
+        if prefix is None:
+            relative_element_path = element.nodeName
+            if "_id" in element.attributes and not self.is_jinja_variable(
+                element.attributes["_id"]
             ):
-                relative_element_path += (
-                    "[ @_id = " + current_element.attributes["_id"] + " ]"
-                )
+                relative_element_path += "[ @_id = " + element.attributes["_id"] + " ]"
 
-            path = relative_element_path + "/" + path
+            prefix = (
+                self._get_xpath_prefix(element.parentElement)
+                + "/"
+                + relative_element_path
+            )
+            self._xpath_prefixes[element.uid] = prefix
 
-        return "/" + path
+        return prefix
 
     def get_template_html_from_xpath(self, element, template_path):
 
@@ -219,6 +353,7 @@ class MyHTMLParser:
     def delete_elements_by_path(self, path):
         elements = self.parser.getElementsByXPath(path)
         for element in elements:
+            self.invalidate_xpaths(element)
             element.remove()
 
     def wrap_element(self, element, wrapper_tag, classes=None):
@@ -228,12 +363,16 @@ class MyHTMLParser:
         for class_ in classes:
             new_node.addClass(class_)
 
-        element.parentNode.insertBefore(new_node, element)
-        element.parentNode.removeChild(element)
+        self.invalidate_xpaths(element)
+        parent = element.parentNode
+        parent.insertBefore(new_node, element)
+        # AdvancedTag.insertBefore and insertAfter leave parentNode unset.
+        new_node.parentNode = parent
+        parent.removeChild(element)
         new_node.appendChild(element)
 
     def replace_content(self, path, new_content):
-        elements = self.parser.getElementsByXPath(path)
+        elements = self.resolve_elements(path)
 
         new_parser = MyHTMLParser()
         new_parser.parser.parseStr(new_content)
@@ -249,38 +388,123 @@ class MyHTMLParser:
         else:
             old_node = elements[0]
             parent = old_node.parentNode
+            self.invalidate_xpaths(old_node)
             parent.insertAfter(new_node, old_node)
+            new_node.parentNode = parent
             parent.removeNode(old_node)
 
-    def find_adequate_node_for_insert(
-        self, path, missing_nodes=None, last_tag=None, latest_tag=None
-    ):
+    @classmethod
+    def split_xpath(cls, xpath):
+        """
+        Splits an absolute slash path into its steps, ignoring slashes inside
+        predicates. Returns None for anything else (relative paths, // or axes).
+        """
+        if not xpath.startswith("/"):
+            return None
 
-        elements = self.parser.getElementsByXPath(path)
-        if len(elements) == 0:
-            last_part_start = path.rindex("/") + 1
-            try:
-                last_part_tag_end = path.rindex("[")
-            except:
-                last_part_tag_end = len(path)
-
-            latest_tag_name = path[last_part_start:last_part_tag_end]
-            latest_tag = AdvancedHTMLParser.AdvancedTag(latest_tag_name)
-            if last_tag is None:
-                last_tag = latest_tag
-            else:
-                if missing_nodes is None:
-                    missing_nodes = latest_tag
+        steps = []
+        start = 1
+        depth = 0
+        quote = None
+        for index in range(1, len(xpath)):
+            char = xpath[index]
+            if quote is not None:
+                if char == quote:
+                    quote = None
+            elif char in "'\"":
+                quote = char
+            elif char == "[":
+                depth += 1
+            elif char == "]":
+                depth -= 1
+            elif char == "/" and depth == 0:
+                steps.append(xpath[start:index])
+                start = index + 1
+        steps.append(xpath[start:])
+
+        for step in steps:
+            name = cls.get_step_tag_name(step)
+            if not name or name.startswith(".") or name.startswith("@") or "::" in name:
+                return None
+        return steps
+
+    @classmethod
+    def get_step_tag_name(cls, step):
+        try:
+            return step[: step.index("[")].strip()
+        except ValueError:
+            return step.strip()
+
+    def resolve_path(self, path):
+        """
+        Finds the longest prefix of an absolute slash path that selects something,
+        in one descent that evaluates each step only against the elements selected
+        by the step before it. Prefixes resolved since the last mutation are reused.
+
+        :return: (steps, depth, elements) - steps of the path, number of leading
+                 steps that matched and the elements they select
+        """
+        self._check_xpath_root()
+        steps = self.split_xpath(path)
+        if steps is None:
+            elements = self._resolved_paths.get(path)
+            if elements is None:
+                elements = list(self.parser.getElementsByXPath(path))
+                self._resolved_paths[path] = elements
+            return [path], 1 if elements else 0, elements
+
+        depth = 0
+        elements = []
+        prefix = ""
+        for step in steps:
+            prefix += "/" + step
+            found = self._resolved_paths.get(prefix)
+            if found is None:
+                if depth:
+                    found = list(XPathExpression("/child::" + step).evaluate(elements))
                 else:
-                    latest_tag.appendChild(missing_nodes)
-            path = path[0 : last_part_start - 1]
-            return self.find_adequate_node_for_insert(
-                path, missing_nodes, last_tag, latest_tag
+                    found = list(XPathExpression("/" + step).evaluate(self.parser))
+                self._resolved_paths[prefix] = found
+            if not found:
+                break
+            depth += 1
+            elements = found
+
+        return steps, depth, elements
+
+    def resolve_elements(self, path):
+        steps, depth, elements = self.resolve_path(path)
+        if depth < len(steps):
+            return []
+        return list(elements)
+
+    def find_adequate_node_for_insert(self, path):
+        """
+        Finds the deepest existing element on path and builds the tags missing below it.
+
+        :return: (last_tag, parent, missing_nodes, latest_tag) - tag for the last
+                 step of path, deepest existing element, root and deepest tag of the
+                 chain of missing intermediate tags (None when only the last step is
+                 missing)
+        """
+        steps, depth, elements = self.resolve_path(path)
+        if depth == 0:
+            raise Exception(
+                "Xpath " + path + " does not match any part of the document."
             )
-        else:
-            if last_tag != latest_tag:
-                return last_tag, elements[-1], missing_nodes, latest_tag
-            return last_tag, elements[-1], missing_nodes, None
+
+        last_tag = AdvancedHTMLParser.AdvancedTag(self.get_step_tag_name(steps[-1]))
+        missing_nodes = None
+        latest_tag = None
+        for step in steps[depth:-1]:
+            tag = AdvancedHTMLParser.AdvancedTag(self.get_step_tag_name(step))
+            if missing_nodes is None:
+                missing_nodes = tag
+            else:
+                latest_tag.appendChild(tag)
+            latest_tag = tag
+
+        return last_tag, elements[-1], missing_nodes, latest_tag
 
     def simplify_xpath(self, xpath):
         xpath_beginning = xpath
@@ -313,8 +537,7 @@ class MyHTMLParser:
         if node.innerText.strip() != "":
             xpath += "[text() = '" + node.innerText + "' ]"
         try:
-            elements = self.parser.getElementsByXPath(xpath)
-            return elements is not None and len(elements) != 0
+            return len(self.resolve_elements(xpath)) != 0
         except:
             return False
 
@@ -328,7 +551,7 @@ class MyHTMLParser:
         new_node = new_parser.parser.root
 
         path = self.simplify_xpath(path)
-        elements = self.parser.getElementsByXPath(path)
+        elements = self.resolve_elements(path)
 
         if len(elements) > 1:
             return
@@ -339,6 +562,7 @@ class MyHTMLParser:
             )
             if self.check_if_node_exists(path, new_node):
                 return
+            self.invalidate_xpaths(parent, subtree=False)
             if latest_node is None:
                 parent.appendChild(new_node)
             else:
@@ -357,10 +581,58 @@ class MyHTMLParser:
                 #         new_path = path + "/" + new_node.tagName + "[ text() = '" + new_node.innerText + "'"
                 #         if not self.check_if_node_exists(new_path, child):
 
+            self.invalidate_xpaths(parent, subtree=False)
             if after_node is None:
                 parent.appendChild(new_node)
             else:
                 parent.insertAfter(new_node, after_node)
+                new_node.parentNode = parent
+
+    def is_modified(self):
+        # parseStr (also called from outside) replaces the whole document.
+        return self._modified or self.parser.root is not self._saved_root
+
+    def mark_saved(self):
+        self._modified = False
+        self._saved_root = self.parser.root
+
+    def begin_snapshot(self):
+        """
+        Remembers the current document so restore_snapshot can bring it back. Nothing is
+        copied until the first mutation; a root replaced by parseStr leaves the old tree
+        untouched.
+        """
+        self._snapshot = {
+            "root": self.parser.root,
+            "doctype": self.parser.doctype,
+            "modified": self.is_modified(),
+            "html": None,
+        }
+
+    def _copy_on_write(self):
+        if (
+            self._snapshot is not None
+            and self._snapshot["html"] is None
+            and self.parser.root is self._snapshot["root"]
+        ):
+            self._snapshot["html"] = str(self)
+
+    def restore_snapshot(self):
+        """Returns False when there is no snapshot to restore."""
+        if self._snapshot is None:
+            return False
+
+        snapshot = self._snapshot
+        self._snapshot = None
+        if snapshot["html"] is not None:
+            self.parser.parseStr(snapshot["html"])
+        elif self.parser.root is not snapshot["root"]:
+            self.parser.root = snapshot["root"]
+            self.parser.doctype = snapshot["doctype"]
+
+        self._modified = snapshot["modified"]
+        self._saved_root = self.parser.root
+        return True
 
     def __str__(self):
         return self.parser.toHTML()
@@ -371,6 +643,7 @@ class MyHTMLParser:
         print(os.path.abspath(file_path))
         with open(file_path, "w") as file:
             file.write(str(self))
+        self.mark_saved()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,16 @@
+import os
+
+from app.http.html_parser import MyHTMLParser
+
+
+def get_elements_by_path(file_path, path):
+    """Evaluates path over a single document. Runs inside a worker process, so
+    the result holds only serialized elements."""
+    if not os.path.isfile(file_path):
+        return {"file_path": file_path, "error": "File not found"}
+
+    try:
+        elements = MyHTMLParser(file_path).get_elements_by_path(path)
+        return {"file_path": file_path, "elements": [str(el) for el in elements]}
+    except Exception as e:
+        return {"file_path": file_path, "error": str(e)}
@@ -1,17 +1,226 @@
-from flask import Flask, jsonify, request
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import wraps
+
+from flask import (
+    Flask,
+    Response,
+    g,
+    jsonify,
+    make_response,
+    request,
+    stream_with_context,
+)
 from lxml import etree
 from uuid import uuid4
 
 from app.http.lxml_parser import MyLXMLParser
+from app.http import multi_query
+from app import metrics, profiling
 
 
 app = Flask(__name__)
 
 TEST_FILE_PATH = "app/http/sample_files/F1.html"
 
+# Per-document version counters, bumped by every successful mutation so that
+# validators handed out before the mutation stop matching.
+document_versions = {}
+document_versions_lock = threading.Lock()
+
+app.config["PROFILE_REQUESTS"] = profiling.is_requested(
+    os.environ.get("PARSER_PROFILE")
+)
+profile_store = profiling.ProfileStore(directory=os.environ.get("PARSER_PROFILE_DIR"))
+
+# Worker pool for queries fanned out over many documents; created on first use.
+MULTI_QUERY_WORKERS = int(os.environ.get("MULTI_QUERY_WORKERS", "0")) or None
+process_pool = None
+
 
 def get_parser(file_path=None):
-    return MyLXMLParser(file_path if file_path else TEST_FILE_PATH)
+    with metrics.phase("parse"):
+        return MyLXMLParser(file_path if file_path else TEST_FILE_PATH)
+
+
+def serialize(element):
+    with metrics.phase("serialize"):
+        return etree.tostring(element, method="html").decode("utf-8")
+
+
+def serialize_all(elements):
+    with metrics.phase("serialize"):
+        return [
+            etree.tostring(element, method="html").decode("utf-8")
+            for element in elements
+        ]
+
+
+def get_process_pool():
+    global process_pool
+    if process_pool is None:
+        process_pool = ProcessPoolExecutor(max_workers=MULTI_QUERY_WORKERS)
+    return process_pool
+
+
+def get_document_key(file_path=None):
+    return os.path.abspath(file_path if file_path else TEST_FILE_PATH)
+
+
+def get_document_version(file_path=None):
+    key = get_document_key(file_path)
+    try:
+        stat = os.stat(key)
+        on_disk = "%d-%d" % (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        on_disk = "missing"
+    with document_versions_lock:
+        counter = document_versions.get(key, 0)
+    return "%s-%d" % (on_disk, counter)
+
+
+def bump_document_version(file_path=None):
+    key = get_document_key(file_path)
+    with document_versions_lock:
+        document_versions[key] = document_versions.get(key, 0) + 1
+
+
+def compute_etag(file_path=None):
+    query = sorted(
+        (key, value)
+        for key, value in request.args.items(multi=True)
+        if key != "file_path"
+    )
+    digest = hashlib.sha1()
+    digest.update(request.path.encode("utf-8"))
+    digest.update(repr(query).encode("utf-8"))
+    digest.update(get_document_key(file_path).encode("utf-8"))
+    digest.update(get_document_version(file_path).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def conditional(view):
+    """Tags a retrieval response with an ETag derived from the document version
+    and the query, and answers a matching If-None-Match with 304 without parsing
+    the document."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        etag = compute_etag(request.args.get("file_path"))
+        if request.if_none_match.contains(etag):
+            metrics.DOCUMENT_RETRIEVALS.inc(result="not_modified")
+            response = make_response("", 304)
+            response.set_etag(etag)
+            return response
+
+        metrics.DOCUMENT_RETRIEVALS.inc(result="parsed")
+        with metrics.exclusive_phase("query"):
+            response = make_response(view(*args, **kwargs))
+        if response.status_code == 200:
+            response.set_etag(etag)
+        return response
+
+    return wrapper
+
+
+def mutates_document(view):
+    """Bumps the document version after a successful mutation."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with metrics.exclusive_phase("mutate"):
+            response = make_response(view(*args, **kwargs))
+        if response.status_code == 200:
+            bump_document_version(request.args.get("file_path"))
+        return response
+
+    return wrapper
+
+
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    g.phase_timings = {}
+    metrics.REQUESTS_IN_FLIGHT.inc()
+
+    if request.endpoint != "get_profile" and profiling.is_requested(
+        request.headers.get(profiling.PROFILE_HEADER),
+        app.config["PROFILE_REQUESTS"],
+    ):
+        g.profiler = profiling.StackProfiler()
+        g.profiler.start()
+
+
+@app.after_request
+def record_profile(response):
+    profiler = g.pop("profiler", None)
+    if profiler is None:
+        return response
+
+    profiler.stop()
+    phases = dict(g.phase_timings)
+    profile = {
+        "id": profiling.new_profile_id(),
+        "route": request.url_rule.rule if request.url_rule else request.path,
+        "query": request.args.to_dict(flat=False),
+        "status": response.status_code,
+        "total": time.perf_counter() - g.request_started,
+        "phases": phases,
+        "collapsed": profiler.collapsed(),
+    }
+    profile_store.add(profile)
+
+    response.headers[profiling.PROFILE_ID_HEADER] = profile["id"]
+    response.headers["Server-Timing"] = profiling.server_timing(phases)
+    return response
+
+
+@app.after_request
+def record_request_metrics(response):
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.REQUESTS.inc(
+        route=route, method=request.method, status=response.status_code
+    )
+    metrics.REQUEST_LATENCY.observe(
+        time.perf_counter() - g.request_started, route=route
+    )
+    return response
+
+
+@app.teardown_request
+def finish_request_metrics(exception=None):
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.stop()
+    metrics.REQUESTS_IN_FLIGHT.dec()
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    with document_versions_lock:
+        metrics.VERSION_TABLE_DOCUMENTS.set(len(document_versions))
+        metrics.VERSION_TABLE_BYTES.set(
+            sys.getsizeof(document_versions)
+            + sum(sys.getsizeof(key) for key in document_versions)
+        )
+    return Response(metrics.registry.expose(), content_type=metrics.CONTENT_TYPE)
+
+
+@app.route("/profiles/<profile_id>", methods=["GET"])
+def get_profile(profile_id):
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        return jsonify({"error": "Profile not found"}), 404
+
+    if request.args.get("format") == "collapsed":
+        return Response(profile["collapsed"], content_type="text/plain; charset=utf-8")
+
+    return jsonify(profile), 200
 
 
 @app.route("/")
@@ -31,6 +240,7 @@ def users():
 
 
 @app.route("/get-by-id", methods=["GET"])
+@conditional
 def get_by_id():
     id_ = request.args.get("id")
     file_path = request.args.get("file_path")
@@ -45,14 +255,13 @@ def get_by_id():
         return jsonify({"error": "Element not found"}), 404
 
     return (
-        jsonify(
-            {"element": str(etree.tostring(element, method="html").decode("utf-8"))}
-        ),
+        jsonify({"element": serialize(element)}),
         200,
     )
 
 
 @app.route("/check-exists", methods=["GET"])
+@conditional
 def check_if_exists():
     id_ = request.args.get("id")
     file_path = request.args.get("file_path")
@@ -67,11 +276,7 @@ def check_if_exists():
         jsonify(
             {
                 "exists": element is not None,
-                "element": (
-                    etree.tostring(element, method="html").decode("utf-8")
-                    if element is not None
-                    else None
-                ),
+                "element": serialize(element) if element is not None else None,
             }
         ),
         200,
@@ -79,6 +284,7 @@ def check_if_exists():
 
 
 @app.route("/get-by-name", methods=["GET"])
+@conditional
 def get_by_name():
     name = request.args.get("name")
     file_path = request.args.get("file_path")
@@ -93,14 +299,13 @@ def get_by_name():
         return jsonify({"error": "Element not found"}), 404
 
     return (
-        jsonify(
-            {"element": etree.tostring(elements[0], method="html").decode("utf-8")}
-        ),
+        jsonify({"element": serialize(elements[0])}),
         200,
     )
 
 
 @app.route("/get-by-path", methods=["GET"])
+@conditional
 def get_by_path():
     path = request.args.get("path")
     file_path = request.args.get("file_path")
@@ -116,9 +321,7 @@ def get_by_path():
             return jsonify({"error": "Element not found"}), 404
         # Return first element for single path query
         return (
-            jsonify(
-                {"element": etree.tostring(elements[0], method="html").decode("utf-8")}
-            ),
+            jsonify({"element": serialize(elements[0])}),
             200,
         )
     except Exception as e:
@@ -126,6 +329,7 @@ def get_by_path():
 
 
 @app.route("/get-elements-by-path", methods=["GET"])
+@conditional
 def get_elements_by_path():
     path = request.args.get("path")
     file_path = request.args.get("file_path")
@@ -138,14 +342,7 @@ def get_elements_by_path():
     try:
         elements = parser.get_elements_by_path(path)
         return (
-            jsonify(
-                {
-                    "elements": [
-                        etree.tostring(el, method="html").decode("utf-8")
-                        for el in elements
-                    ]
-                }
-            ),
+            jsonify({"elements": serialize_all(elements)}),
             200,
         )
     except Exception as e:
@@ -153,6 +350,7 @@ def get_elements_by_path():
 
 
 @app.route("/get-by-value", methods=["GET"])
+@conditional
 def get_by_value():
     value = request.args.get("value")
     file_path = request.args.get("file_path")
@@ -165,14 +363,7 @@ def get_by_value():
     try:
         elements = parser.get_elements_by_value(value)
         return (
-            jsonify(
-                {
-                    "elements": [
-                        etree.tostring(el, method="html").decode("utf-8")
-                        for el in elements
-                    ]
-                }
-            ),
+            jsonify({"elements": serialize_all(elements)}),
             200,
         )
     except Exception as e:
@@ -180,6 +371,7 @@ def get_by_value():
 
 
 @app.route("/replace-by-id", methods=["POST"])
+@mutates_document
 def replace_by_id():
     data = request.get_json()
     file_path = request.args.get("file_path")
@@ -197,6 +389,7 @@ def replace_by_id():
 
 
 @app.route("/remove-by-id", methods=["DELETE"])
+@mutates_document
 def remove_by_id():
     id_ = request.args.get("id")
     file_path = request.args.get("file_path")
@@ -214,6 +407,7 @@ def remove_by_id():
 
 
 @app.route("/delete-elements-by-path", methods=["DELETE"])
+@mutates_document
 def delete_elements_by_path():
     path = request.args.get("path")
     file_path = request.args.get("file_path")
@@ -231,6 +425,7 @@ def delete_elements_by_path():
 
 
 @app.route("/insert-element-by-path", methods=["POST"])
+@mutates_document
 def insert_element_by_path():
     data = request.json
     file_path = request.args.get("file_path")
@@ -248,6 +443,7 @@ def insert_element_by_path():
 
 
 @app.route("/get-by-jinja-variable", methods=["GET"])
+@conditional
 def get_by_jinja_variable():
     variable_name = request.args.get("variable_name")
     file_path = request.args.get("file_path")
@@ -260,14 +456,7 @@ def get_by_jinja_variable():
     try:
         elements = parser.get_elements_by_jinja_variable(variable_name)
         return (
-            jsonify(
-                {
-                    "elements": [
-                        etree.tostring(el, method="html").decode("utf-8")
-                        for el in elements
-                    ]
-                }
-            ),
+            jsonify({"elements": serialize_all(elements)}),
             200,
         )
     except AttributeError:
@@ -276,6 +465,7 @@ def get_by_jinja_variable():
 
 
 @app.route("/update-element-by-path", methods=["POST"])
+@mutates_document
 def update_element_by_path():
     data = request.json
     file_path = request.args.get("file_path")
@@ -317,5 +507,36 @@ def check_if_node_exists():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/multi/get-elements-by-path", methods=["GET"])
+def multi_get_elements_by_path():
+    path = request.args.get("path")
+    file_paths = request.args.getlist("file_path")
+    stream = request.args.get("stream", "false").lower() in ("1", "true", "yes")
+
+    if not path:
+        return jsonify({"error": "Path parameter is required"}), 400
+
+    if not file_paths:
+        return jsonify({"error": "At least one file_path is required"}), 400
+
+    pool = get_process_pool()
+    futures = [
+        pool.submit(multi_query.get_elements_by_path, file_path, path)
+        for file_path in file_paths
+    ]
+
+    if stream:
+        # One JSON document per line, in completion order
+        def generate():
+            for future in as_completed(futures):
+                yield json.dumps(future.result()) + "\n"
+
+        return Response(
+            stream_with_context(generate()), mimetype="application/x-ndjson"
+        )
+
+    return jsonify({"results": [future.result() for future in futures]}), 200
+
+
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,23 @@
+import os
+
+from lxml import etree
+
+from app.http.lxml_parser import MyLXMLParser
+
+
+def get_elements_by_path(file_path, path):
+    """Evaluates path over a single document. Runs inside a worker process, so
+    the result holds only serialized elements."""
+    if not os.path.isfile(file_path):
+        return {"file_path": file_path, "error": "File not found"}
+
+    try:
+        elements = MyLXMLParser(file_path).get_elements_by_path(path)
+        return {
+            "file_path": file_path,
+            "elements": [
+                etree.tostring(el, method="html").decode("utf-8") for el in elements
+            ],
+        }
+    except Exception as e:
+        return {"file_path": file_path, "error": str(e)}
@@ -0,0 +1,255 @@
+"""Prometheus text exposition for the parser service: request counts and latency per
+route, document phase timings and the ETag version table.
+
+Each parser service is a standalone Flask project with its own ``app`` package, so this
+module is copied into both rather than shared. The copies are kept identical; the root
+test suite checks that they are.
+
+The services keep no parsed-document cache and no sessions: a retrieval either
+matches its ETag and is answered 304 without parsing, or parses the document, and the
+only state held between requests is the version table behind the ETags. The metrics
+report exactly those.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join('%s="%s"' % (k, _escape(v)) for k, v in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type_ = "untyped"
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(
+                "Metric %s expects labels %s" % (self.name, list(self.label_names))
+            )
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _pairs(self, key):
+        return list(zip(self.label_names, key))
+
+    def samples(self):
+        raise NotImplementedError
+
+    def expose(self):
+        lines = [
+            "# HELP %s %s" % (self.name, self.documentation),
+            "# TYPE %s %s" % (self.name, self.type_),
+        ]
+        for name, pairs, value in self.samples():
+            lines.append(name + _format_labels(pairs) + " " + _format_value(value))
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type_ = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield self.name, self._pairs(key), value
+
+
+class Gauge(Metric):
+    type_ = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield self.name, self._pairs(key), value
+
+
+class Histogram(Metric):
+    type_ = "histogram"
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, (list(c), s)) for key, (c, s) in self._values.items())
+        for key, (counts, total) in items:
+            pairs = self._pairs(key)
+            for bound, count in zip(self.buckets, counts):
+                bucket_pairs = pairs + [("le", _format_value(bound))]
+                yield self.name + "_bucket", bucket_pairs, count
+            yield self.name + "_sum", pairs, total
+            yield self.name + "_count", pairs, counts[-1]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def expose(self):
+        return "\n".join(metric.expose() for metric in self._metrics) + "\n"
+
+
+registry = Registry()
+
+REQUESTS = registry.register(
+    Counter(
+        "http_requests_total",
+        "HTTP requests handled, by route, method and status.",
+        ("route", "method", "status"),
+    )
+)
+REQUEST_LATENCY = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "HTTP request latency, by route.",
+        ("route",),
+    )
+)
+REQUESTS_IN_FLIGHT = registry.register(
+    Gauge("http_requests_in_flight", "HTTP requests currently being handled.")
+)
+PHASE_LATENCY = registry.register(
+    Histogram(
+        "document_phase_duration_seconds",
+        "Time spent per document phase (parse, query, mutate, serialize).",
+        ("phase",),
+    )
+)
+DOCUMENT_RETRIEVALS = registry.register(
+    Counter(
+        "document_retrievals_total",
+        "Document retrievals, by result: not_modified when If-None-Match matched the "
+        "ETag and the document was not parsed, parsed otherwise.",
+        ("result",),
+    )
+)
+VERSION_TABLE_DOCUMENTS = registry.register(
+    Gauge(
+        "document_version_table_entries",
+        "Documents with a mutation counter in the in-memory ETag version table.",
+    )
+)
+VERSION_TABLE_BYTES = registry.register(
+    Gauge(
+        "document_version_table_bytes",
+        "sys.getsizeof of the in-memory ETag version table and its keys.",
+    )
+)
+
+
+def _request_phases():
+    if has_request_context():
+        return getattr(g, "phase_timings", None)
+    return None
+
+
+@contextmanager
+def phase(name):
+    """Times a document phase into PHASE_LATENCY and the per-request breakdown."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        PHASE_LATENCY.observe(elapsed, phase=name)
+        phases = _request_phases()
+        if phases is not None:
+            phases[name] = phases.get(name, 0.0) + elapsed
+
+
+@contextmanager
+def exclusive_phase(name):
+    """Like phase, but leaves out time already attributed to nested phases, so
+    a view timed as "query" does not count its own parse and serialize time."""
+    phases = _request_phases()
+    nested_before = sum(phases.values()) if phases is not None else 0.0
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if phases is not None:
+            elapsed -= sum(phases.values()) - nested_before
+            phases[name] = phases.get(name, 0.0) + elapsed
+        PHASE_LATENCY.observe(elapsed, phase=name)
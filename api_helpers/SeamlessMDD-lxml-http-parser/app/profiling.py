@@ -0,0 +1,114 @@
+"""Opt-in per-request profiling for the parser service.
+
+Copied into both parser services, like metrics; the root test suite checks that the
+copies stay identical.
+"""
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+# Profiles kept in memory for /profiles/<profile_id>.
+MAX_STORED_PROFILES = 32
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    qualname = getattr(code, "co_qualname", code.co_name)
+    return "%s:%s" % (frame.f_globals.get("__name__", "?"), qualname)
+
+
+def _builtin_name(function):
+    module = getattr(function, "__module__", None) or "builtins"
+    return "%s:%s" % (module, getattr(function, "__qualname__", repr(function)))
+
+
+class StackProfiler:
+    """Deterministic profiler that attributes self time to every call stack seen
+    while active. Output uses the collapsed format read by flamegraph.pl and
+    speedscope: one "frame;frame;frame weight" line per stack."""
+
+    def __init__(self):
+        self.stacks = defaultdict(float)
+        self._stack = []
+        self._last = None
+
+    def _callback(self, frame, event, arg):
+        now = time.perf_counter()
+        if self._stack:
+            self.stacks[tuple(self._stack)] += now - self._last
+
+        if event == "call":
+            self._stack.append(_frame_name(frame))
+        elif event == "c_call":
+            self._stack.append(_builtin_name(arg))
+        elif self._stack:
+            self._stack.pop()
+
+        self._last = time.perf_counter()
+
+    def start(self):
+        self._last = time.perf_counter()
+        sys.setprofile(self._callback)
+
+    def stop(self):
+        sys.setprofile(None)
+
+    def collapsed(self):
+        """Weights are microseconds of self time."""
+        lines = []
+        for stack, seconds in sorted(self.stacks.items()):
+            weight = int(seconds * 1_000_000)
+            if weight > 0:
+                lines.append("%s %d" % (";".join(stack), weight))
+        return "\n".join(lines) + "\n"
+
+
+class ProfileStore:
+    def __init__(self, max_profiles=MAX_STORED_PROFILES, directory=None):
+        self.max_profiles = max_profiles
+        self.directory = directory
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile):
+        with self._lock:
+            self._profiles[profile["id"]] = profile
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            base_path = os.path.join(self.directory, profile["id"])
+            with open(base_path + ".collapsed", "w") as file:
+                file.write(profile["collapsed"])
+            with open(base_path + ".json", "w") as file:
+                summary = {k: v for k, v in profile.items() if k != "collapsed"}
+                json.dump(summary, file, indent=4)
+
+    def get(self, profile_id):
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+
+def is_requested(header_value, profile_all=False):
+    if profile_all:
+        return True
+    return header_value is not None and header_value.lower() in ("1", "true", "yes")
+
+
+def new_profile_id():
+    return "%d-%s" % (time.time() * 1000, uuid.uuid4().hex[:8])
+
+
+def server_timing(phases):
+    """Formats phase durations (seconds) as a Server-Timing header value."""
+    return ", ".join(
+        "%s;dur=%.3f" % (name, seconds * 1000) for name, seconds in phases.items()
+    )
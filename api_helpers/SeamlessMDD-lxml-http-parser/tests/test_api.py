@@ -94,3 +94,136 @@ def test_insert_element_by_path_success(client: FlaskClient, sample_file_path: s
     )
     assert resp.status_code == 200
     assert resp.get_json().get("message") == "Element inserted successfully"
+
+
+def test_get_by_id_sets_etag(client: FlaskClient, sample_file_path: str):
+    resp = client.get(
+        "/get-by-id", query_string={"id": "1", "file_path": sample_file_path}
+    )
+    assert resp.status_code == 200
+    assert resp.headers.get("ETag")
+
+
+def test_get_by_id_if_none_match_not_modified(
+    client: FlaskClient, sample_file_path: str
+):
+    query = {"id": "1", "file_path": sample_file_path}
+    etag = client.get("/get-by-id", query_string=query).headers["ETag"]
+
+    resp = client.get(
+        "/get-by-id", query_string=query, headers={"If-None-Match": etag}
+    )
+    assert resp.status_code == 304
+    assert resp.get_data() == b""
+
+
+def test_etag_depends_on_query(client: FlaskClient, sample_file_path: str):
+    first = client.get(
+        "/get-by-id", query_string={"id": "1", "file_path": sample_file_path}
+    )
+    second = client.get(
+        "/get-by-id", query_string={"id": "2", "file_path": sample_file_path}
+    )
+    assert first.headers["ETag"] != second.headers["ETag"]
+
+
+def test_mutation_invalidates_etag(client: FlaskClient, sample_file_path: str):
+    query = {"path": "/html/body/div", "file_path": sample_file_path}
+    etag = client.get("/get-elements-by-path", query_string=query).headers["ETag"]
+
+    client.post(
+        "/insert-element-by-path",
+        json={"path": "/html/body/div/ul", "element_text": "<li>Extra</li>"},
+        query_string={"file_path": sample_file_path},
+    )
+
+    resp = client.get(
+        "/get-elements-by-path", query_string=query, headers={"If-None-Match": etag}
+    )
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] != etag
+
+
+def test_multi_get_elements_by_path(client: FlaskClient, sample_file_path: str):
+    resp = client.get(
+        "/multi/get-elements-by-path",
+        query_string={
+            "path": "//ul/li",
+            "file_path": [sample_file_path, sample_file_path, "missing.html"],
+        },
+    )
+    assert resp.status_code == 200
+    results = resp.get_json()["results"]
+    assert [result["file_path"] for result in results] == [
+        sample_file_path,
+        sample_file_path,
+        "missing.html",
+    ]
+    assert len(results[0]["elements"]) == 2
+    assert "error" in results[2]
+
+
+def test_multi_get_elements_by_path_stream(client: FlaskClient, sample_file_path: str):
+    resp = client.get(
+        "/multi/get-elements-by-path",
+        query_string={"path": "//ul/li", "file_path": sample_file_path, "stream": "1"},
+    )
+    assert resp.status_code == 200
+    assert resp.mimetype == "application/x-ndjson"
+    lines = [line for line in resp.get_data(as_text=True).splitlines() if line]
+    assert len(lines) == 1
+    assert '"file_path"' in lines[0]
+
+
+def test_multi_get_elements_by_path_missing_files(client: FlaskClient):
+    resp = client.get("/multi/get-elements-by-path", query_string={"path": "//li"})
+    assert resp.status_code == 400
+
+
+def test_metrics_exposition(client: FlaskClient, sample_file_path: str):
+    client.get("/get-by-id", query_string={"id": "1", "file_path": sample_file_path})
+
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/plain"
+    body = resp.get_data(as_text=True)
+    assert "# TYPE http_requests_total counter" in body
+    assert 'http_requests_total{route="/get-by-id",method="GET",status="200"}' in body
+    assert 'http_request_duration_seconds_bucket{route="/get-by-id",le="+Inf"}' in body
+    assert 'document_phase_duration_seconds_count{phase="parse"}' in body
+    assert 'document_phase_duration_seconds_count{phase="serialize"}' in body
+    assert 'document_retrievals_total{result="parsed"}' in body
+    assert "document_version_table_entries" in body
+    assert "http_requests_in_flight" in body
+
+
+def test_profiled_request(client: FlaskClient, sample_file_path: str):
+    resp = client.get(
+        "/get-elements-by-path",
+        query_string={"path": "//ul/li", "file_path": sample_file_path},
+        headers={"X-Profile": "1"},
+    )
+    assert resp.status_code == 200
+    profile_id = resp.headers["X-Profile-Id"]
+    assert "parse;dur=" in resp.headers["Server-Timing"]
+
+    profile = client.get(f"/profiles/{profile_id}").get_json()
+    assert profile["route"] == "/get-elements-by-path"
+    assert set(profile["phases"]) == {"parse", "query", "serialize"}
+
+    collapsed = client.get(
+        f"/profiles/{profile_id}", query_string={"format": "collapsed"}
+    ).get_data(as_text=True)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in collapsed.splitlines())
+
+
+def test_unprofiled_request_has_no_profile(client: FlaskClient, sample_file_path: str):
+    resp = client.get(
+        "/get-by-id", query_string={"id": "1", "file_path": sample_file_path}
+    )
+    assert "X-Profile-Id" not in resp.headers
+
+
+def test_profile_not_found(client: FlaskClient):
+    resp = client.get("/profiles/unknown")
+    assert resp.status_code == 404
@@ -8,10 +8,11 @@ from transformation.generators.generator_register import GeneratorRegister
 from tracing.tracer import Tracer
 from metamodel.model import Model
 from transformation.data_manipulation import DataManipulation, VersionUnavailableError
+from versioning.version_gc import collect_versions, DEFAULT_RETENTION
 from transformation.conflict_resolution.question import Question
 from view.tree_view import prepare_model_for_tree_view
 from utilities.exceptions import ElementNotFoundError
-from utilities.utilities import class_object_to_underscore_format, class_name_to_underscore_format
+from utilities.utilities import class_object_to_underscore_format, class_name_to_underscore_format, get_project_root
 
 from recreate_dummy_structures import make
 
@@ -175,6 +176,20 @@ def create_app(data_manipulation=None, handler=None, tracer=None ):
             except:
                 return make_response(jsonify({'error': 'Bad request'}), 400)
 
+    @app.route('/versions/collect', methods=['POST'])
+    def collect_unused_versions():
+        """Drops versions outside the retention window that the table no longer references, see version_gc."""
+        try:
+            content = request.get_json(silent=True) or {}
+            storage_path = os.path.join(get_project_root(), "files")
+            archive_path = os.path.join(storage_path, "archive") if content.get("archive") else None
+            collection = collect_versions(data_manipulation, handler.element_generator_table,
+                                          int(content.get("retention", DEFAULT_RETENTION)), storage_path,
+                                          archive_path)
+            return make_response(jsonify(collection._asdict()), 200)
+        except (TypeError, ValueError):
+            return make_response(jsonify({'error': 'Bad request'}), 400)
+
     @app.route('/tracer', methods=['GET', 'POST'])
     def tracer():
         if request.method == 'GET':
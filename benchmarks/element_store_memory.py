@@ -0,0 +1,54 @@
+"""Compares the memory held by a model of pyecore elements with the same model in a CompactElementStore.
+
+    python -m benchmarks.element_store_memory [documents] [fields per document]
+"""
+import gc
+import sys
+import tracemalloc
+
+from metamodel.model import Model
+from metamodel.project import Project
+from metamodel.document import Document
+from metamodel.typed_field import TypedField
+from metamodel.compact_store import CompactElementStore
+
+
+def build_model(documents, fields_per_document):
+    model = Model()
+    project = Project(1, "Project", False, None, model)
+    model.root = project
+
+    element_id = 2
+    for document_number in range(documents):
+        document = Document(element_id, "Document %d" % document_number, False, None, model)
+        project.add(document)
+        element_id += 1
+        for field_number in range(fields_per_document):
+            field = TypedField(element_id, "Field %d" % field_number, "string", False, "Label %d" % field_number)
+            document.add(field)
+            element_id += 1
+    return model
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def main(documents=100, fields_per_document=1000):
+    model, model_size = measure(lambda: build_model(documents, fields_per_document))
+    store, store_size = measure(lambda: CompactElementStore.from_model(model))
+
+    print("elements:         %d" % len(model))
+    print("pyecore model:    %.1f MiB (%d bytes per element)" % (model_size / 2 ** 20, model_size // len(model)))
+    print("compact store:    %.1f MiB (%d bytes per element)" % (store_size / 2 ** 20, store_size // len(store)))
+    print("ratio:            %.1fx" % (model_size / store_size))
+
+
+if __name__ == '__main__':
+    main(*(int(argument) for argument in sys.argv[1:]))
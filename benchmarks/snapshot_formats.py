@@ -0,0 +1,66 @@
+"""Compares dill, JSON and binary snapshots of a DataManipulation: save and load time, file size, and the time to
+load a single version.
+
+    python -m benchmarks.snapshot_formats [versions] [documents] [fields per document]
+"""
+import gc
+import os
+import sys
+import tempfile
+import time
+
+from transformation.data_manipulation import DataManipulation
+from benchmarks.element_store_memory import build_model
+
+
+def build_data_manipulation(versions, documents, fields_per_document):
+    data_manipulation = DataManipulation()
+    data_manipulation.update_model(build_model(documents, fields_per_document))
+    for version in range(1, versions):
+        data_manipulation.update_model_after_generation()
+        data_manipulation.get_latest_model().root.update(name="Project %d" % version)
+    for version in range(versions):
+        data_manipulation.get_model_by_version(version).materialize()
+    return data_manipulation
+
+
+def timed(function):
+    # Collect the previous run's cyclic garbage so it is not charged to this one.
+    gc.collect()
+    start = time.perf_counter()
+    try:
+        function()
+    except Exception as error:
+        return "failed (%s)" % type(error).__name__
+    return "%.2f s" % (time.perf_counter() - start)
+
+
+def main(versions=5, documents=20, fields_per_document=1000):
+    data_manipulation = build_data_manipulation(versions, documents, fields_per_document)
+    directory = tempfile.mkdtemp()
+    paths = {name: os.path.join(directory, "model." + name) for name in ("dill", "json", "snapshot")}
+
+    formats = {
+        "dill": (lambda: data_manipulation.save_to_dill(paths["dill"]),
+                 lambda: data_manipulation.load_from_dill(paths["dill"]),
+                 None),
+        "json": (lambda: data_manipulation.save_to_json(paths["json"]),
+                 lambda: DataManipulation.load_from_json(paths["json"]),
+                 None),
+        "snapshot": (lambda: data_manipulation.save_to_snapshot(paths["snapshot"]),
+                     lambda: DataManipulation.load_from_snapshot(paths["snapshot"]),
+                     lambda: DataManipulation.load_version_from_snapshot(versions - 1, paths["snapshot"])),
+    }
+
+    print("%d versions of %d elements" % (versions, len(data_manipulation.get_latest_model())))
+    print("%-10s %14s %14s %14s %14s" % ("format", "save", "load", "one version", "size"))
+    for name, (save, load, load_one) in formats.items():
+        save_time = timed(save)
+        size = "%.1f MiB" % (os.path.getsize(paths[name]) / 2 ** 20) if os.path.exists(paths[name]) else "-"
+        load_time = timed(load)
+        load_one_time = timed(load_one) if load_one is not None else "-"
+        print("%-10s %14s %14s %14s %14s" % (name, save_time, load_time, load_one_time, size))
+
+
+if __name__ == '__main__':
+    main(*(int(argument) for argument in sys.argv[1:]))
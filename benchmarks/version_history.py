@@ -0,0 +1,62 @@
+"""Compares a history of fully materialized model versions with the same history in a DeltaVersionStore, in memory
+and as full and delta snapshots on disk. Each version renames changes_per_version fields of the one before.
+
+    python -m benchmarks.version_history [versions] [documents] [fields per document] [changes per version]
+"""
+import os
+import random
+import sys
+import tempfile
+
+from transformation.data_manipulation import DataManipulation
+from versioning.delta_store import DeltaVersionStore
+from benchmarks.element_store_memory import build_model, measure
+
+
+def build_history(versions, documents, fields_per_document, changes_per_version):
+    data_manipulation = DataManipulation()
+    data_manipulation.update_model(build_model(documents, fields_per_document))
+    field_ids = [element.id for element in data_manipulation.get_latest_model() if element.id > documents + 1]
+
+    generator = random.Random(0)
+    for version in range(1, versions):
+        data_manipulation.update_model_after_generation()
+        model = data_manipulation.get_latest_model()
+        for field_id in generator.sample(field_ids, changes_per_version):
+            model.get_element(field_id).update(name="Field %d v%d" % (field_id, version))
+    return data_manipulation
+
+
+def materialize_history(data_manipulation):
+    for version in data_manipulation.versions:
+        data_manipulation.get_model_by_version(version).materialize()
+
+
+def delta_store(data_manipulation):
+    store = DeltaVersionStore()
+    for version in data_manipulation.versions:
+        store.add(version, data_manipulation.get_model_by_version(version))
+    return store
+
+
+def main(versions=30, documents=10, fields_per_document=1000, changes_per_version=50):
+    data_manipulation = build_history(versions, documents, fields_per_document, changes_per_version)
+    _, full_size = measure(lambda: materialize_history(data_manipulation))
+    store, store_size = measure(lambda: delta_store(data_manipulation))
+    store.forget_last_states()
+
+    directory = tempfile.mkdtemp()
+    full_path, delta_path = os.path.join(directory, "full.snapshot"), os.path.join(directory, "delta.snapshot")
+    data_manipulation.save_to_snapshot(full_path)
+    data_manipulation.save_to_snapshot(delta_path, checkpoint_interval=store.checkpoint_interval)
+
+    print("%d versions of %d elements, %d changed per version, checkpoint every %d"
+          % (versions, len(data_manipulation.get_latest_model()), changes_per_version, store.checkpoint_interval))
+    print("memory, materialized versions: %8.1f MiB" % (full_size / 2 ** 20))
+    print("memory, delta store:           %8.1f MiB" % (store_size / 2 ** 20))
+    print("disk, full snapshot:           %8.1f MiB" % (os.path.getsize(full_path) / 2 ** 20))
+    print("disk, delta snapshot:          %8.1f MiB" % (os.path.getsize(delta_path) / 2 ** 20))
+
+
+if __name__ == '__main__':
+    main(*(int(argument) for argument in sys.argv[1:]))
@@ -0,0 +1,517 @@
+from array import array
+import struct
+import sys
+
+from utilities.exceptions import ElementNotFoundError
+from utilities.utilities import get_class_from_parent_module
+from metamodel.model import Model, ElementState
+from metamodel.container import Container
+
+# to_bytes layout: row, string and class counts, class names, strings, class and deleted bytes per row, then the
+# row arrays below, little-endian.
+_COUNTS = struct.Struct('<III')
+_ROW_ARRAYS = (('_ids', 'q'), ('_parents', 'i'), ('_ends', 'i'), ('_names', 'i'), ('_labels', 'i'), ('_types', 'i'))
+
+
+def _to_little_endian(values):
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def pack_strings(strings):
+    """Packs strings as their utf-8 lengths followed by the utf-8 bytes."""
+    encoded = [string.encode() for string in strings]
+    lengths = _to_little_endian(array('I', [len(string) for string in encoded]))
+    return lengths.tobytes() + b''.join(encoded)
+
+
+def unpack_strings(data, offset, count):
+    """Reads count strings written by pack_strings at offset. Returns them and the offset after them."""
+    lengths = array('I')
+    lengths.frombytes(data[offset:offset + lengths.itemsize * count])
+    offset += lengths.itemsize * count
+
+    strings = []
+    for length in _to_little_endian(lengths):
+        strings.append(bytes(data[offset:offset + length]).decode())
+        offset += length
+    return strings, offset
+
+
+# pack_states layout: row, child id, string and class counts, class names, strings, class (_REMOVED_CLASS for a
+# removed element) and deleted bytes per row, then the state arrays below and the child ids, little-endian.
+_STATE_COUNTS = struct.Struct('<IIII')
+_STATE_ARRAYS = ('q', 'i', 'i', 'i', 'i')
+_REMOVED_CLASS = 255
+
+# Constructor argument of each string attribute, per element class.
+_STRING_ARGUMENTS = (('_name', 'name', '_names'), ('_label', 'label', '_labels'), ('_type', 'type_', '_types'))
+_constructor_arguments = {}
+_class_attributes = {}
+
+
+def _attributes_for_dict(element_class):
+    attributes = _class_attributes.get(element_class)
+    if attributes is None:
+        attributes = _class_attributes[element_class] = tuple(element_class().attributes_for_dict)
+    return attributes
+
+
+def _state_values(element_class, element_id, deleted, strings):
+    # strings are the _name, _label and _type values; the class decides which of them the state has.
+    values = {'_deleted': deleted, '_id': element_id, '_name': strings[0], '_label': strings[1], '_type': strings[2]}
+    return {attribute: values[attribute] for attribute in _attributes_for_dict(element_class)}
+
+
+def pack_states(states):
+    """Packs an element id -> ElementState map, such as DeltaVersionStore's deltas, into rows of interned strings
+    and class indexes instead of repeating every attribute name."""
+    classes, strings, string_rows = [], [], {}
+
+    def intern(string):
+        if string is None:
+            return -1
+        if string not in string_rows:
+            string_rows[string] = len(strings)
+            strings.append(string)
+        return string_rows[string]
+
+    class_rows, deleted = bytearray(), bytearray()
+    columns = [array(typecode) for typecode in _STATE_ARRAYS]
+    ids, names, labels, types, child_counts = columns
+    child_ids = array('q')
+    for element_id, state in states.items():
+        ids.append(element_id)
+        if state.type is None:
+            class_rows.append(_REMOVED_CLASS)
+            deleted.append(0)
+            for column in (names, labels, types, child_counts):
+                column.append(-1)
+            continue
+
+        if state.type not in classes:
+            classes.append(state.type)
+        class_rows.append(classes.index(state.type))
+        deleted.append(bool(state.values.get('_deleted')))
+        names.append(intern(state.values.get('_name')))
+        labels.append(intern(state.values.get('_label')))
+        types.append(intern(state.values.get('_type')))
+        child_counts.append(len(state.children) if state.children is not None else -1)
+        child_ids.extend(state.children or ())
+
+    parts = [_STATE_COUNTS.pack(len(ids), len(child_ids), len(strings), len(classes)),
+             pack_strings([element_class.__name__ for element_class in classes]),
+             pack_strings(strings),
+             bytes(class_rows),
+             bytes(deleted)]
+    parts.extend(_to_little_endian(values).tobytes() for values in columns + [child_ids])
+    return b''.join(parts)
+
+
+def unpack_states(data):
+    """Reads the element id -> ElementState map written by pack_states."""
+    data = memoryview(data)
+    rows, child_id_count, string_count, class_count = _STATE_COUNTS.unpack_from(data)
+    offset = _STATE_COUNTS.size
+
+    class_names, offset = unpack_strings(data, offset, class_count)
+    classes = [get_class_from_parent_module(class_name, "metamodel") for class_name in class_names]
+    strings, offset = unpack_strings(data, offset, string_count)
+    class_rows = data[offset:offset + rows]
+    offset += rows
+    deleted = data[offset:offset + rows]
+    offset += rows
+
+    columns = []
+    for typecode, count in zip(_STATE_ARRAYS + ('q',), (rows,) * len(_STATE_ARRAYS) + (child_id_count,)):
+        values = array(typecode)
+        size = values.itemsize * count
+        values.frombytes(data[offset:offset + size])
+        columns.append(_to_little_endian(values))
+        offset += size
+    ids, names, labels, types, child_counts, child_ids = columns
+
+    states = {}
+    child_offset = 0
+    for row in range(rows):
+        if class_rows[row] == _REMOVED_CLASS:
+            states[ids[row]] = ElementState(None, None, None)
+            continue
+
+        element_class = classes[class_rows[row]]
+        row_strings = [strings[index] if index != -1 else None for index in (names[row], labels[row], types[row])]
+        children = None
+        if child_counts[row] != -1:
+            children = tuple(child_ids[child_offset:child_offset + child_counts[row]])
+            child_offset += child_counts[row]
+        states[ids[row]] = ElementState(element_class, _state_values(element_class, ids[row], bool(deleted[row]),
+                                                                     row_strings), children)
+    return states
+
+
+def _constructor_strings(element_class, store):
+    arguments = _constructor_arguments.get(element_class)
+    if arguments is None:
+        attributes = element_class().attributes_for_dict
+        arguments = _constructor_arguments[element_class] = [
+            (argument, array_name) for attribute, argument, array_name in _STRING_ARGUMENTS if attribute in attributes]
+    return [(argument, getattr(store, array_name)) for argument, array_name in arguments]
+
+
+class CompactElementStore(object):
+    """Read-mostly copy of one model version that keeps element data in packed arrays instead of pyecore objects.
+    Rows are in depth-first order, so the rows of an element's subtree are [row, end of row). Strings are interned
+    into one table and referenced by index; -1 stands for None. Elements are handed out as CompactElement proxies."""
+
+    def __init__(self, version=None):
+        self.version = version
+        self._classes = []
+        self._class_rows = bytearray()
+        self._ids = array('q')
+        self._parents = array('i')
+        self._ends = array('i')
+        self._deleted = bytearray()
+        self._names = array('i')
+        self._labels = array('i')
+        self._types = array('i')
+        self._strings = []
+        self._string_rows = {}
+        self._rows_by_id = None
+
+    @classmethod
+    def from_model(cls, model):
+        store = cls(model.version)
+        if model.root is not None:
+            store._append(model.root, -1)
+        return store
+
+    @classmethod
+    def from_states(cls, find_state, root_id, version=None):
+        """Builds the store from the ElementStates find_state returns for the ids under root_id, as build_element
+        would build the elements, without building them."""
+        store = cls(version)
+        if root_id is not None:
+            store._append_state(find_state, root_id, -1)
+        return store
+
+    def _append_row(self, element_class, element_id, deleted, name, label, type_, parent_row):
+        row = len(self._ids)
+        if element_class not in self._classes:
+            self._classes.append(element_class)
+        self._class_rows.append(self._classes.index(element_class))
+        self._ids.append(element_id)
+        self._parents.append(parent_row)
+        self._ends.append(-1)
+        self._deleted.append(bool(deleted))
+        self._names.append(self._intern(name))
+        self._labels.append(self._intern(label))
+        self._types.append(self._intern(type_))
+        return row
+
+    def _append(self, element, parent_row):
+        row = self._append_row(type(element), element.id, element.deleted, getattr(element, '_name', None),
+                               getattr(element, '_label', None), getattr(element, '_type', None), parent_row)
+        if isinstance(element, Container):
+            for child in element:
+                self._append(child, row)
+        self._ends[row] = len(self._ids)
+
+    def _append_state(self, find_state, element_id, parent_row):
+        state = find_state(element_id)
+        if state is None:
+            return
+        values = state.values
+        row = self._append_row(state.type, element_id, values.get('_deleted'), values.get('_name'),
+                               values.get('_label'), values.get('_type'), parent_row)
+        for child_id in state.children or ():
+            self._append_state(find_state, child_id, row)
+        self._ends[row] = len(self._ids)
+
+    def to_states(self):
+        """The element id -> ElementState map of every row, the inverse of from_states."""
+        string = self._string
+        states = {}
+        for row in range(len(self._ids)):
+            element_class = self._classes[self._class_rows[row]]
+            children = None
+            if issubclass(element_class, Container):
+                children = tuple(self._ids[child] for child in self._child_rows(row))
+            row_strings = [string(self._names[row]), string(self._labels[row]), string(self._types[row])]
+            states[self._ids[row]] = ElementState(element_class, _state_values(
+                element_class, self._ids[row], bool(self._deleted[row]), row_strings), children)
+        return states
+
+    def to_bytes(self):
+        parts = [_COUNTS.pack(len(self._ids), len(self._strings), len(self._classes)),
+                 pack_strings([element_class.__name__ for element_class in self._classes]),
+                 pack_strings(self._strings),
+                 bytes(self._class_rows),
+                 bytes(self._deleted)]
+        for attribute, typecode in _ROW_ARRAYS:
+            parts.append(_to_little_endian(array(typecode, getattr(self, attribute))).tobytes())
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data, version=None):
+        data = memoryview(data)
+        store = cls(version)
+        rows, string_count, class_count = _COUNTS.unpack_from(data)
+        offset = _COUNTS.size
+
+        class_names, offset = unpack_strings(data, offset, class_count)
+        store._classes = [get_class_from_parent_module(class_name, "metamodel") for class_name in class_names]
+        store._strings, offset = unpack_strings(data, offset, string_count)
+        store._string_rows = {string: index for index, string in enumerate(store._strings)}
+
+        store._class_rows = bytearray(data[offset:offset + rows])
+        offset += rows
+        store._deleted = bytearray(data[offset:offset + rows])
+        offset += rows
+
+        for attribute, typecode in _ROW_ARRAYS:
+            values = array(typecode)
+            size = values.itemsize * rows
+            values.frombytes(data[offset:offset + size])
+            setattr(store, attribute, _to_little_endian(values))
+            offset += size
+        return store
+
+    def _intern(self, string):
+        if string is None:
+            return -1
+        index = self._string_rows.get(string)
+        if index is None:
+            index = len(self._strings)
+            self._strings.append(string)
+            self._string_rows[string] = index
+        return index
+
+    def _string(self, index):
+        return self._strings[index] if index != -1 else None
+
+    def to_model(self):
+        """Builds the pyecore model for this version back."""
+        string = self._string
+        elements = []
+        for row in range(len(self._ids)):
+            element_class = self._classes[self._class_rows[row]]
+            arguments = {"_id": self._ids[row], "deleted": bool(self._deleted[row])}
+            for argument, values in _constructor_strings(element_class, self):
+                arguments[argument] = string(values[row])
+            element = element_class(**arguments)
+
+            # The elements are new, so Container.add's move and index upkeep has nothing to do. The content hash
+            # still needs dropping: with make()'s opposite references pyecore compares containers while linking.
+            if self._parents[row] != -1:
+                parent = elements[self._parents[row]]
+                parent._elements.append(element)
+                element.parent_container = parent
+                parent.invalidate_content_hash()
+            elements.append(element)
+
+        model = Model(elements[0] if elements else None, self.version)
+        model.adopt_elements()
+        return model
+
+    @property
+    def root(self):
+        return CompactElement(self, 0) if self._ids else None
+
+    def find_element(self, element_id):
+        if self._rows_by_id is None:
+            self._rows_by_id = {}
+            for row in range(len(self._ids) - 1, -1, -1):
+                self._rows_by_id[self._ids[row]] = row
+
+        row = self._rows_by_id.get(element_id)
+        return CompactElement(self, row) if row is not None else None
+
+    def get_element(self, element_id):
+        element = self.find_element(element_id)
+        if element is not None:
+            return element
+        else:
+            raise ElementNotFoundError("Element with id " + str(element_id) + " is not part of the current model.")
+
+    def iter_depth_first(self, node=None):
+        rows = range(len(self._ids)) if node is None else range(node.row, self._ends[node.row])
+        for row in rows:
+            yield CompactElement(self, row)
+
+    def _child_rows(self, row):
+        child = row + 1
+        while child < self._ends[row]:
+            yield child
+            child = self._ends[child]
+
+    def _iter_children(self, row):
+        for child in self._child_rows(row):
+            yield CompactElement(self, child)
+
+    def __contains__(self, item):
+        return self.find_element(item.id) is not None
+
+    def __iter__(self):
+        return self.iter_depth_first()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __str__(self):
+        return "CompactElementStore[{} {}]".format(self.version, len(self))
+
+
+class CompactElement(object):
+    """Stands in for the Element stored in one row of a CompactElementStore and exposes the same API. Setters and
+    update write straight into the store."""
+
+    __slots__ = ('_store', '_row')
+
+    def __init__(self, store, row):
+        self._store = store
+        self._row = row
+
+    @property
+    def row(self):
+        return self._row
+
+    @property
+    def element_class(self):
+        return self._store._classes[self._store._class_rows[self._row]]
+
+    @property
+    def attributes_for_dict(self):
+        attributes = ['_deleted', '_id', '_name', '_label']
+        if self._store._types[self._row] != -1:
+            attributes.append('_type')
+        return attributes
+
+    @property
+    def id(self):
+        return self._store._ids[self._row]
+
+    @id.setter
+    def id(self, id_):
+        self._store._ids[self._row] = id_
+        self._store._rows_by_id = None
+
+    @property
+    def deleted(self):
+        return bool(self._store._deleted[self._row])
+
+    @deleted.setter
+    def deleted(self, deleted=True):
+        self._store._deleted[self._row] = bool(deleted)
+
+    @property
+    def name(self):
+        return self._store._string(self._store._names[self._row])
+
+    @name.setter
+    def name(self, name):
+        self._store._names[self._row] = self._store._intern(name)
+
+    @property
+    def label(self):
+        return self._store._string(self._store._labels[self._row])
+
+    @label.setter
+    def label(self, label):
+        self._store._labels[self._row] = self._store._intern(label)
+
+    @property
+    def type(self):
+        return self._store._string(self._store._types[self._row])
+
+    @type.setter
+    def type(self, type_):
+        self._store._types[self._row] = self._store._intern(type_)
+
+    # The underscore names let attributes_for_dict be read with getattr, as ElementJSONEncoder does.
+    _id = id
+    _deleted = deleted
+    _name = name
+    _label = label
+    _type = type
+
+    @property
+    def parent_container(self):
+        parent_row = self._store._parents[self._row]
+        return CompactElement(self._store, parent_row) if parent_row != -1 else None
+
+    @property
+    def model(self):
+        return self._store
+
+    @property
+    def elements(self):
+        return list(self._store._iter_children(self._row))
+
+    def get(self, element_id):
+        for child in self._store._iter_children(self._row):
+            if child.id == element_id:
+                return child
+        raise ElementNotFoundError("Element with id " + str(element_id) + " is not part of the current model.")
+
+    def __iter__(self):
+        return self._store._iter_children(self._row)
+
+    def __contains__(self, element):
+        return any(child.id == element.id for child in self._store._iter_children(self._row))
+
+    def update(self, **kwargs):
+        if "name" in kwargs:
+            self.name = kwargs["name"]
+
+        if "label" in kwargs:
+            self.label = kwargs["label"]
+
+        if "field-type" in kwargs and self._store._types[self._row] != -1:
+            self.type = kwargs["field-type"]
+
+    def to_dict(self):
+        object_dict = {attribute: getattr(self, attribute) for attribute in self.attributes_for_dict}
+        if issubclass(self.element_class, Container):
+            object_dict["_elements"] = {element.id: element.to_dict() for element in self}
+        object_dict["class"] = self.element_class.__name__
+        return object_dict
+
+    def convert_to_tree_view_dict(self):
+        text = self.label
+        if text is None or text == "":
+            text = self.name
+        tree_view_dict = {"id": self.id, "state": {"opened": True}, "type": self.element_class.__name__,
+                          "text": text, "name": self.name, "label": self.label}
+        if self._store._types[self._row] != -1:
+            tree_view_dict["field_type"] = self.type
+        if issubclass(self.element_class, Container):
+            tree_view_dict["children"] = [child.convert_to_tree_view_dict() for child in self]
+        return tree_view_dict
+
+    def __hash__(self):
+        return hash((id(self._store), self._row))
+
+    def __eq__(self, other):
+        if isinstance(other, CompactElement):
+            if self.element_class != other.element_class:
+                return False
+        elif self.element_class != type(other):
+            return False
+
+        if self.id != other.id or self.deleted != other.deleted:
+            return False
+
+        parent, other_parent = self.parent_container, other.parent_container
+        if (parent is None) != (other_parent is None):
+            return False
+        if parent is not None and parent.id != other_parent.id:
+            return False
+
+        return self.name == getattr(other, 'name', None) and self.label == getattr(other, 'label', None)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __str__(self):
+        return "%d %s" % (self.id, self.name)
@@ -1,5 +1,7 @@
 from utilities.exceptions import ElementNotFoundError
+from metamodel.element import Element
 from metamodel.named_element import NamedElement
+from metamodel.traversal import iter_depth_first, iter_breadth_first
 from utilities.utilities import get_class_from_parent_module
 import json
 from json import JSONEncoder
@@ -30,6 +32,9 @@ class Container(NamedElement, metaclass=MetaEClass):
         **kwargs
     ):
         super().__init__(_id, name, deleted, label, model, container)
+        # id -> position in _elements, rebuilt when _elements changed behind add's back.
+        self._positions = None
+        self._indexed_length = 0
 
     @property
     def elements(self):
@@ -37,19 +42,32 @@ class Container(NamedElement, metaclass=MetaEClass):
 
     @elements.setter
     def elements(self, elements):
-        self._elements = EOrderedSet()
+        self._elements.clear()
         for _id, element in elements.items():
             self._elements.append(element)
+        self._positions = None
+        self.invalidate_content_hash()
 
     def get_element(self, id_):
         return self._elements[id_]
 
     def add(self, element):
+        if self.model is not None:
+            self.model.before_insert(self, element)
+        if isinstance(element.eContainer(), Element):
+            element.eContainer().invalidate_content_hash()
+        self.invalidate_content_hash()
         if element not in self:
             self._elements.append(element)
+            self._positions.setdefault(element.id, len(self._elements) - 1)
+            self._indexed_length = len(self._elements)
 
         element.parent_container = self
-        element.model = self.model
+        # The whole subtree joins the model, or a forked model would miss edits below element.
+        for subelement in iter_depth_first(element):
+            subelement.model = self.model
+        if self.model is not None:
+            self.model.index_elements(element)
 
     def __contains__(self, element):
         return self.find_element_by_index(element.id) != -1
@@ -59,10 +77,26 @@ class Container(NamedElement, metaclass=MetaEClass):
             yield element
 
     def find_element_by_index(self, element_id):
-        for index in range(len(self._elements)):
-            if self._elements[index].id == element_id:
-                return index
-        return -1
+        positions = self._get_positions()
+        index = positions.get(element_id, -1)
+        if index != -1 and self._elements[index].id != element_id:
+            # A child's id changed without going through Element.id.
+            positions = self._get_positions(rebuild=True)
+            index = positions.get(element_id, -1)
+        return index
+
+    def _get_positions(self, rebuild=False):
+        # Removals (Model.remove_element, pyecore moving a child to another container) go
+        # straight to _elements; a length change is the sign to rebuild.
+        if rebuild or self._positions is None or self._indexed_length != len(self._elements):
+            self._positions = {}
+            for index, element in enumerate(self._elements):
+                self._positions.setdefault(element.id, index)
+            self._indexed_length = len(self._elements)
+        return self._positions
+
+    def forget_positions(self):
+        self._positions = None
 
     def get(self, element_id):
         index = self.find_element_by_index(element_id)
@@ -101,13 +135,21 @@ class Container(NamedElement, metaclass=MetaEClass):
         return new_object
 
     def get_all_subelements(self):
-        element_list = []
-        for element in self._elements:
-            element_list.append(element)
-            if isinstance(element, Container):
-                element_list.extend(element.get_all_subelements())
-
-        return element_list
+        return self.iter_depth_first()
+
+    def iter_depth_first(self, types=None):
+        """Yields every element under this container in pre-order, without the container."""
+        elements = iter_depth_first(self, types)
+        if types is None or isinstance(self, types):
+            next(elements)
+        return elements
+
+    def iter_breadth_first(self, types=None):
+        """Yields every element under this container level by level, without the container."""
+        elements = iter_breadth_first(self, types)
+        if types is None or isinstance(self, types):
+            next(elements)
+        return elements
 
     def __hash__(self):
         return id(self)
@@ -116,24 +158,21 @@ class Container(NamedElement, metaclass=MetaEClass):
         if not super(Container, self).__eq__(other):
             return False
 
-        if len(self._elements) != len(other.elements):
-            return False
+        return self.content_hash == other.content_hash
 
+    def update_content_digest(self, digest):
+        super().update_content_digest(digest)
         for element in self._elements:
-            if element.id not in other.elements:
-                return False
-
-            other_element = other.elements.get(element.id)
-            if element != other_element:
-                return False
-
-        return True
+            digest.update(element.content_hash)
 
     def __ne__(self, other):
         return not self == other
 
     def to_dict(self):
-        return ContainerJSONEncoder().default(self)
+        object_dict = {attribute: getter(self) for attribute, getter in self.get_field_plan()}
+        object_dict["_elements"] = {element.id: element.to_dict() for element in self._elements}
+        object_dict["class"] = type(self).__name__
+        return object_dict
 
     def convert_to_tree_view_dict(self):
         parent_dict = super().convert_to_tree_view_dict()
@@ -148,16 +187,7 @@ class ContainerJSONEncoder(JSONEncoder):
     def default(self, object_):
 
         if isinstance(object_, Container):
-
-            object_dict = {}
-            for attr in object_.attributes_for_dict:
-                object_dict[attr] = getattr(object_, attr)
-
-            elements = {element.id: element.to_dict() for element in object_.elements}
-
-            object_dict["_elements"] = elements
-            object_dict["class"] = type(object_).__name__
-            return object_dict
+            return object_.to_dict()
 
         else:
 
@@ -1,7 +1,13 @@
 import json
+import hashlib
 from json import JSONEncoder
+from operator import attrgetter
 from pyecore.ecore import *
 
+# Per class, the (attribute, getter) pairs to_dict reads. Compiled from the attributes_for_dict of the first
+# instance, which every class builds the same way in __init__.
+_field_plans = {}
+
 
 class Element(EObject, metaclass=MetaEClass):
 
@@ -20,15 +26,57 @@ class Element(EObject, metaclass=MetaEClass):
         self._model = model
 
         self._deleted = deleted
+        # Digest of attributes_for_dict and, for containers, the children's digests. None until asked for and
+        # after any change below this element.
+        self._content_hash = None
 
         self.attributes_for_dict = ['_deleted', '_id']
 
+    def __setattr__(self, name, value):
+        if name in self.__dict__.get('attributes_for_dict', ()):
+            # Lets a forked model keep the previous state of the element for the frozen version, see Model.fork.
+            # Not read from __dict__: once make() turns _model into an EReference, __dict__ holds its EValue.
+            model = self._model
+            if model is not None:
+                model.before_update(self, name, value)
+            self.invalidate_content_hash()
+        super().__setattr__(name, value)
+
+    @property
+    def content_hash(self):
+        content_hash = self.__dict__.get('_content_hash')
+        if content_hash is None:
+            digest = hashlib.blake2b(digest_size=16)
+            self.update_content_digest(digest)
+            content_hash = self._content_hash = digest.digest()
+        return content_hash
+
+    def update_content_digest(self, digest):
+        digest.update(type(self).__name__.encode())
+        for attribute in self.attributes_for_dict:
+            digest.update(b'\0' + repr(getattr(self, attribute)).encode())
+
+    def invalidate_content_hash(self):
+        # An element whose hash is cached has all of its subtree cached, so the walk can stop at the first
+        # ancestor that has none.
+        element = self
+        while isinstance(element, Element) and element.__dict__.get('_content_hash') is not None:
+            element._content_hash = None
+            element = element.eContainer()
+
     @property
     def id(self):
         return self._id
 
     @id.setter
     def id(self, id_):
+        if self._id != id_:
+            if self._model is not None:
+                self._model.reindex_element(self, self._id, id_)
+            # eContainer is set for loaded elements too, unlike parent_container.
+            container = self.eContainer()
+            if hasattr(container, 'forget_positions'):
+                container.forget_positions()
         self._id = id_
 
     @property
@@ -89,8 +137,17 @@ class Element(EObject, metaclass=MetaEClass):
     def __ne__(self, other):
         return not self == other
 
+    def get_field_plan(self):
+        plan = _field_plans.get(type(self))
+        if plan is None:
+            plan = tuple((attribute, attrgetter(attribute)) for attribute in self.attributes_for_dict)
+            _field_plans[type(self)] = plan
+        return plan
+
     def to_dict(self):
-        return ElementJSONEncoder().default(self)
+        object_dict = {attribute: getter(self) for attribute, getter in self.get_field_plan()}
+        object_dict["class"] = type(self).__name__
+        return object_dict
 
     def get_first_level_dict(self):
         return {key: value for (key, value) in self.__dict__.items()}
@@ -106,13 +163,7 @@ class ElementJSONEncoder(JSONEncoder):
     def default(self, object_):
 
         if isinstance(object_, Element):
-
-            object_dict = {}
-            for attr in object_.attributes_for_dict:
-                object_dict[attr] = getattr(object_, attr)
-
-            object_dict["class"] = type(object_).__name__
-            return object_dict
+            return object_.to_dict()
 
         else:
 
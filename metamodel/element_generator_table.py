@@ -1,8 +1,14 @@
 import dill
 import json
+import struct
 from utilities.exceptions import ElementNotFoundError, GeneratorNotFoundError
+from versioning.snapshot import write_snapshot, SnapshotReader
 import os
 
+# Snapshot record: element id, generator id, value kind and last generated version. Kinds 0 and 1 are the
+# {"value", "last_generated_version"} pairs, 2 and 3 the bare booleans change_generator_status stores.
+_SNAPSHOT_RECORD = struct.Struct('<qqbq')
+
 
 class ElementGeneratorTable(object):
 
@@ -25,6 +31,49 @@ class ElementGeneratorTable(object):
         with open(path, "rb") as file:
             return dill.load(file)
 
+    @staticmethod
+    def _pack_table(table):
+        records = []
+        for key, values in table.items():
+            for other_key, value in values.items():
+                if isinstance(value, dict):
+                    kind, last_generated_version = int(bool(value["value"])), value["last_generated_version"]
+                elif isinstance(value, bool):
+                    kind, last_generated_version = 2 + int(value), -1
+                else:
+                    raise ValueError("Cannot snapshot table value %r." % (value,))
+                records.append(_SNAPSHOT_RECORD.pack(key, other_key, kind, last_generated_version))
+        return b''.join(records)
+
+    @staticmethod
+    def _unpack_table(data):
+        table = {}
+        for key, other_key, kind, last_generated_version in _SNAPSHOT_RECORD.iter_unpack(data):
+            if kind < 2:
+                value = {"value": bool(kind), "last_generated_version": last_generated_version}
+            else:
+                value = bool(kind - 2)
+            table.setdefault(key, {})[other_key] = value
+        return table
+
+    def save_to_snapshot(self, path=None):
+        if path is None:
+            path = "../files/table.snapshot"
+
+        sections = {0: self._pack_table(self._by_element), 1: self._pack_table(self._by_generator)}
+        write_snapshot(path, "ElementGeneratorTable", {}, sections)
+
+    @staticmethod
+    def load_from_snapshot(path=None):
+        if path is None:
+            path = "../files/table.snapshot"
+
+        table = ElementGeneratorTable()
+        with SnapshotReader(path, "ElementGeneratorTable") as reader:
+            table._by_element = ElementGeneratorTable._unpack_table(reader.read(0))
+            table._by_generator = ElementGeneratorTable._unpack_table(reader.read(1))
+        return table
+
     def to_json(self):
         table_by_element = {}
 
@@ -257,6 +306,15 @@ class ElementGeneratorTable(object):
     def has_generator_by_id(self, generator_id):
         return generator_id in self._by_generator
 
+    def get_referenced_versions(self):
+        """Model versions some element was last generated from, which diff generation still compares against."""
+        versions = set()
+        for generators in self._by_element.values():
+            for value in generators.values():
+                if isinstance(value, dict) and value["last_generated_version"] >= 0:
+                    versions.add(value["last_generated_version"])
+        return versions
+
     def update_last_generated_versions(self, element_id, generator_id, last_generated_version):
         self._by_element[element_id][generator_id] = {"value": True, "last_generated_version": last_generated_version}
 
@@ -0,0 +1,61 @@
+"""Element ids handed out from a high-water mark, the next id never given out, instead of searching the model for a
+free one. The mark only grows, so an id removed from the latest model is not reused and keeps meaning the same element
+in every version."""
+import threading
+
+FIRST_ID = 1
+
+
+class ElementIdAllocator(object):
+
+    def __init__(self, next_id=None, find_next_id=None):
+        # With next_id None the mark is not known yet; find_next_id works it out, once, on first use.
+        self._next_id = next_id
+        self._find_next_id = find_next_id
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _ensure_next_id(self):
+        if self._next_id is None:
+            self._next_id = self._find_next_id() if self._find_next_id is not None else FIRST_ID
+
+    @property
+    def next_id(self):
+        with self._lock:
+            self._ensure_next_id()
+            return self._next_id
+
+    def allocate(self):
+        return self.reserve(1).start
+
+    def reserve(self, count):
+        """Reserves count consecutive ids, e.g. for a bulk import, and returns them as a range."""
+        if count < 0:
+            raise ValueError("Cannot reserve %d ids." % count)
+
+        with self._lock:
+            self._ensure_next_id()
+            start = self._next_id
+            self._next_id += count
+        return range(start, start + count)
+
+    def observe(self, element_id):
+        """Moves the mark past an id that was given out elsewhere, such as in an imported model. Does nothing while
+        the mark is not known, since working it out will see the id."""
+        with self._lock:
+            if self._next_id is not None and element_id >= self._next_id:
+                self._next_id = element_id + 1
+
+    @staticmethod
+    def highest_id(models):
+        """The highest element id in any of the models, FIRST_ID - 1 when they have no elements."""
+        return max((element.id for model in models for element in model if element.id is not None),
+                   default=FIRST_ID - 1)
@@ -1,13 +1,43 @@
 from utilities.exceptions import ElementNotFoundError
 from utilities.utilities import get_class_from_parent_module
+from utilities import json_codec
 
 from metamodel.project import Project
 
 import json
 from json import JSONEncoder
+from collections import namedtuple
 
 from pyecore.ecore import *
 from metamodel.element import Element
+from metamodel.container import Container
+from metamodel.traversal import iter_depth_first, iter_breadth_first
+
+# What an element looked like in a frozen version: its class, the values of its attributes_for_dict and the ids of
+# its children (None for non-containers). A state with type None marks an id the version did not have.
+ElementState = namedtuple('ElementState', ['type', 'values', 'children'])
+
+
+def capture_state(element):
+    values = {attribute: getattr(element, attribute) for attribute in element.attributes_for_dict}
+    children = tuple(child.id for child in element) if isinstance(element, Container) else None
+    return ElementState(type(element), values, children)
+
+
+def build_element(find_state, element_id):
+    """Builds the element element_id and its subtree from the ElementStates find_state returns for their ids."""
+    state = find_state(element_id)
+    if state is None:
+        return None
+
+    element = state.type()
+    for attribute, value in state.values.items():
+        setattr(element, attribute, value)
+    for child_id in state.children or ():
+        child = build_element(find_state, child_id)
+        if child is not None:
+            element.add(child)
+    return element
 
 
 class Model(EObject, metaclass=MetaEClass):
@@ -21,6 +51,16 @@ class Model(EObject, metaclass=MetaEClass):
         super().__init__(**kwargs)
 
         self._version = version
+        # id -> element for every element under root, and their count. Built on the first lookup,
+        # then kept up to date by Container.add and remove_element.
+        self._elements_by_id = None
+        self._element_count = None
+        # Versioning, see fork(). A live model records preimages into _predecessor before it changes; a frozen
+        # model has no tree of its own until materialized and reads through _successor instead.
+        self._predecessor = None
+        self._successor = None
+        self._preimages = None
+        self._root_id = None
         if root_element is not None:
             self._root = root_element
 
@@ -34,20 +74,38 @@ class Model(EObject, metaclass=MetaEClass):
 
     @property
     def root(self):
+        if self._successor is not None:
+            self.materialize()
         return self._root
 
     @root.setter
     def root(self, root):
+        if self._predecessor is not None:
+            self._predecessor.materialize()
         self._root = root
+        self._elements_by_id = None
+        self._element_count = None
 
     def iter_recursively(self, node=None):
+        return self.iter_depth_first(node)
+
+    def iter_depth_first(self, node=None, types=None):
+        if self._successor is not None:
+            self.materialize()
         if node is None:
             node = self._root
-        list = [node]
-        if hasattr(node, '__iter__'):
-            for subnode in node:
-                list.extend(self.iter_recursively(subnode))
-        return list
+            if node is None:
+                return iter(())
+        return iter_depth_first(node, types)
+
+    def iter_breadth_first(self, node=None, types=None):
+        if self._successor is not None:
+            self.materialize()
+        if node is None:
+            node = self._root
+            if node is None:
+                return iter(())
+        return iter_breadth_first(node, types)
 
     @property
     def elements(self):
@@ -65,11 +123,154 @@ class Model(EObject, metaclass=MetaEClass):
     #         self._elements.append(element)
     #         element.model = self
 
+    def fork(self, version):
+        """Moves this model on to version and returns a frozen model standing in for the version it held. Nothing
+        is copied: from now on this model saves the previous state of whatever it changes into the frozen model,
+        which reads everything else through this one."""
+        frozen = Model(version=self._version)
+        frozen._successor = self
+        frozen._preimages = {}
+        frozen._root_id = self._root.id if self._root is not None else None
+
+        # A predecessor that was materialized holds its own tree and must not be linked again.
+        if self._predecessor is not None and self._predecessor._successor is self:
+            self._predecessor._successor = frozen
+        self._predecessor = frozen
+        self._version = version
+        return frozen
+
+    @property
+    def frozen(self):
+        """Whether this version still reads the elements it did not record through a later one, see fork."""
+        return self._successor is not None
+
+    def detach_predecessor(self, materialize=True):
+        """Materializes the frozen model of the previous version and drops the link to it, so it can be freed.
+        With materialize=False the previous version is dropped as it is, for when nothing reads it any more."""
+        if self._predecessor is not None:
+            if materialize:
+                self._predecessor.materialize()
+            self._predecessor = None
+
+    def materialize(self):
+        """Builds a frozen model's own element tree. Called on first access to its elements; a no-op otherwise."""
+        if self._successor is None:
+            return
+
+        root = build_element(self._find_state, self._root_id) if self._root_id is not None else None
+        self._successor = None
+        self._preimages = None
+        self._root_id = None
+        self.root = root
+        self.adopt_elements()
+
+    def _find_state(self, element_id):
+        model = self
+        while model._successor is not None:
+            state = model._preimages.get(element_id)
+            if state is not None:
+                return state if state.type is not None else None
+            model = model._successor
+
+        element = model.find_element(element_id)
+        return capture_state(element) if element is not None else None
+
+    def _record_preimage(self, element):
+        if self._preimages is not None and element.id not in self._preimages:
+            self._preimages[element.id] = capture_state(element)
+
+    def _record_absent(self, element_id):
+        if self._preimages is not None and element_id not in self._preimages:
+            self._preimages[element_id] = ElementState(None, None, None)
+
+    def before_update(self, element, attribute=None, value=None):
+        """Called by elements of this model before one of their attributes_for_dict changes."""
+        predecessor = self._predecessor
+        if predecessor is None:
+            return
+        predecessor._record_preimage(element)
+        if attribute == '_id' and value != element.id:
+            # The container's list of child ids changes with it.
+            if isinstance(element.eContainer(), Element):
+                predecessor._record_preimage(element.eContainer())
+            predecessor._record_absent(value)
+
+    def before_insert(self, container, element):
+        """Called by Container.add before element goes into container, which belongs to this model."""
+        predecessor = self._predecessor
+        if predecessor is None:
+            return
+        predecessor._record_preimage(container)
+
+        previous_container = element.eContainer()
+        if element.model is self and isinstance(previous_container, Element):
+            predecessor._record_preimage(previous_container)
+        else:
+            for subelement in self.iter_recursively(element):
+                predecessor._record_absent(subelement.id)
+
+    def before_removal(self, element):
+        predecessor = self._predecessor
+        if predecessor is None:
+            return
+        if isinstance(element.parent_container, Element):
+            predecessor._record_preimage(element.parent_container)
+        for subelement in self.iter_recursively(element):
+            predecessor._record_preimage(subelement)
+
+    def build_id_index(self):
+        if self._successor is not None:
+            self.materialize()
+        self._elements_by_id = {}
+        self._element_count = 0
+        if self._root is not None:
+            self.index_elements(self._root)
+
+    def adopt_elements(self):
+        """Points every element under root at this model and rebuilds the id index. Used for
+        deserialized models; pyecore's loader does not set Element.model."""
+        if self._root is not None:
+            for element in self.iter_recursively():
+                element.model = self
+        self.build_id_index()
+
+    def index_elements(self, element):
+        """Adds element and everything under it to the id index, if the index is built. Elements
+        already indexed were moved within the model and are not counted again."""
+        if self._elements_by_id is None:
+            return
+        for subelement in self.iter_recursively(element):
+            if self._elements_by_id.get(subelement.id) is not subelement:
+                self._element_count += 1
+                self._elements_by_id.setdefault(subelement.id, subelement)
+
+    def unindex_elements(self, element):
+        if self._elements_by_id is None:
+            return
+        for subelement in self.iter_recursively(element):
+            self._element_count -= 1
+            if self._elements_by_id.get(subelement.id) is subelement:
+                del self._elements_by_id[subelement.id]
+
+    def reindex_element(self, element, old_id, new_id):
+        if self._elements_by_id is None:
+            return
+        if self._elements_by_id.get(old_id) is element:
+            del self._elements_by_id[old_id]
+            self._elements_by_id.setdefault(new_id, element)
+
     def find_element(self, element_id):
-        for element in self.elements:
-            if element.id == element_id:
-                return element
-        return None
+        if self._successor is not None:
+            self.materialize()
+        if self._elements_by_id is None:
+            self.build_id_index()
+
+        element = self._elements_by_id.get(element_id)
+        if element is not None and element.id != element_id:
+            # The element's id was changed after it was indexed.
+            self.build_id_index()
+            element = self._elements_by_id.get(element_id)
+        return element
 
     def get_element(self, element_id):
         element = self.find_element(element_id)
@@ -80,26 +281,29 @@ class Model(EObject, metaclass=MetaEClass):
 
     def remove_element(self, element):
         if hasattr(element, 'parent_container'):
+            self.before_removal(element)
+            element.parent_container.invalidate_content_hash()
             element.parent_container.elements.remove(element)
+            self.unindex_elements(element)
 
     def __contains__(self, item):
-        return self.find_element(item.id) != -1
+        return self.find_element(item.id) is not None
 
     def __getitem__(self, item):
         return self.get_element(item)
 
     def __iter__(self):
-        for element in self.iter_recursively(self._root):
-            yield element
+        return self.iter_depth_first()
 
     def __len__(self):
-        i = 0
-        for _ in self:
-            i += 1
-        return i
+        if self._successor is not None:
+            self.materialize()
+        if self._element_count is None:
+            self.build_id_index()
+        return self._element_count
 
     def to_json(self):
-        return json.dumps(self, cls=ModelJSONEncoder, default=lambda o: o.to_dict(), indent=4)
+        return json_codec.dumps(self.to_dict()).decode()
 
     @classmethod
     def from_json(cls, data):
@@ -107,24 +311,14 @@ class Model(EObject, metaclass=MetaEClass):
         if type(data) == str:
             data = json.loads(data)
 
-        root_element = data["_root_element"]
-        root_class = root_element["class"]
-        class_type = get_class_from_parent_module(root_class, "metamodel")
-        root_element_object = class_type.from_json(root_element)
-
         new_object = cls()
-        new_object._root_element = root_element_object
+        root_element = data["_root_element"]
+        if root_element is not None:
+            root_class = root_element["class"]
+            class_type = get_class_from_parent_module(root_class, "metamodel")
+            new_object.root = class_type.from_json(root_element)
         new_object.version = data['_version']
-
-        elements = {
-            root_element_object.id: root_element_object
-        }
-
-        for subelement in root_element_object.get_all_subelements():
-            elements[subelement.id] = subelement
-
-        for element in elements.values():
-            element.model = new_object
+        new_object.adopt_elements()
 
         return new_object
 
@@ -133,7 +327,11 @@ class Model(EObject, metaclass=MetaEClass):
         return Model.from_json(json)
 
     def to_dict(self):
-        return ModelJSONEncoder().default(self)
+        # Files written before kept a flat '_elements' copy of the tree as well; from_json never read it.
+        root = self.root
+        return {'_version': self._version,
+                '_root_element': root.to_dict() if root is not None else None,
+                'class': type(self).__name__}
 
     def get_first_level_dict(self):
         return {key: value for (key, value) in self.__dict__.items()}
@@ -146,25 +344,10 @@ class Model(EObject, metaclass=MetaEClass):
         if type(self) != type(other):
             return False
 
-        if self._root is not None and other.root is not None:
-            if self._root.id != other.root.id:
-                return False
+        if self.root is not None and other.root is not None:
+            return self._root.content_hash == other.root.content_hash
         else:
-            if self._root != other.root:
-                return False
-
-        if len(self) != len(other.elements):
-            return False
-
-        for element in self:
-            if element.id not in other.elements:
-                return False
-
-            other_element = other.elements.find_element(element.id)
-            if element != other_element:
-                return False
-
-        return True
+            return self._root == other.root
 
     def __ne__(self, other):
         return not self == other
@@ -189,18 +372,7 @@ class ModelJSONEncoder(JSONEncoder):
     def default(self, object_):
 
         if isinstance(object_, Model):
-
-            object_dict = {key: value for (key, value) in object_.__dict__.items() if key not in ['_elements',
-                                                                                                  '_root_element']}
-            elements = {}
-
-            for element in object_.elements:
-                elements[element.id] = element.to_dict()
-
-            object_dict['_elements'] = elements
-            object_dict['_root_element'] = object_.root.to_dict()
-            object_dict["class"] = type(object_).__name__
-            return object_dict
+            return object_.to_dict()
 
         else:
 
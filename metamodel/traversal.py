@@ -0,0 +1,31 @@
+from collections import deque
+
+
+def _children(node):
+    if hasattr(node, '__iter__'):
+        return node
+    return ()
+
+
+def iter_depth_first(node, types=None):
+    """Yields node and every element under it in pre-order, optionally only instances of types.
+    The tree is walked with an explicit stack of child iterators, so no list of it is built."""
+    stack = [iter((node,))]
+    while stack:
+        for element in stack[-1]:
+            if types is None or isinstance(element, types):
+                yield element
+            stack.append(iter(_children(element)))
+            break
+        else:
+            stack.pop()
+
+
+def iter_breadth_first(node, types=None):
+    """Yields node and every element under it level by level, optionally only instances of types."""
+    queue = deque((node,))
+    while queue:
+        element = queue.popleft()
+        if types is None or isinstance(element, types):
+            yield element
+        queue.extend(_children(element))
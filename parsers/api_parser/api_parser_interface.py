@@ -1,5 +1,5 @@
 from abc import ABCMeta, abstractmethod
-from typing import Any, Iterable, Tuple, Optional
+from typing import Any, Dict, Iterable, Tuple, Optional
 
 
 class IApiParser(metaclass=ABCMeta):
@@ -34,6 +34,17 @@ class IApiParser(metaclass=ABCMeta):
     def get_elements_by_jinja_variable(self, variable_name: str) -> Iterable[Any]:
         raise NotImplementedError
 
+    @abstractmethod
+    def get_elements_by_path_in_files(
+        self, path: str, file_paths: Iterable[str], stream: bool = False
+    ) -> Iterable[Dict[str, Any]]:
+        """
+        Evaluates path over every document in file_paths. Each result holds the
+        "file_path" and either its "elements" or an "error". With stream=True
+        results are yielded as the service completes them.
+        """
+        raise NotImplementedError
+
     # Mutation
     @abstractmethod
     def replace_element_by_id(self, id_: str, new_element_html: str) -> None:
@@ -1,6 +1,7 @@
 from __future__ import annotations
 import json
-from typing import Any, Iterable, Tuple, Optional
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, Tuple, Optional
 
 import requests
 
@@ -18,9 +19,19 @@ class HttpApiParser(IApiParser):
         self,
         base_url: str = "http://127.0.0.1:8000",
         default_file_path: Optional[str] = None,
+        validator_cache_size: int = 128,
+        profile: bool = False,
     ):
         self.base_url = base_url.rstrip("/")
         self.default_file_path = default_file_path
+        # Responses of conditional GETs keyed by URL and query, replayed when
+        # the service answers 304 Not Modified.
+        self.validator_cache_size = validator_cache_size
+        self._validators: "OrderedDict[Any, requests.Response]" = OrderedDict()
+        # Asks the service to profile every request; the id of the latest
+        # profile can be fetched from /profiles/<id>.
+        self.profile = profile
+        self.last_profile_id: Optional[str] = None
 
     # Internal helpers
     def _params(self, extra: Optional[dict[str, Any]] = None) -> dict[str, Any]:
@@ -31,17 +42,55 @@ class HttpApiParser(IApiParser):
             params.update({k: v for k, v in extra.items() if v is not None})
         return params
 
+    def _headers(self) -> dict[str, str]:
+        return {"X-Profile": "1"} if self.profile else {}
+
+    def _track_profile(self, response: requests.Response) -> None:
+        if self.profile:
+            self.last_profile_id = response.headers.get(
+                "X-Profile-Id", self.last_profile_id
+            )
+
     def _get(
         self, path: str, params: Optional[dict[str, Any]] = None
     ) -> requests.Response:
         url = f"{self.base_url}{path}"
-        response = requests.get(url, params=self._params(params))
+        query = self._params(params)
+        key = (url, tuple(sorted(query.items())))
+
+        headers = self._headers()
+        cached = self._validators.get(key)
+        if cached is not None:
+            headers["If-None-Match"] = cached.headers["ETag"]
+
+        response = requests.get(url, params=query, headers=headers)
+        self._track_profile(response)
+        if response.status_code == 304 and cached is not None:
+            self._validators.move_to_end(key)
+            return cached
+
         response.raise_for_status()
+        self._remember_validator(key, response)
         return response
 
+    def _remember_validator(self, key: Any, response: requests.Response) -> None:
+        if self.validator_cache_size <= 0 or "ETag" not in response.headers:
+            self._validators.pop(key, None)
+            return
+        self._validators[key] = response
+        self._validators.move_to_end(key)
+        while len(self._validators) > self.validator_cache_size:
+            self._validators.popitem(last=False)
+
+    def clear_validator_cache(self) -> None:
+        self._validators.clear()
+
     def _post(self, path: str, json_body: dict[str, Any]) -> requests.Response:
         url = f"{self.base_url}{path}"
-        response = requests.post(url, params=self._params(), json=json_body)
+        response = requests.post(
+            url, params=self._params(), json=json_body, headers=self._headers()
+        )
+        self._track_profile(response)
         response.raise_for_status()
         return response
 
@@ -49,7 +98,10 @@ class HttpApiParser(IApiParser):
         self, path: str, params: Optional[dict[str, Any]] = None
     ) -> requests.Response:
         url = f"{self.base_url}{path}"
-        response = requests.delete(url, params=self._params(params))
+        response = requests.delete(
+            url, params=self._params(params), headers=self._headers()
+        )
+        self._track_profile(response)
         response.raise_for_status()
         return response
 
@@ -89,6 +141,27 @@ class HttpApiParser(IApiParser):
         data = r.json()
         return data.get("elements", [])
 
+    def get_elements_by_path_in_files(
+        self, path: str, file_paths: Iterable[str], stream: bool = False
+    ) -> Iterable[Dict[str, Any]]:
+        url = f"{self.base_url}/multi/get-elements-by-path"
+        params: dict[str, Any] = {"path": path, "file_path": list(file_paths)}
+        if stream:
+            params["stream"] = "true"
+            return self._stream_results(url, params)
+
+        response = requests.get(url, params=params)
+        response.raise_for_status()
+        return response.json().get("results", [])
+
+    @staticmethod
+    def _stream_results(url: str, params: dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        with requests.get(url, params=params, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+
     # Mutation
     def replace_element_by_id(self, id_: str, new_element_html: str) -> None:
         body = {"id": id_, "new_element_html": new_element_html}
@@ -45,11 +45,13 @@ class MyLXMLParser(IParser):
         print(content.decode('UTF-8'))
         print()
 
+    def serialize(self):
+        return etree.tostring(self.tree, pretty_print=True).decode('UTF-8')
+
     def save_to_file(self, path):
         self.pretty_print(self.tree)
         file = open(path, "w")
-        content = etree.tostring(self.tree, pretty_print=True)
-        file.write(content.decode('UTF-8'))
+        file.write(self.serialize())
         file.close()
 
 
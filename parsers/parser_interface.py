@@ -76,4 +76,23 @@ class IParser:
     def remove_all_child_nodes_by_parent_path(self, path):
         raise NotImplementedError
 
-
+    def serialize(self):
+        """The document as text, as it would be written to its file. Parsers that return None are
+        written with their own write_to_file instead."""
+        return None
+
+    def is_modified(self):
+        """Whether the document changed since it was loaded or last saved. Parsers that do not
+        track their mutations are always considered modified."""
+        return True
+
+    def mark_saved(self):
+        pass
+
+    def begin_snapshot(self):
+        pass
+
+    def restore_snapshot(self):
+        """Returns False when the document cannot be restored from a snapshot and has to be
+        loaded again."""
+        return False
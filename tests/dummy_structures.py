@@ -3,6 +3,7 @@ from metamodel.project import Project
 from metamodel.document import Document
 from metamodel.field import Field
 
+from transformation.data_manipulation import DataManipulation
 from transformation.conflict_resolution.question_registry import QuestionRegistry
 from transformation.conflict_resolution.answer import Answer
 from transformation.conflict_resolution.question import Question
@@ -36,6 +37,21 @@ def dummy_data():
     return model
 
 
+def versioned_data():
+    # Version 0 is dummy_data(); 1 renames 89, 2 adds field 300 to 12, 3 removes 90 and 4 moves 89 to 12.
+    data_manipulation = DataManipulation()
+    data_manipulation.update_model(dummy_data())
+    changes = [lambda model: model.get_element(89).update(name="Renamed"),
+               lambda model: model.get_element(12).add(Field(300, "New", False, None, None)),
+               lambda model: model.remove_element(model.get_element(90)),
+               lambda model: model.get_element(12).add(model.get_element(89))]
+    for change in changes:
+        data_manipulation.update_model_after_generation()
+        change(data_manipulation.get_latest_model())
+
+    return data_manipulation
+
+
 def question_registry():
     question_registry = QuestionRegistry()
     q1 = Question("Test question 1", "What?")
@@ -0,0 +1,83 @@
+import unittest
+import os
+import tempfile
+from parsers.parser_interface import IParser
+from transformation.generators.diff_generators.document_diff_generator import DocumentDiffGenerator
+
+
+class WritingParser(IParser):
+    """A parser that can only write itself to a file."""
+
+    def __init__(self, file_path):
+        pass
+
+    def write_to_file(self, file_path):
+        with open(file_path, "w") as file:
+            file.write("Written by the parser")
+
+
+class DiffGeneratorFlushTest(unittest.TestCase):
+
+    def test_flush_skips_documents_that_were_only_read(self):
+        parser = self.generator.get_parser(self.file_path)
+        parser.check_if_element_exists(1)
+
+        self.generator.flush()
+
+        assert not parser.is_modified()
+        assert os.stat(self.file_path).st_mtime_ns == self.mtime
+
+    def test_flush_writes_modified_documents(self):
+        parser = self.generator.get_parser(self.file_path)
+        parser.remove_element_by_id(2)
+        assert parser.is_modified()
+
+        self.generator.flush()
+
+        assert not parser.is_modified()
+        with open(self.file_path) as file:
+            assert 'id="2"' not in file.read()
+
+    def test_flush_skips_unchanged_output(self):
+        parser = self.generator.get_parser(self.file_path)
+        parser.remove_element_by_id(2)
+        self.generator.flush()
+        mtime = os.stat(self.file_path).st_mtime_ns
+
+        parser.merge_nodes(parser.get_element_by_id(1), parser.get_element_by_id(1))
+        assert parser.is_modified()
+        self.generator.flush()
+
+        assert os.stat(self.file_path).st_mtime_ns == mtime
+
+    def test_flush_detects_reparsed_documents(self):
+        parser = self.generator.get_parser(self.file_path)
+        parser.parser.parseStr('<div _id="3">New</div>')
+
+        DocumentDiffGenerator.flush_workers = 2
+        self.generator.flush()
+
+        with open(self.file_path) as file:
+            assert '_id="3"' in file.read()
+
+    def test_flush_parser_without_serialize(self):
+        self.generator.parser_type = WritingParser
+        self.generator.get_parser(self.file_path)
+
+        self.generator.flush()
+
+        with open(self.file_path) as file:
+            assert file.read() == "Written by the parser"
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.directory.name, "document.html")
+        with open(self.file_path, "w") as file:
+            file.write('<div id="1"><p id="2">Text</p></div>')
+        self.mtime = os.stat(self.file_path).st_mtime_ns
+
+        self.generator = DocumentDiffGenerator()
+
+    def tearDown(self):
+        DocumentDiffGenerator.flush_workers = None
+        self.directory.cleanup()
@@ -0,0 +1,57 @@
+import unittest
+import os
+import tempfile
+from transformation.generators.diff_generators.document_diff_generator import DocumentDiffGenerator
+
+
+class DiffGeneratorSnapshotTest(unittest.TestCase):
+
+    def test_restore_undoes_mutations(self):
+        parser = self.generator.get_parser(self.file_path)
+        html = str(parser)
+
+        self.generator.snapshot()
+        parser.remove_element_by_id(2)
+        self.generator.restore()
+
+        assert self.generator.get_parser(self.file_path) is parser
+        assert str(parser) == html
+        assert not parser.is_modified()
+
+    def test_restore_keeps_untouched_documents(self):
+        parser = self.generator.get_parser(self.file_path)
+        root = parser.parser.root
+
+        self.generator.snapshot()
+        parser.check_if_element_exists(1)
+        self.generator.restore()
+
+        assert parser.parser.root is root
+
+    def test_restore_covers_documents_opened_during_preview(self):
+        self.generator.snapshot()
+        parser = self.generator.get_parser(self.file_path)
+        html = str(parser)
+        parser.parser.parseStr('<div id="3">New</div>')
+        self.generator.restore()
+
+        assert str(parser) == html
+
+    def test_restore_without_snapshot_reloads(self):
+        parser = self.generator.get_parser(self.file_path)
+        parser.remove_element_by_id(2)
+
+        self.generator.restore()
+
+        assert 'id="2"' in str(self.generator.get_parser(self.file_path))
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.directory.name, "document.html")
+        with open(self.file_path, "w") as file:
+            file.write('<div id="1"><p id="2">Text</p></div>')
+
+        self.generator = DocumentDiffGenerator()
+
+    def tearDown(self):
+        self.directory.cleanup()
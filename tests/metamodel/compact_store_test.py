@@ -0,0 +1,50 @@
+import unittest
+from metamodel.compact_store import CompactElementStore
+from metamodel.typed_field import TypedField
+from utilities.exceptions import ElementNotFoundError
+from tests.dummy_structures import dummy_data
+
+
+class CompactElementStoreTest(unittest.TestCase):
+
+    def test_elements_match_model(self):
+        assert len(self.store) == len(self.model)
+        for element, compact_element in zip(self.model, self.store):
+            assert compact_element == element
+            assert compact_element.to_dict() == element.to_dict()
+            assert compact_element.convert_to_tree_view_dict() == element.convert_to_tree_view_dict()
+
+    def test_structure(self):
+        document = self.store.get_element(11)
+
+        assert [field.id for field in document] == [89, 90, 91]
+        assert document.parent_container.id == 1
+        assert self.store.root.parent_container is None
+        assert document.get(90).name == self.model.get_element(90).name
+
+        with self.assertRaises(ElementNotFoundError):
+            self.store.get_element(999)
+
+    def test_update(self):
+        field = self.store.get_element(89)
+        field.update(name="Renamed", label="Label")
+
+        assert field.name == "Renamed"
+        assert field.label == "Label"
+        assert self.store.get_element(89).name == "Renamed"
+
+    def test_round_trip(self):
+        self.model.get_element(12).add(TypedField(94, "Typed", "int", False, "Typed"))
+        store = CompactElementStore.from_model(self.model)
+        model = store.to_model()
+
+        assert len(model) == len(self.model)
+        for element, copy in zip(self.model, model):
+            assert copy is not element
+            assert copy.to_dict() == element.to_dict()
+        assert model.get_element(94).type == "int"
+
+    def setUp(self):
+        self.model = dummy_data()
+        self.model.version = 3
+        self.store = CompactElementStore.from_model(self.model)
@@ -0,0 +1,49 @@
+import unittest
+from metamodel.field import Field
+from utilities.exceptions import ElementNotFoundError
+from tests.dummy_structures import dummy_data
+
+
+class ContainerIndexTest(unittest.TestCase):
+
+    def test_get(self):
+        assert self.document.get(90).name == self.document.elements[1].name
+        assert self.document.find_element_by_index(91) == 2
+        assert self.document.find_element_by_index(999) == -1
+
+        with self.assertRaises(ElementNotFoundError):
+            self.document.get(999)
+
+    def test_add_is_idempotent(self):
+        field = Field(200, "New", False, None, None)
+        self.document.add(field)
+        self.document.add(field)
+
+        assert len(self.document.elements) == 4
+        assert self.document.find_element_by_index(200) == 3
+        assert field in self.document
+
+    def test_index_follows_remove(self):
+        self.model.remove_element(self.model.find_element(89))
+
+        assert self.document.find_element_by_index(89) == -1
+        assert self.document.find_element_by_index(90) == 0
+        assert self.document.find_element_by_index(91) == 1
+
+    def test_index_follows_move(self):
+        field = self.model.find_element(90)
+        self.model.find_element(12).add(field)
+
+        assert field not in self.document
+        assert self.document.find_element_by_index(91) == 1
+        assert self.model.find_element(12).find_element_by_index(90) == 2
+
+    def test_index_follows_id_change(self):
+        self.document.get(89).id = 300
+
+        assert self.document.find_element_by_index(300) == 0
+        assert self.document.find_element_by_index(89) == -1
+
+    def setUp(self):
+        self.model = dummy_data()
+        self.document = self.model.find_element(11)
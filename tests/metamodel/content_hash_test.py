@@ -0,0 +1,49 @@
+import unittest
+from metamodel.field import Field
+from transformation.data_manipulation import DataManipulation
+from tests.dummy_structures import dummy_data
+
+
+class ContentHashTest(unittest.TestCase):
+
+    def test_equal_models(self):
+        assert self.model == dummy_data()
+        assert self.model.get_element(11) == dummy_data().get_element(11)
+        assert self.model.get_element(11) != self.model.get_element(12)
+
+    def test_update_changes_ancestors_only(self):
+        hashes = {element.id: element.content_hash for element in self.model}
+        self.model.get_element(89).update(name="Renamed")
+
+        changed = {element.id for element in self.model if element.content_hash != hashes[element.id]}
+        assert changed == {1, 11, 89}
+        assert self.model != dummy_data()
+
+    def test_add_and_remove(self):
+        root_hash = self.model.root.content_hash
+        field = Field(200, "New", False, None, None)
+        self.model.get_element(12).add(field)
+        assert self.model.root.content_hash != root_hash
+
+        self.model.remove_element(field)
+        assert self.model.root.content_hash == root_hash
+
+    def test_move(self):
+        self.model.get_element(12).add(self.model.get_element(89))
+
+        assert self.model.get_element(11).content_hash != dummy_data().get_element(11).content_hash
+        assert self.model.get_element(12).content_hash != dummy_data().get_element(12).content_hash
+
+    def test_element_changed_between_versions(self):
+        data_manipulation = DataManipulation()
+        data_manipulation.update_model(self.model)
+        data_manipulation.update_model_after_generation()
+        self.model.get_element(92).label = "Label"
+
+        assert data_manipulation.element_changed(12, 0)
+        assert data_manipulation.element_changed(92, 0)
+        assert not data_manipulation.element_changed(11, 0)
+        assert data_manipulation.element_changed(1, 0, 1)
+
+    def setUp(self):
+        self.model = dummy_data()
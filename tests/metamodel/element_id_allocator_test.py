@@ -0,0 +1,87 @@
+import unittest
+import os
+import tempfile
+import threading
+from metamodel.element_id_allocator import ElementIdAllocator
+from metamodel.field import Field
+from transformation.data_manipulation import DataManipulation
+from recreate_dummy_structures import make
+from tests.dummy_structures import dummy_data
+
+
+class ElementIdAllocatorTest(unittest.TestCase):
+
+    def test_ids_follow_the_highest_one(self):
+        assert self.data_manipulation.generate_new_element_id() == 94
+        assert self.data_manipulation.generate_new_element_id() == 95
+
+    def test_removed_ids_are_not_reused(self):
+        self.data_manipulation.update_model_after_generation()
+        model = self.data_manipulation.get_latest_model()
+        model.remove_element(model.get_element(93))
+
+        assert self.data_manipulation.generate_new_element_id() == 94
+
+    def test_imported_model_moves_the_mark(self):
+        self.data_manipulation.generate_new_element_id()
+        model = dummy_data()
+        model.get_element(12).add(Field(500, "Imported", False, None, None))
+        self.data_manipulation.update_model(model)
+
+        assert self.data_manipulation.generate_new_element_id() == 501
+
+    def test_reserve(self):
+        assert self.data_manipulation.reserve_element_ids(3) == range(94, 97)
+        assert self.data_manipulation.reserve_element_ids(0) == range(97, 97)
+        assert self.data_manipulation.generate_new_element_id() == 97
+        with self.assertRaises(ValueError):
+            self.data_manipulation.reserve_element_ids(-1)
+
+    def test_concurrent_allocation(self):
+        allocator = ElementIdAllocator(1)
+        allocated = []
+
+        def allocate():
+            ids = [allocator.allocate() for _ in range(1000)]
+            allocated.extend(ids)
+
+        threads = [threading.Thread(target=allocate) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(allocated) == list(range(1, 8001))
+
+    def test_mark_is_saved(self):
+        self.data_manipulation.reserve_element_ids(10)
+
+        json_path = os.path.join(self.directory.name, "model.json")
+        self.data_manipulation.save_to_json(json_path)
+        assert DataManipulation.load_from_json(json_path).generate_new_element_id() == 104
+
+        snapshot_path = os.path.join(self.directory.name, "model.snapshot")
+        self.data_manipulation.save_to_snapshot(snapshot_path)
+        assert DataManipulation.load_from_snapshot(snapshot_path).generate_new_element_id() == 104
+
+        sqlite_path = os.path.join(self.directory.name, "model.sqlite")
+        self.data_manipulation.save_to_sqlite(sqlite_path)
+        assert DataManipulation.load_from_sqlite(sqlite_path).generate_new_element_id() == 104
+
+        metamodel = make()
+        self.data_manipulation.save_to_xmi(metamodel, self.directory.name)
+        loaded = DataManipulation()
+        loaded.load_from_xmi(metamodel, self.directory.name)
+        assert loaded.generate_new_element_id() == 104
+        assert not loaded.versions.is_loaded(0)
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+        self.data_manipulation = DataManipulation()
+        self.data_manipulation.update_model(dummy_data())
+
+
+if __name__ == '__main__':
+    unittest.main()
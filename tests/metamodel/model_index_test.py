@@ -0,0 +1,61 @@
+import unittest
+from metamodel.field import Field
+from utilities.exceptions import ElementNotFoundError
+from tests.dummy_structures import dummy_data
+
+
+class ModelIndexTest(unittest.TestCase):
+
+    def test_find_element(self):
+        assert self.model.find_element(92).name == "Fifi4"
+        assert self.model.find_element(1) is self.model.root
+        assert self.model.find_element(999) is None
+
+        with self.assertRaises(ElementNotFoundError):
+            self.model.get_element(999)
+
+    def test_index_follows_add(self):
+        self.model.find_element(1)
+        field = Field(200, "New", False, None, None)
+        self.model.find_element(12).add(field)
+
+        assert self.model.find_element(200) is field
+        assert field in self.model
+
+    def test_index_follows_remove(self):
+        self.model.find_element(1)
+        self.model.remove_element(self.model.find_element(12))
+
+        assert self.model.find_element(12) is None
+        assert self.model.find_element(92) is None
+        assert self.model.find_element(89) is not None
+
+    def test_index_follows_id_change(self):
+        field = self.model.find_element(89)
+        field.id = 300
+
+        assert self.model.find_element(300) is field
+        assert self.model.find_element(89) is None
+
+    def test_index_matches_traversal(self):
+        for element in self.model:
+            assert self.model.find_element(element.id) is element
+
+    def test_len_follows_add_and_remove(self):
+        assert len(self.model) == 8
+
+        self.model.find_element(12).add(Field(200, "New", False, None, None))
+        assert len(self.model) == 9
+
+        self.model.remove_element(self.model.find_element(11))
+        assert len(self.model) == 5
+
+    def test_len_ignores_moves(self):
+        len(self.model)
+        self.model.find_element(12).add(self.model.find_element(89))
+
+        assert len(self.model) == 8
+        assert len(self.model) == len(list(self.model))
+
+    def setUp(self):
+        self.model = dummy_data()
@@ -0,0 +1,35 @@
+import unittest
+from metamodel.document import Document
+from metamodel.field import Field
+from tests.dummy_structures import dummy_data
+
+
+class ModelTraversalTest(unittest.TestCase):
+
+    def test_depth_first(self):
+        ids = [element.id for element in self.model.iter_depth_first()]
+        assert ids == [1, 11, 89, 90, 91, 12, 92, 93]
+
+    def test_breadth_first(self):
+        ids = [element.id for element in self.model.iter_breadth_first()]
+        assert ids == [1, 11, 12, 89, 90, 91, 92, 93]
+
+    def test_type_filter(self):
+        documents = [element.id for element in self.model.iter_depth_first(types=Document)]
+        assert documents == [11, 12]
+
+        fields = [element.id for element in self.model.iter_breadth_first(types=Field)]
+        assert fields == [89, 90, 91, 92, 93]
+
+    def test_container_traversal_excludes_container(self):
+        project = self.model.root
+        assert [element.id for element in project.get_all_subelements()] == [11, 89, 90, 91, 12, 92, 93]
+        assert [element.id for element in project.iter_breadth_first(types=Document)] == [11, 12]
+        assert list(self.model.find_element(89).parent_container.iter_depth_first(types=Document)) == []
+
+    def test_traversal_is_lazy(self):
+        elements = self.model.iter_depth_first()
+        assert next(elements).id == 1
+
+    def setUp(self):
+        self.model = dummy_data()
@@ -0,0 +1,122 @@
+import unittest
+import random
+from metamodel.field import Field
+from metamodel.document import Document
+from transformation.data_manipulation import DataManipulation
+from tests.dummy_structures import dummy_data
+
+
+class ModelVersionTest(unittest.TestCase):
+
+    def test_new_version_shares_elements(self):
+        latest = self.data_manipulation.get_latest_model()
+
+        assert latest.version == 1
+        assert self.data_manipulation.get_latest_version_number() == 1
+        assert self.previous._preimages == {}
+
+    def test_previous_version_keeps_updated_attributes(self):
+        latest = self.data_manipulation.get_latest_model()
+        latest.get_element(89).update(name="Renamed", label="New label")
+
+        assert latest.get_element(89).name == "Renamed"
+        assert self.previous.get_element(89).name == self.name_89
+        assert self.previous.get_element(89) is not latest.get_element(89)
+        assert self.previous.get_element(89).model is self.previous
+
+    def test_previous_version_keeps_removed_elements(self):
+        latest = self.data_manipulation.get_latest_model()
+        latest.remove_element(latest.get_element(11))
+
+        assert latest.find_element(89) is None
+        assert [field.id for field in self.previous.get_element(11)] == [89, 90, 91]
+        assert len(self.previous) == 8
+
+    def test_previous_version_misses_added_elements(self):
+        latest = self.data_manipulation.get_latest_model()
+        document = Document(300, "New", False, None, None)
+        document.add(Field(301, "Field", False, None, None))
+        latest.root.add(document)
+        latest.get_element(12).add(latest.get_element(89))
+
+        assert self.previous.find_element(300) is None
+        assert self.previous.find_element(301) is None
+        assert self.previous.get_element(89).parent_container.id == 11
+        assert [field.id for field in self.previous.get_element(12)] == [92, 93]
+
+    def test_previous_version_keeps_changed_ids(self):
+        latest = self.data_manipulation.get_latest_model()
+        latest.get_element(89).id = 400
+
+        assert self.previous.find_element(400) is None
+        assert self.previous.get_element(89).name == self.name_89
+        assert [field.id for field in self.previous.get_element(11)] == [89, 90, 91]
+
+    def test_version_chain(self):
+        latest = self.data_manipulation.get_latest_model()
+        latest.get_element(90).name = "Second"
+        self.data_manipulation.update_model_after_generation()
+        latest.get_element(90).name = "Third"
+
+        assert self.data_manipulation.get_model_by_version(0).get_element(90).name == self.name_90
+        assert self.data_manipulation.get_model_by_version(1).get_element(90).name == "Second"
+        assert self.data_manipulation.get_model_by_version(2).get_element(90).name == "Third"
+
+    def test_materialized_version_survives_next_fork(self):
+        latest = self.data_manipulation.get_latest_model()
+        self.previous.materialize()
+        self.data_manipulation.update_model_after_generation()
+        latest.get_element(90).name = "Third"
+
+        assert self.data_manipulation.get_model_by_version(0) is self.previous
+        assert self.previous.get_element(90).name == self.name_90
+        assert self.data_manipulation.get_model_by_version(1).get_element(90).name == self.name_90
+
+    def test_random_forks_and_edits(self):
+        # Subtrees are built before they are added to the model, so their children join it through the add.
+        for seed in range(100):
+            generator = random.Random(seed)
+            data_manipulation = DataManipulation()
+            data_manipulation.update_model(dummy_data())
+            copies = {}
+            next_id = [1000]
+
+            def new_id():
+                next_id[0] += 1
+                return next_id[0]
+
+            for step in range(40):
+                model = data_manipulation.get_latest_model()
+                documents = [element for element in model if isinstance(element, Document)]
+                elements = [element for element in model if element is not model.root]
+                operation = generator.choice(["add", "move", "rename", "re-id", "fork"])
+                if operation == "add":
+                    document = Document(new_id(), "Document", False, None, None)
+                    for _ in range(generator.randint(0, 2)):
+                        document.add(Field(new_id(), "Field", False, None, None))
+                    model.root.add(document)
+                elif operation == "move":
+                    fields = [element for element in elements if isinstance(element, Field)]
+                    if fields:
+                        generator.choice(documents).add(generator.choice(fields))
+                elif operation == "rename":
+                    generator.choice(elements).name = "Step %d" % step
+                elif operation == "re-id":
+                    generator.choice(elements).id = new_id()
+                else:
+                    copies[model.version] = model.deepcopy()
+                    data_manipulation.update_model_after_generation()
+
+            for version, copy in copies.items():
+                assert data_manipulation.get_model_by_version(version).to_dict() == copy.to_dict(), \
+                    "seed %d, version %d" % (seed, version)
+
+    def setUp(self):
+        self.data_manipulation = DataManipulation()
+        self.data_manipulation.update_model(dummy_data())
+        model = self.data_manipulation.get_latest_model()
+        self.name_89 = model.get_element(89).name
+        self.name_90 = model.get_element(90).name
+
+        self.data_manipulation.update_model_after_generation()
+        self.previous = self.data_manipulation.get_model_by_version(0)
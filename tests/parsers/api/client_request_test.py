@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import requests
+
+from parsers.api_parser.implementation.http_api_parser import HttpApiParser
+from parsers.api_parser.implementation.lxml_http_api_parser import LxmlHttpApiParser
+
+
+class _FakeResponse:
+    def __init__(self, status_code, payload=None, etag=None):
+        self.status_code = status_code
+        self._payload = payload
+        self.headers = {"ETag": etag} if etag else {}
+
+    def json(self):
+        return self._payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(response=self)
+
+
+def _fake_get(calls, etag='"v1"'):
+    def get(url, params=None, headers=None):
+        calls.append(headers or {})
+        if headers and headers.get("If-None-Match") == etag:
+            return _FakeResponse(304)
+        return _FakeResponse(200, {"element": "<li>Field (F1)</li>"}, etag)
+
+    return get
+
+
+def test_http_parser_replays_not_modified(monkeypatch):
+    calls = []
+    monkeypatch.setattr(requests, "get", _fake_get(calls))
+    parser = HttpApiParser(default_file_path="F1.html")
+
+    assert parser.get_element_by_id("1") == "<li>Field (F1)</li>"
+    assert parser.get_element_by_id("1") == "<li>Field (F1)</li>"
+    assert calls[0] == {}
+    assert calls[1] == {"If-None-Match": '"v1"'}
+
+
+def test_lxml_parser_replays_not_modified(monkeypatch):
+    calls = []
+    monkeypatch.setattr(requests, "get", _fake_get(calls))
+    parser = LxmlHttpApiParser(default_file_path="F1.html")
+
+    parser.get_element_by_id("1")
+    assert parser.get_element_by_id("1") == "<li>Field (F1)</li>"
+    assert calls[1] == {"If-None-Match": '"v1"'}
+
+
+def test_validator_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(requests, "get", _fake_get([]))
+    parser = HttpApiParser(default_file_path="F1.html", validator_cache_size=2)
+
+    for id_ in ("1", "2", "3"):
+        parser.get_element_by_id(id_)
+
+    assert len(parser._validators) == 2
+
+
+def test_profile_header_and_id_tracking(monkeypatch):
+    seen = []
+
+    def get(url, params=None, headers=None):
+        seen.append(headers)
+        response = _FakeResponse(200, {"element": "<li/>"}, '"v1"')
+        response.headers["X-Profile-Id"] = "42-abc"
+        return response
+
+    monkeypatch.setattr(requests, "get", get)
+    parser = HttpApiParser(default_file_path="F1.html", profile=True)
+
+    parser.get_element_by_id("1")
+    assert seen[0]["X-Profile"] == "1"
+    assert parser.last_profile_id == "42-abc"
@@ -0,0 +1,15 @@
+from pathlib import Path
+
+import pytest
+
+SERVICES_ROOT = Path(__file__).resolve().parents[3] / "api_helpers"
+SERVICES = ("SeamlessMDD-http-wrapper", "SeamlessMDD-lxml-http-parser")
+
+
+# Each parser service keeps its own copy of these modules, see their docstrings.
+@pytest.mark.parametrize("module", ["metrics.py", "profiling.py"])
+def test_service_copies_are_identical(module):
+    first, second = (
+        (SERVICES_ROOT / service / "app" / module).read_bytes() for service in SERVICES
+    )
+    assert first == second, "%s differs between the parser services" % module
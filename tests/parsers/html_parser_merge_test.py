@@ -0,0 +1,85 @@
+import unittest
+import random
+from parsers.my_html_parser import MyHTMLParser
+
+
+def nested_loop_merge(first_subtree, second_subtree):
+    """merge_nodes as it was before children were matched through _ChildIndex: each child of the second subtree
+    merges into the first child of the first subtree with its name and either its _id or its text, else is
+    appended. Children appended earlier in the same merge can be matched."""
+    MyHTMLParser.update_node(first_subtree, second_subtree)
+    if len(first_subtree.children) == 0:
+        for second_child in second_subtree.children:
+            first_subtree.appendChild(second_child)
+    else:
+        for second_child in second_subtree.children:
+            for first_child in first_subtree.children:
+                if second_child.nodeName == first_child.nodeName:
+                    if ('_id' in second_child.attributes and
+                        second_child.attributes['_id'] == first_child.attributes['_id']) or \
+                            second_child.innerText == first_child.innerText:
+                        nested_loop_merge(first_child, second_child)
+                        break
+            else:
+                first_subtree.appendChild(second_child)
+
+
+def parse(html):
+    parser = MyHTMLParser()
+    parser.parser.parseStr(html)
+    return parser
+
+
+def merged(first_html, second_html, merge=None):
+    first, second = parse(first_html), parse(second_html)
+    if merge is None:
+        first.merge_nodes(first.parser.root, second.parser.root)
+    else:
+        merge(first.parser.root, second.parser.root)
+    return first.parser.root.outerHTML
+
+
+def random_tree(generator, depth=0):
+    name = generator.choice(["p", "span"])
+    attributes = ' _id="%d"' % generator.randint(1, 3) if generator.random() < 0.6 else ""
+    children = "".join(random_tree(generator, depth + 1) for _ in range(generator.randint(0, 4 - depth * 2)))
+    return "<%s%s>%s%s</%s>" % (name, attributes, generator.choice(["a", "b", ""]), children, name)
+
+
+class HTMLParserMergeTest(unittest.TestCase):
+
+    def test_siblings_sharing_id(self):
+        self.assert_merges('<div><p _id="1">a</p><p _id="1">b</p></div>',
+                           '<div><p _id="1">c</p><p _id="1">d</p></div>',
+                           '<div ><p _id="1" >d</p><p _id="1" >b</p></div>')
+
+    def test_children_without_id(self):
+        self.assert_merges('<div><p>a</p><p>b</p></div>',
+                           '<div><p>b<i>x</i></p><p>z</p></div>',
+                           '<div ><p >a</p><p >b<i >x</i></p><p >z</p></div>')
+
+    def test_same_id_under_another_name(self):
+        self.assert_merges('<div><p _id="1">a</p></div>',
+                           '<div><span _id="1">b</span></div>',
+                           '<div ><p _id="1" >a</p><span _id="1" >b</span></div>')
+
+    def test_child_appended_in_the_same_merge(self):
+        self.assert_merges('<div><p>a</p></div>',
+                           '<div><span _id="5">x</span><span _id="5">y<i>z</i></span><p>a</p></div>',
+                           '<div ><p >a</p><span _id="5" >y<i >z</i></span></div>')
+
+    def test_random_trees(self):
+        generator = random.Random(0)
+        for _ in range(300):
+            first_html = "<div>%s</div>" % "".join(random_tree(generator, 1) for _ in range(generator.randint(1, 4)))
+            second_html = "<div>%s</div>" % "".join(random_tree(generator, 1) for _ in range(generator.randint(1, 4)))
+            assert merged(first_html, second_html) == merged(first_html, second_html, nested_loop_merge), \
+                (first_html, second_html)
+
+    def assert_merges(self, first_html, second_html, expected):
+        assert merged(first_html, second_html, nested_loop_merge) == expected
+        assert merged(first_html, second_html) == expected
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+from parsers.my_html_parser import MyHTMLParser
+from utilities.exceptions import ParsingError
+
+DOCUMENT = '<html><body><div _id="1"><a href="x/y">link</a></div></body></html>'
+
+
+class HTMLParserPathTest(unittest.TestCase):
+
+    def test_insert_under_missing_tags(self):
+        self.parser.insert_element_by_path("/html/body/div/section/ul/li", "<li>item</li>")
+        self.parser.insert_element_by_path("/html/body/div/nav/ol/li/b", "<b>bold</b>")
+
+        item = self.parser.resolve_elements("/html/body/div/section/ul/li")[0]
+        bold = self.parser.resolve_elements("/html/body/div/nav/ol/li/b")[0]
+        assert item.innerText == "item" and bold.innerText == "bold"
+        assert self.parser.get_element_xpath(item) == "/html/body/div/section/ul/li"
+        assert self.parser.get_element_xpath(bold) == "/html/body/div/nav/ol/li/b"
+        assert [child.nodeName for child in self.parser.resolve_elements("/html/body/div")[0].children] == \
+            ["a", "section", "nav"]
+
+    def test_quoted_slash_in_predicate(self):
+        path = "/html/body/div/a[@href='x/y']"
+
+        assert MyHTMLParser.split_xpath(path) == ["html", "body", "div", "a[@href='x/y']"]
+        steps, depth, elements = self.parser.resolve_path(path)
+        assert depth == 4 and [element.innerText for element in elements] == ["link"]
+
+    def test_other_paths_fall_back_to_xpath(self):
+        for path in ("//a", "/html//a", "/html/body/descendant::a", "/html/body/child::div"):
+            assert MyHTMLParser.split_xpath(path) is None
+            assert self.parser.resolve_elements(path) == list(self.parser.parser.getElementsByXPath(path))
+
+        assert self.parser.resolve_path("//nav") == (["//nav"], 0, [])
+        with self.assertRaises(ParsingError):
+            self.parser.insert_element_by_path("//nav/li", "<li>item</li>")
+
+    def test_prefixes_dropped_after_mutation(self):
+        assert self.parser.resolve_elements("/html/body/div/p") == []
+        assert len(self.parser.resolve_elements("//a")) == 1
+
+        self.parser.insert_element_by_path("/html/body/div/p", "<p>text</p>")
+        self.parser.delete_elements_by_path("/html/body/div/a")
+
+        assert [element.innerText for element in self.parser.resolve_elements("/html/body/div/p")] == ["text"]
+        assert self.parser.resolve_elements("//a") == []
+
+    def setUp(self):
+        self.parser = MyHTMLParser()
+        self.parser.parser.parseStr(DOCUMENT)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+from parsers.my_html_parser import MyHTMLParser
+
+DOCUMENT = '<html><body>' \
+           '<div id="a" _id="1"><p _id="2">First<b>bold</b></p><span>Other</span></div>' \
+           '<div id="c" _id="3"><p>Second</p></div>' \
+           '</body></html>'
+
+
+def element_paths(parser):
+    return [(parser.get_xpath_for_element(node), parser.get_element_xpath(node))
+            for node in parser.parser.getAllNodes()]
+
+
+class HTMLParserXPathCacheTest(unittest.TestCase):
+
+    def test_changed_id_in_prefix(self):
+        # update_element_by_id sets the attribute on the children of the element with that id.
+        self.parser.update_element_by_id("a", "_id", "9")
+
+        self.assert_cache_fresh()
+        bold = self.parser.parser.getElementsByTagName("b")[0]
+        assert "p[ @_id = 9 ]/b" in self.parser.get_xpath_for_element(bold)
+
+    def test_merge_changing_descendant_text(self):
+        division = self.parser.get_element_by_id("a")
+        paragraph = division.children[0]
+        new_parser = MyHTMLParser()
+        new_parser.parser.parseStr('<div _id="1"><p _id="2">Changed<b>bold</b></p></div>')
+
+        self.parser.merge_nodes(division, new_parser.parser.root)
+
+        self.assert_cache_fresh()
+        assert "[ text() = 'Changed' ]" in self.parser.get_xpath_for_element(paragraph)
+
+    def test_wrap_element(self):
+        paragraph = self.parser.get_element_by_id("a").children[0]
+
+        self.parser.wrap_element(paragraph, '<section></section>', [])
+
+        self.assert_cache_fresh()
+        assert self.parser.get_element_xpath(paragraph.children[0]) == "/html/body/div/section/p/b"
+
+    def test_remove_element(self):
+        assert len(self.parser.resolve_elements("/html/body/div")) == 2
+        self.parser.remove_element_by_id("c")
+
+        assert len(self.parser.resolve_elements("/html/body/div")) == 1
+        self.assert_cache_fresh()
+
+    def test_parse_str_swap(self):
+        assert len(self.parser.resolve_elements("/html/body/div")) == 2
+        self.parser.parser.parseStr('<html><body><main _id="5"><p>New</p></main></body></html>')
+
+        assert self.parser.resolve_elements("/html/body/div") == []
+        self.assert_cache_fresh()
+        paragraph = self.parser.parser.getElementsByTagName("p")[0]
+        assert self.parser.get_element_xpath(paragraph) == "/html/body/main/p"
+
+    def assert_cache_fresh(self):
+        cached = element_paths(self.parser)
+        self.parser.clear_xpath_cache()
+        assert cached == element_paths(self.parser)
+
+    def setUp(self):
+        self.parser = MyHTMLParser()
+        self.parser.parser.parseStr(DOCUMENT)
+        # Memoizes every path before the mutation.
+        element_paths(self.parser)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,22 @@
+import unittest
+from unittest import mock
+from utilities import utilities
+from utilities.utilities import get_class_from_parent_module
+from metamodel.field import Field
+from metamodel.document import Document
+
+
+class ClassRegistryTest(unittest.TestCase):
+
+    def test_package_is_walked_once(self):
+        utilities._class_registries.clear()
+        with mock.patch.object(utilities, "import_submodules", wraps=utilities.import_submodules) as walk:
+            for _ in range(100):
+                assert get_class_from_parent_module("Field", "metamodel") is Field
+                assert get_class_from_parent_module("Document", "metamodel") is Document
+
+        assert walk.call_count == 1
+
+    def test_unknown_class(self):
+        with self.assertRaises(ImportError):
+            get_class_from_parent_module("Unknown", "metamodel")
@@ -0,0 +1,111 @@
+import unittest
+import os
+import tempfile
+from metamodel.typed_field import TypedField
+from utilities import json_codec
+from transformation.data_manipulation import DataManipulation
+from versioning.delta_store import DeltaVersionStore
+from tests.dummy_structures import versioned_data
+
+
+class DeltaStoreTest(unittest.TestCase):
+
+    def test_rebuilds_every_version(self):
+        store = DeltaVersionStore(checkpoint_interval=3)
+        for version in range(5):
+            store.add(version, self.data_manipulation.get_model_by_version(version))
+
+        for version in range(5):
+            model = store.model(version)
+            assert model == self.data_manipulation.get_model_by_version(version)
+            assert model.version == version
+        assert store.model(3).find_element(90) is None
+        assert store.model(4).get_element(89).parent_container.id == 12
+
+    def test_stores_only_changes_between_checkpoints(self):
+        store = DeltaVersionStore(checkpoint_interval=4)
+        for version in range(5):
+            store.add(version, self.data_manipulation.get_model_by_version(version))
+
+        assert [store._entries[version][1] for version in range(5)] == [True, False, False, False, True]
+        assert sorted(store._entries[1][2]) == [89]
+        assert sorted(store._entries[2][2]) == [12, 300]
+        assert sorted(store._entries[3][2]) == [11, 90]
+        assert store._entries[3][2][90].type is None
+        assert len(store._entries[4][2]) == 8
+
+    def test_entries_round_trip(self):
+        self.data_manipulation.get_latest_model().get_element(12).add(TypedField(301, "Typed", "int"))
+        store = DeltaVersionStore(checkpoint_interval=3)
+        for version in range(5):
+            store.add(version, self.data_manipulation.get_model_by_version(version))
+
+        loaded = DeltaVersionStore(checkpoint_interval=3)
+        for version in store:
+            loaded.add_entry_from_bytes(version, store.entry_to_bytes(version))
+
+        assert loaded._entries == store._entries
+        assert loaded.model(4).get_element(301).type == "int"
+
+    def test_reads_json_entries(self):
+        store = DeltaVersionStore(checkpoint_interval=3)
+        for version in range(2):
+            store.add(version, self.data_manipulation.get_model_by_version(version))
+        loaded = DeltaVersionStore(checkpoint_interval=3)
+        for version in store:
+            root_id, checkpoint, states = store._entries[version]
+            loaded.add_entry_from_bytes(version, json_codec.dumps({
+                "root": root_id, "checkpoint": checkpoint,
+                "states": {element_id: [state.type.__name__, state.values, state.children]
+                           for element_id, state in states.items()}}))
+
+        assert loaded._entries == store._entries
+
+    def test_forget_last_states(self):
+        store = DeltaVersionStore(checkpoint_interval=4)
+        for version in range(3):
+            store.add(version, self.data_manipulation.get_model_by_version(version))
+
+        store.forget_last_states()
+        assert store._last_states is None
+        store.add(3, self.data_manipulation.get_model_by_version(3))
+
+        assert sorted(store._entries[3][2]) == [11, 90]
+        assert store.model(3) == self.data_manipulation.get_model_by_version(3)
+
+    def test_compact_history(self):
+        expected = [self.data_manipulation.get_model_by_version(version).to_dict() for version in range(5)]
+
+        store = self.data_manipulation.compact_history(checkpoint_interval=2)
+
+        assert store._last_states is None
+        assert not self.data_manipulation.versions.is_loaded(0)
+        for version in range(5):
+            assert self.data_manipulation.get_model_by_version(version).to_dict() == expected[version]
+
+        latest = self.data_manipulation.get_latest_model()
+        name = latest.get_element(91).name
+        self.data_manipulation.update_model_after_generation()
+        latest.get_element(91).update(name="After")
+        assert self.data_manipulation.get_model_by_version(4).get_element(91).name == name
+        assert self.data_manipulation.get_model_by_version(5).get_element(91).name == "After"
+
+    def test_delta_snapshot(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "model.snapshot")
+        self.data_manipulation.save_to_snapshot(path, checkpoint_interval=2)
+
+        loaded = DataManipulation.load_from_snapshot(path)
+
+        assert loaded.get_latest_version_number() == 4
+        for version in range(5):
+            assert loaded.get_model_by_version(version) == self.data_manipulation.get_model_by_version(version)
+        assert DataManipulation.load_version_from_snapshot(3, path) == self.data_manipulation.get_model_by_version(3)
+
+    def setUp(self):
+        self.data_manipulation = versioned_data()
+
+
+if __name__ == '__main__':
+    unittest.main()
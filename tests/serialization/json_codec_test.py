@@ -0,0 +1,34 @@
+import unittest
+import io
+import json
+from utilities import json_codec
+from metamodel.model import Model
+from tests.dummy_structures import dummy_data
+
+
+class JsonCodecTest(unittest.TestCase):
+
+    def test_dump_matches_dumps(self):
+        value = {"versions": {0: {"a": [1, 2]}, 1: None}, "path": "x", True: 1.5}
+        file = io.BytesIO()
+        json_codec.dump(value, file)
+
+        assert file.getvalue() == json_codec.dumps(value)
+        assert json_codec.loads(file.getvalue()) == json.loads(json.dumps(value))
+
+    def test_reads_indented_files(self):
+        value = {"element_traces": {"5": [[2, []]]}, "_last_trace_id": 0}
+        file = io.BytesIO(json.dumps(value, indent=4).encode())
+
+        assert json_codec.load(file) == value
+
+    def test_model_round_trip(self):
+        model = dummy_data()
+        model.version = 2
+        content = model.to_json()
+        loaded = Model.from_json(content)
+
+        assert "\n" not in content
+        assert loaded == model
+        assert loaded.version == 2
+        assert loaded.get_element(92).to_dict() == model.get_element(92).to_dict()
@@ -0,0 +1,114 @@
+import unittest
+import os
+import tempfile
+from transformation.data_manipulation import DataManipulation, VersionUnavailableError, VersionLoadError
+from versioning.lazy_versions import LazyVersions
+from recreate_dummy_structures import make
+from tests.dummy_structures import dummy_data
+
+
+class LazyVersionsTest(unittest.TestCase):
+
+    def test_loads_on_first_access(self):
+        versions = self.lazy_versions(4, cache_size=2)
+
+        assert 2 in versions and 7 not in versions
+        assert list(versions) == [0, 1, 2, 3]
+        assert self.loads == []
+
+        model = versions[1]
+        assert versions[1] is model
+        assert model.version == 1
+        assert self.loads == [1]
+
+    def test_evicts_least_recently_used(self):
+        versions = self.lazy_versions(4, cache_size=2)
+
+        versions[0], versions[1], versions[0], versions[2]
+
+        assert versions.is_loaded(0) and versions.is_loaded(2)
+        assert not versions.is_loaded(1)
+        versions[1]
+        assert self.loads == [0, 1, 2, 1]
+
+    def test_keeps_latest_and_stored_versions(self):
+        versions = self.lazy_versions(4, cache_size=1)
+        stored = dummy_data()
+        versions[0] = stored
+
+        versions[3], versions[1], versions[2]
+
+        assert versions[0] is stored
+        assert versions.is_loaded(3)
+        assert not versions.is_loaded(1)
+        assert self.loads == [3, 1, 2]
+
+    def test_json_versions_load_lazily(self):
+        data_manipulation = DataManipulation.from_json(self.data_manipulation().to_json())
+
+        assert data_manipulation.has_version(0) and not data_manipulation.has_version(2)
+        assert not data_manipulation.versions.is_loaded(0)
+        assert data_manipulation.get_model_by_version(0).get_element(89).name == "Fifi1"
+        assert not data_manipulation.versions.is_loaded(1)
+        with self.assertRaises(VersionUnavailableError):
+            data_manipulation.get_model_by_version(2)
+
+    def test_xmi_versions_load_lazily(self):
+        directory = self.saved_xmi()
+
+        loaded = DataManipulation()
+        loaded.load_from_xmi(make(), directory)
+
+        assert loaded.get_latest_version_number() == 1
+        assert 0 in loaded and not loaded.versions.is_loaded(0)
+        assert loaded.get_model_by_version(1).root.name == "Renamed"
+        assert loaded.get_model_by_version(0).get_element(89).name == "Fifi1"
+
+    def test_xmi_versions_load_in_processes(self):
+        directory = self.saved_xmi()
+
+        loaded = DataManipulation()
+        loaded.load_from_xmi(make(), directory, processes=2, metamodel_factory=make)
+
+        assert list(loaded.versions) == [0, 1]
+        assert loaded.get_model_by_version(1).root.name == "Renamed"
+        assert loaded.get_model_by_version(0) == self.data_manipulation().get_model_by_version(0)
+
+    def test_xmi_load_reports_bad_files(self):
+        directory = self.saved_xmi()
+        bad_file = os.path.join(directory, "versions", "model_version_2.xmi")
+        with open(bad_file, "w") as file:
+            file.write("<not a model")
+
+        loaded = DataManipulation()
+        with self.assertRaises(VersionLoadError) as context:
+            loaded.load_from_xmi(make(), directory, processes=2, metamodel_factory=make)
+
+        assert list(context.exception.errors) == [bad_file]
+        assert list(loaded.versions) == [0, 1]
+        assert loaded.get_latest_version_number() == 1
+
+    def saved_xmi(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.data_manipulation().save_to_xmi(make(), directory.name)
+        return directory.name
+
+    def lazy_versions(self, count, cache_size):
+        self.loads = []
+        versions = LazyVersions(cache_size)
+        for version in range(count):
+            versions.add_loader(version, lambda version=version: self.loads.append(version) or dummy_data())
+        return versions
+
+    @staticmethod
+    def data_manipulation():
+        data_manipulation = DataManipulation()
+        data_manipulation.update_model(dummy_data())
+        data_manipulation.update_model_after_generation()
+        data_manipulation.get_latest_model().root.update(name="Renamed")
+        return data_manipulation
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import os
+import tempfile
+from metamodel.element_generator_table import ElementGeneratorTable
+from tracing.tracer import Tracer
+from tracing.trace import Trace
+from tracing.trace_type import TraceType
+from transformation.data_manipulation import DataManipulation, VersionUnavailableError
+from versioning.snapshot import SnapshotFormatError
+from tests.dummy_structures import dummy_data
+
+
+class SnapshotSerializationTest(unittest.TestCase):
+
+    def test_dm_snapshot_serialization(self):
+        data_manipulation = self.data_manipulation()
+        data_manipulation.save_to_snapshot(self.path)
+
+        loaded = DataManipulation.load_from_snapshot(self.path)
+
+        assert loaded.path == data_manipulation.path
+        assert loaded.get_latest_version_number() == 1
+        for version in (0, 1):
+            assert loaded.get_model_by_version(version) == data_manipulation.get_model_by_version(version)
+            assert loaded.get_model_by_version(version).version == version
+
+    def test_dm_snapshot_single_version(self):
+        data_manipulation = self.data_manipulation()
+        data_manipulation.save_to_snapshot(self.path)
+
+        model = DataManipulation.load_version_from_snapshot(0, self.path)
+
+        assert model == data_manipulation.get_model_by_version(0)
+        assert model.get_element(89).name == "Fifi1"
+        with self.assertRaises(VersionUnavailableError):
+            DataManipulation.load_version_from_snapshot(5, self.path)
+
+    def test_table_snapshot_serialization(self):
+        table = ElementGeneratorTable()
+        for element_id in (1, 11, 89):
+            table.insert_pair(element_id, 7)
+        table.update_last_generated_versions(89, 7, 3)
+        table.remove_connection(11, 7)
+        table.save_to_snapshot(self.path)
+
+        loaded = ElementGeneratorTable.load_from_snapshot(self.path)
+
+        assert loaded._by_element == table._by_element
+        assert loaded._by_generator == table._by_generator
+
+    def test_tracer_snapshot_serialization(self):
+        tracer = Tracer(self.directory.name)
+        tracer.add_element_trace(89, 7, Trace(TraceType.SELECTION, "/html/body/div", None))
+        tracer.add_element_trace(89, 7, Trace(TraceType.INSERTION, "/html/body/p", "/html/body/p[2]"))
+        tracer.save_to_snapshot()
+
+        loaded = Tracer().load_from_snapshot(os.path.join(self.directory.name, "tracer.snapshot"))
+
+        traces = loaded.get_traces(89, 7)
+        assert [trace.type for trace in traces] == [TraceType.SELECTION, TraceType.INSERTION]
+        assert [(trace.old_path, trace.new_path) for trace in traces] == \
+               [(trace.old_path, trace.new_path) for trace in tracer.get_traces(89, 7)]
+        assert loaded.data_loading_path == self.directory.name
+
+    def test_wrong_kind(self):
+        self.data_manipulation().save_to_snapshot(self.path)
+
+        with self.assertRaises(SnapshotFormatError):
+            ElementGeneratorTable.load_from_snapshot(self.path)
+
+    def data_manipulation(self):
+        data_manipulation = DataManipulation()
+        data_manipulation.update_model(dummy_data())
+        data_manipulation.update_model_after_generation()
+        data_manipulation.get_latest_model().get_element(89).update(name="Renamed")
+        return data_manipulation
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "snapshot")
+
+    def tearDown(self):
+        self.directory.cleanup()
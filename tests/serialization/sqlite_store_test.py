@@ -0,0 +1,94 @@
+import unittest
+import os
+import sqlite3
+import tempfile
+from unittest import mock
+from transformation.data_manipulation import DataManipulation
+from versioning.sqlite_store import SQLiteVersionStore
+from tests.dummy_structures import versioned_data
+
+
+class SQLiteStoreTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        self.data_manipulation.save_to_sqlite(self.path)
+
+        loaded = DataManipulation.load_from_sqlite(self.path)
+
+        assert loaded.get_latest_version_number() == 4
+        for version in range(5):
+            assert loaded.get_model_by_version(version) == self.data_manipulation.get_model_by_version(version)
+        with sqlite3.connect(self.path) as connection:
+            assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    def test_element_by_id_without_loading(self):
+        self.data_manipulation.save_to_sqlite(self.path)
+        loaded = DataManipulation.load_from_sqlite(self.path)
+
+        document = loaded.get_element_by_id(11, 1)
+
+        assert not loaded.versions.is_loaded(1)
+        assert document.to_dict() == self.data_manipulation.get_element_by_id(11, 1).to_dict()
+        assert document.get(89).name == "Renamed"
+        assert loaded.get_element_by_id(300, 1) is None
+        assert loaded.get_element_by_id(300, 2).name == "New"
+
+    def test_changed_elements(self):
+        self.data_manipulation.save_to_sqlite(self.path)
+        loaded = DataManipulation.load_from_sqlite(self.path)
+
+        assert loaded.changed_elements(0, 1) == [89]
+        assert loaded.changed_elements(1, 3) == [90, 300]
+        assert loaded.changed_elements(3, 4) == [89]
+        assert not loaded.versions.is_loaded(3)
+        assert self.data_manipulation.changed_elements(0, 4) == [89, 90, 300]
+        assert loaded.element_changed(11, 0, 1) and not loaded.element_changed(12, 0, 1)
+
+    def test_saves_only_changes(self):
+        self.data_manipulation.save_to_sqlite(self.path)
+        self.data_manipulation.get_latest_model().get_element(91).update(name="Changed")
+        del self.data_manipulation.versions[0]
+
+        self.data_manipulation.save_to_sqlite(self.path)
+        loaded = DataManipulation.load_from_sqlite(self.path)
+
+        assert list(loaded.versions) == [1, 2, 3, 4]
+        assert loaded.get_element_by_id(91, 4).name == "Changed"
+
+    def test_saved_versions_are_released(self):
+        self.data_manipulation.save_to_sqlite(self.path)
+
+        assert [self.data_manipulation.versions.is_loaded(version) for version in range(5)] == \
+            [False, False, False, False, True]
+        self.data_manipulation.get_latest_model().get_element(91).update(name="Changed")
+        with mock.patch.object(SQLiteVersionStore, "write_version", autospec=True,
+                               side_effect=SQLiteVersionStore.write_version) as write_version:
+            self.data_manipulation.save_to_sqlite(self.path)
+
+        assert [call.args[1] for call in write_version.call_args_list] == [4]
+        assert self.data_manipulation.get_element_by_id(89, 0).name != "Renamed"
+        assert self.data_manipulation.get_element_by_id(91, 3).name != "Changed"
+        assert DataManipulation.load_from_sqlite(self.path).get_element_by_id(91, 4).name == "Changed"
+
+    def test_save_to_dill(self):
+        self.data_manipulation.save_to_sqlite(self.path)
+        loaded = DataManipulation.load_from_sqlite(self.path)
+        dill_path = os.path.join(os.path.dirname(self.path), "model.dill")
+
+        loaded.save_to_dill(dill_path)
+        reloaded = loaded.load_from_dill(dill_path)
+
+        assert reloaded.get_element_by_id(300, 2).name == "New"
+        assert reloaded.changed_elements(0, 1) == [89]
+        assert reloaded.get_model_by_version(4) == self.data_manipulation.get_model_by_version(4)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "model.sqlite")
+
+        self.data_manipulation = versioned_data()
+
+
+if __name__ == '__main__':
+    unittest.main()
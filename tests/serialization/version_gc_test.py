@@ -0,0 +1,94 @@
+import unittest
+import os
+import tempfile
+from metamodel.element_generator_table import ElementGeneratorTable
+from transformation.data_manipulation import DataManipulation
+from versioning.version_gc import select_versions, collect_versions
+from versioning.version_manifest import read_manifest
+from recreate_dummy_structures import make
+from tests.dummy_structures import dummy_data
+
+
+class VersionGCTest(unittest.TestCase):
+
+    def test_select_versions(self):
+        assert select_versions(range(6), {1, 9}, retention=2) == {1, 4, 5}
+        assert select_versions(range(6), set(), retention=0) == {5}
+
+    def test_referenced_versions(self):
+        assert self.table.get_referenced_versions() == {1}
+
+    def test_collect_versions(self):
+        # Saving released the history; a version read back since holds memory again.
+        self.data_manipulation.get_model_by_version(2)
+        collection = collect_versions(self.data_manipulation, self.table, retention=2, path=self.directory.name)
+
+        assert collection.kept == [1, 4, 5]
+        assert collection.removed == [0, 2, 3]
+        assert collection.reclaimed_memory > 0 and collection.reclaimed_disk > 0
+        assert list(self.data_manipulation.versions) == [1, 4, 5]
+        assert sorted(os.listdir(self.versions_folder)) == ["manifest.json", "model_version_1.xmi",
+                                                            "model_version_4.xmi", "model_version_5.xmi"]
+
+        loaded = DataManipulation()
+        loaded.load_from_xmi(self.metamodel, self.directory.name)
+        assert list(loaded.versions) == [1, 4, 5]
+        assert loaded.get_model_by_version(1).get_element(89).name == "Name 1"
+
+    def test_archive_versions(self):
+        archive = os.path.join(self.directory.name, "archive")
+        collection = collect_versions(self.data_manipulation, self.table, retention=2, path=self.directory.name,
+                                      archive_path=archive)
+
+        assert sorted(read_manifest(self.versions_folder)) == [1, 4, 5]
+        assert sorted(read_manifest(os.path.join(archive, "versions"))) == collection.removed
+
+        archived = DataManipulation()
+        archived.load_from_xmi(self.metamodel, archive)
+        assert list(archived.versions) == [0, 2, 3]
+        assert archived.get_model_by_version(2).get_element(89).name == "Name 2"
+
+    def test_removed_versions_are_released(self):
+        data_manipulation = DataManipulation()
+        data_manipulation.update_model(dummy_data())
+        for version in range(1, 9):
+            data_manipulation.update_model_after_generation()
+            data_manipulation.get_latest_model().get_element(89).update(name="Name %d" % version)
+        latest = data_manipulation.get_latest_model()
+        removed_model = data_manipulation.get_model_by_version(7)
+
+        collection = collect_versions(data_manipulation, self.table, retention=1)
+        latest.get_element(90).update(name="After collection")
+
+        assert collection.removed == [0, 2, 3, 4, 5, 6, 7]
+        assert collection.reclaimed_memory > 0
+        assert latest._predecessor is None
+        assert 90 not in removed_model._preimages
+        assert not data_manipulation.get_model_by_version(1).frozen
+        assert data_manipulation.get_model_by_version(1).get_element(89).name == "Name 1"
+        assert data_manipulation.get_model_by_version(1).get_element(90).name == "Fifi2"
+
+    def setUp(self):
+        self.metamodel = make()
+        self.directory = tempfile.TemporaryDirectory()
+        self.versions_folder = os.path.join(self.directory.name, "versions")
+
+        self.data_manipulation = DataManipulation()
+        self.data_manipulation.update_model(dummy_data())
+        for version in range(1, 6):
+            self.data_manipulation.update_model_after_generation()
+            self.data_manipulation.get_latest_model().get_element(89).update(name="Name %d" % version)
+        self.data_manipulation.save_to_xmi(self.metamodel, self.directory.name)
+
+        self.table = ElementGeneratorTable()
+        self.table.insert_pair(89, 7)
+        self.table.insert_pair(90, 7)
+        self.table.update_last_generated_versions(89, 7, 1)
+        self.table.change_generator_status(7)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+import json
+import os
+import tempfile
+from unittest import mock
+from transformation import data_manipulation as data_manipulation_module
+from transformation.data_manipulation import DataManipulation, VersionUnavailableError, VersionLoadError
+from versioning.version_manifest import MANIFEST_NAME, model_hash, read_manifest
+from utilities.utilities import atomic_write
+from recreate_dummy_structures import make
+from tests.dummy_structures import dummy_data
+
+
+class XmiIncrementalSaveTest(unittest.TestCase):
+
+    def test_manifest_matches_loaded_versions(self):
+        self.save(self.data_manipulation())
+
+        manifest = read_manifest(self.versions_folder)
+        loaded = DataManipulation()
+        loaded.load_from_xmi(self.metamodel, self.directory.name)
+
+        assert sorted(manifest) == [0, 1]
+        for version in (0, 1):
+            assert model_hash(loaded.get_model_by_version(version)) == manifest[version]
+
+    def test_writes_only_changed_versions(self):
+        data_manipulation = self.data_manipulation()
+        self.save(data_manipulation)
+
+        data_manipulation.get_latest_model().get_element(89).update(name="Changed")
+        assert self.save(data_manipulation) == ["model_version_1.xmi", MANIFEST_NAME]
+
+        data_manipulation.update_model_after_generation()
+        assert self.save(data_manipulation) == ["model_version_2.xmi", MANIFEST_NAME]
+        assert self.save(data_manipulation) == [MANIFEST_NAME]
+
+    def test_unread_versions_are_not_loaded(self):
+        self.save(self.data_manipulation())
+        loaded = DataManipulation()
+        loaded.load_from_xmi(self.metamodel, self.directory.name)
+
+        assert self.save(loaded) == [MANIFEST_NAME]
+        assert not loaded.versions.is_loaded(0) and not loaded.versions.is_loaded(1)
+
+    def test_saved_versions_are_released(self):
+        data_manipulation = self.data_manipulation()
+        first_name = data_manipulation.get_model_by_version(0).root.name
+        self.save(data_manipulation)
+
+        assert not data_manipulation.versions.is_loaded(0) and data_manipulation.versions.is_loaded(1)
+        data_manipulation.get_latest_model().root.update(name="Changed")
+        assert self.save(data_manipulation) == ["model_version_1.xmi", MANIFEST_NAME]
+        assert not data_manipulation.versions.is_loaded(0)
+        assert data_manipulation.get_model_by_version(0).root.name == first_name
+        assert data_manipulation.get_model_by_version(1).root.name == "Changed"
+
+    def test_stale_file_is_reported(self):
+        self.save(self.data_manipulation())
+        manifest_path = os.path.join(self.versions_folder, MANIFEST_NAME)
+        with open(manifest_path) as file:
+            manifest = json.load(file)
+        manifest["versions"]["0"] = "0" * 32
+        manifest["versions"]["5"] = "0" * 32
+        with open(manifest_path, "w") as file:
+            json.dump(manifest, file)
+
+        loaded = DataManipulation()
+        with self.assertRaises(VersionLoadError) as context:
+            loaded.load_from_xmi(self.metamodel, self.directory.name)
+        assert list(context.exception.errors) == [os.path.join(self.versions_folder, "model_version_5.xmi")]
+        with self.assertRaises(VersionUnavailableError):
+            loaded.get_model_by_version(0)
+        assert loaded.get_model_by_version(1).root.name == "Renamed"
+
+        with self.assertRaises(VersionLoadError) as context:
+            loaded.load_from_xmi(self.metamodel, self.directory.name, processes=2, metamodel_factory=make)
+        assert sorted(context.exception.errors) == [os.path.join(self.versions_folder, "model_version_0.xmi"),
+                                                    os.path.join(self.versions_folder, "model_version_5.xmi")]
+
+    def save(self, data_manipulation):
+        """Saves to the test folder and returns the names of the files written."""
+        with mock.patch.object(data_manipulation_module, "atomic_write", wraps=atomic_write) as version_write, \
+                mock.patch("versioning.version_manifest.atomic_write", wraps=atomic_write) as manifest_write:
+            data_manipulation.save_to_xmi(self.metamodel, self.directory.name)
+        return [os.path.basename(call.args[0]) for call in version_write.call_args_list + manifest_write.call_args_list]
+
+    @staticmethod
+    def data_manipulation():
+        data_manipulation = DataManipulation()
+        data_manipulation.update_model(dummy_data())
+        data_manipulation.update_model_after_generation()
+        data_manipulation.get_latest_model().root.update(name="Renamed")
+        return data_manipulation
+
+    def setUp(self):
+        self.metamodel = make()
+        self.directory = tempfile.TemporaryDirectory()
+        self.versions_folder = os.path.join(self.directory.name, "versions")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+
+if __name__ == '__main__':
+    unittest.main()
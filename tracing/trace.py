@@ -51,9 +51,13 @@ class Trace(object):
 
     @classmethod
     def from_json(cls, data):
-        new_object = cls(old_path=data["_old_path"], new_path=data["_new_path"], id_=data["_id"])
+        type_ = TraceType[data["_type"]] if "_type" in data else None
+        new_object = cls(type_=type_, old_path=data["_old_path"], new_path=data["_new_path"], id_=data["_id"])
         return new_object
 
+    def to_dict(self):
+        return TraceJSONEncoder().default(self)
+
 
 class TraceJSONEncoder(json.JSONEncoder):
 
@@ -61,6 +65,7 @@ class TraceJSONEncoder(json.JSONEncoder):
 
         if isinstance(object_, Trace):
             object_dict = {key: value for (key, value) in object_.__dict__.items()}
+            object_dict["_type"] = object_.type.name
             return object_dict
         else:
 
@@ -1,7 +1,17 @@
 from utilities.utilities import get_project_root
 from tracing.trace import Trace
+from tracing.trace_type import TraceType
+from utilities import json_codec
+from versioning.snapshot import write_snapshot, SnapshotReader
+from metamodel.compact_store import pack_strings, unpack_strings
 import json
 import os
+import struct
+
+# Snapshot record: element id, generator id, trace id, TraceType position, then old and new path indices into
+# the string table (-1 for None).
+_SNAPSHOT_RECORD = struct.Struct('<qqqbii')
+_TRACE_TYPES = list(TraceType)
 
 
 class Tracer(object):
@@ -113,7 +123,7 @@ class Tracer(object):
             del self._element_traces[element_id]
 
     def to_json(self):
-        return json.dumps(self, cls=TracerJSONEncoder, indent=4)
+        return json.dumps(self, cls=TracerJSONEncoder)
 
     def to_dict(self):
         return TracerJSONEncoder().default(self)
@@ -122,17 +132,52 @@ class Tracer(object):
         if path is None:
             path = os.path.join(self._data_loading_path, "tracer.json")
 
-        content = self.to_dict()
-        with open(path, "w") as file:
-            file.write(content)
+        with open(path, "wb") as file:
+            json_codec.dump(TracerJSONEncoder.get_object_dict(self), file)
+
+    def save_to_snapshot(self, path=None):
+        if path is None:
+            path = os.path.join(self._data_loading_path, "tracer.snapshot")
+
+        strings = {}
+        records = []
+        for element_id, generators in self._element_traces.items():
+            for generator_id, traces in generators.items():
+                for trace in traces:
+                    paths = [strings.setdefault(path_, len(strings)) if path_ is not None else -1
+                             for path_ in (trace.old_path, trace.new_path)]
+                    records.append(_SNAPSHOT_RECORD.pack(element_id, generator_id, trace.id,
+                                                         _TRACE_TYPES.index(trace.type), *paths))
+
+        metadata = {"_last_trace_id": self._last_trace_id, "_data_loading_path": self._data_loading_path,
+                    "strings": len(strings)}
+        write_snapshot(path, "Tracer", metadata, {0: pack_strings(list(strings)), 1: b''.join(records)})
+
+    def load_from_snapshot(self, path=None):
+        """Replaces the traces with the ones saved by save_to_snapshot."""
+        if path is None:
+            path = os.path.join(self._data_loading_path, "tracer.snapshot")
+
+        with SnapshotReader(path, "Tracer") as reader:
+            strings, _ = unpack_strings(reader.read(0), 0, reader.metadata["strings"])
+            records = reader.read(1)
+            self._last_trace_id = reader.metadata["_last_trace_id"]
+            self._data_loading_path = reader.metadata["_data_loading_path"]
+
+        self._element_traces = {}
+        for element_id, generator_id, trace_id, type_, old_path, new_path in _SNAPSHOT_RECORD.iter_unpack(records):
+            trace = Trace(_TRACE_TYPES[type_], strings[old_path] if old_path != -1 else None,
+                          strings[new_path] if new_path != -1 else None, trace_id)
+            self._element_traces.setdefault(element_id, {}).setdefault(generator_id, []).append(trace)
+        return self
 
     def load_from_json(self, path=None):
         if path is None:
             path = os.path.join(self._data_loading_path, "tracer.json")
 
         try:
-            with open(path, "r") as file:
-                json_content = json.load(file)
+            with open(path, "rb") as file:
+                json_content = json_codec.load(file)
                 return self.from_json(json_content)
         except OSError:
             print("Unable to load tracer.")
@@ -177,20 +222,23 @@ class Tracer(object):
 
 class TracerJSONEncoder(json.JSONEncoder):
 
-    def default(self, object_):
+    @staticmethod
+    def get_object_dict(tracer):
+        table_by_element = {}
 
-        if isinstance(object_, Tracer):
+        for element_id, generators in tracer.element_traces.items():
+            table_by_element[element_id] = []
+            for generator_id, value in generators.items():
+                # A list of traces; the codec encodes each with Trace.to_dict.
+                table_by_element[element_id].append((generator_id, value))
 
-            table_by_element = {}
+        return {"element_traces": table_by_element, "_last_trace_id": tracer.last_trace_id,
+                "_data_loading_path": tracer.data_loading_path}
 
-            for element_id, generators in object_.element_traces.items():
-                table_by_element[element_id] = []
-                for generator_id, value in generators.items():
-                    table_by_element[element_id].append((generator_id, value.to_dict()))
+    def default(self, object_):
 
-            object_dict = {"element_traces": table_by_element, "_last_trace_id": object_.last_trace_id,
-                           "_data_loading_path": object_.data_loading_path}
-            return json.dumps(object_dict, default=lambda o: o.to_dict(), indent=4)
+        if isinstance(object_, Tracer):
+            return json_codec.dumps(self.get_object_dict(object_)).decode()
         else:
 
             # call base class implementation which takes care of
@@ -1,21 +1,99 @@
+import io
 import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pyecore.resources.xmi import XMIOptions
 from pyecore.resources import ResourceSet, URI
 
-from utilities.utilities import get_project_root
+from utilities.utilities import get_project_root, atomic_write
+from utilities import json_codec
 import dill
 import json
-from metamodel.model import Model, ElementNotFoundError
+from metamodel.model import Model, ElementNotFoundError, capture_state
+from metamodel.compact_store import CompactElementStore
+from metamodel.element_id_allocator import ElementIdAllocator
+from versioning.snapshot import write_snapshot, SnapshotReader
+from versioning.lazy_versions import LazyVersions
+from versioning.delta_store import DeltaVersionStore, DEFAULT_CHECKPOINT_INTERVAL
+from versioning.sqlite_store import SQLiteVersionStore
+from versioning.version_manifest import model_hash, read_manifest, write_manifest, read_next_element_id
 
 
 class VersionUnavailableError(Exception):
     pass
 
 
+class VersionLoadError(Exception):
+    """Raised by load_from_xmi after loading the versions it could. errors maps each failed file to its error."""
+
+    def __init__(self, errors):
+        super().__init__("Unable to load %s." % ", ".join("%s (%s)" % item for item in errors.items()))
+        self.errors = errors
+
+
+class _BufferURI(URI):
+    """Lets XMIResource.save write into memory, so the file can be replaced atomically."""
+
+    def create_outstream(self):
+        self.buffer = io.BytesIO()
+        return self.buffer
+
+
+def _load_xmi_version(metamodel, file_path, expected_hash=None):
+    rset = ResourceSet()
+    rset.metamodel_registry[metamodel.nsURI] = metamodel
+    resource = rset.get_resource(URI(file_path))
+    model = resource.contents[0]
+    model.adopt_elements()
+    if expected_hash is not None and model_hash(model) != expected_hash:
+        raise VersionLoadError({file_path: "content hash does not match the manifest"})
+    return model
+
+
+_worker_metamodel = None
+
+
+def _init_xmi_worker(metamodel_factory):
+    global _worker_metamodel
+    _worker_metamodel = metamodel_factory()
+
+
+def _parse_xmi_version(file_path, expected_hash=None):
+    # Runs in a worker process. The model is sent back as packed CompactElementStore rows, which pickle far
+    # smaller and faster than pyecore objects; errors come back as text since not every parser error pickles.
+    try:
+        model = _load_xmi_version(_worker_metamodel, file_path, expected_hash)
+        return CompactElementStore.from_model(model).to_bytes(), None
+    except VersionLoadError as error:
+        return None, error.errors[file_path]
+    except Exception as error:
+        return None, "%s: %s" % (type(error).__name__, error)
+
+
+def _load_packed_version(data, version):
+    return CompactElementStore.from_bytes(data, version).to_model()
+
+
+def _read_delta_store(reader, last_version=None):
+    store = DeltaVersionStore(reader.metadata["checkpoint_interval"])
+    for version in sorted(reader.keys()):
+        if last_version is not None and version > last_version:
+            break
+        store.add_entry_from_bytes(version, reader.read(version))
+    return store
+
+
+def _load_snapshot_version(path, version):
+    with SnapshotReader(path, "DataManipulation") as reader:
+        return CompactElementStore.from_bytes(reader.read(version), version).to_model()
+
+
 class DataManipulation(object):
 
     def __init__(self, initial_file=None):
-        self._versions = {}
+        # Loaders fill it with versions that are read from disk on first access.
+        self._versions = LazyVersions()
 
         if initial_file is not None:
             self.path = initial_file
@@ -23,6 +101,9 @@ class DataManipulation(object):
             self.path = os.path.join(get_project_root(), "files", "model.dill")
 
         self._latest_version_number = -1
+        # SQLiteVersionStore the versions were saved to or loaded from, if any; see save_to_sqlite.
+        self._store = None
+        self._id_allocator = ElementIdAllocator(find_next_id=self._find_next_element_id)
 
     @property
     def versions(self):
@@ -60,40 +141,98 @@ class DataManipulation(object):
             return False
         try:
             version_int = int(version)
-            if version_int in self._versions:
-                return True
+            return version_int in self._versions
         except:
             return False
 
     def update_model_after_generation(self):
+        last_version = self.get_latest_version_number()
         last_model = self.get_latest_model()
         next_version = self.get_next_version_number()
-        new_model = last_model.deepcopy()
-        new_model.version = next_version
-        self._versions[next_version] = new_model
-        new_model.version = next_version
+        # The latest model moves on to the new version and the one it held keeps only what changes from now on.
+        self._versions[last_version] = last_model.fork(next_version)
+        self._versions[next_version] = last_model
 
     def update_model(self, model):
         next_version = self.get_next_version_number()
         self._versions[next_version] = model
         model.version = next_version
+        self._id_allocator.observe(ElementIdAllocator.highest_id([model]))
 
     def get_element_by_id(self, _id, version=None):
+        """With an SQLite store, a version that is stored and not loaded answers with an indexed query and returns
+        the element's subtree on its own, without its parent and model."""
+        if version is not None and self._in_store(int(version)):
+            return self._store.element(int(version), _id)
+
         model = self.get_model_by_version(version)
         try:
             return model.get_element(_id)
         except ElementNotFoundError:
             return None
 
+    def element_changed(self, _id, old_version, new_version=None):
+        """Whether the element or anything under it differs between the two versions, by content hash."""
+        old_version = int(old_version)
+        new_version = self.get_latest_version_number() if new_version is None else int(new_version)
+        if self._in_store(old_version, loaded=True) and self._in_store(new_version, loaded=True):
+            old_hash, new_hash = self._store.content_hash(old_version, _id), self._store.content_hash(new_version, _id)
+            return old_hash != new_hash
+
+        old_element = self.get_element_by_id(_id, old_version)
+        new_element = self.get_element_by_id(_id, new_version)
+        if old_element is None or new_element is None:
+            return old_element is not new_element
+        return old_element.content_hash != new_element.content_hash
+
+    def changed_elements(self, old_version, new_version=None):
+        """Ids of the elements added, removed, moved to another container or with a changed attribute between the
+        two versions. A single query when both versions are in the SQLite store."""
+        old_version = int(old_version)
+        new_version = self.get_latest_version_number() if new_version is None else int(new_version)
+        if self._in_store(old_version, loaded=True) and self._in_store(new_version, loaded=True):
+            return self._store.changed_elements(old_version, new_version)
+
+        def states(model):
+            return {element.id: (capture_state(element)[:2], getattr(element.eContainer(), "id", None))
+                    for element in model}
+
+        old_states = states(self.get_model_by_version(old_version))
+        new_states = states(self.get_model_by_version(new_version))
+        return sorted(element_id for element_id in old_states.keys() | new_states.keys()
+                      if old_states.get(element_id) != new_states.get(element_id))
+
+    def _in_store(self, version, loaded=False):
+        # Whether the store's copy of version is current: it was loaded from the store and, being history, cannot
+        # have changed since, or it was not loaded at all. With loaded=False, only the latter.
+        if self._store is None or not hasattr(self._versions, "source"):
+            return False
+        if self._versions.source(version) != self._store.path:
+            return False
+        if not self._versions.is_loaded(version):
+            return True
+        return loaded and version != self.get_latest_version_number()
+
     def generate_new_element_id(self):
-        while True:
-            from random import randint
-            id_candidate = randint(0, 10 ^ 5)
-            for model_element in self.get_latest_model():
-                if id_candidate == model_element.id:
-                    break
-            else:
-                return id_candidate
+        """An id no element of any version has had. Safe to call from concurrent requests."""
+        return self._id_allocator.allocate()
+
+    def reserve_element_ids(self, count):
+        """Reserves count consecutive new element ids for a bulk import and returns them as a range."""
+        return self._id_allocator.reserve(count)
+
+    def get_next_element_id(self):
+        return self._id_allocator.next_id
+
+    def _set_next_element_id(self, next_id):
+        # Restores the mark a save recorded; files written before there was one leave it to be worked out.
+        if next_id is not None:
+            self._id_allocator = ElementIdAllocator(next_id, self._find_next_element_id)
+
+    def _find_next_element_id(self):
+        # Reads every version once, so that ids of elements removed since are not handed out again.
+        versions = list(self._versions.keys())
+        return ElementIdAllocator.highest_id(self._versions[version] for version in versions) + 1
 
     def get_old_and_new_model_for_element(self, element):
         old_version = element.model.version
@@ -127,15 +266,143 @@ class DataManipulation(object):
         with open(path, "rb") as file:
             return dill.load(file)
 
+    def save_to_snapshot(self, path=None, checkpoint_interval=None):
+        """Writes every version as its own section, see versioning.snapshot. Sections hold compact element rows, or
+        with checkpoint_interval, DeltaVersionStore entries: a full version every checkpoint_interval versions and
+        only the changed elements in between."""
+        if not path:
+            path = os.path.join(get_project_root(), "files", "model.snapshot")
+
+        metadata = {"path": self.path, "_latest_version_number": self._latest_version_number,
+                    "next_element_id": self.get_next_element_id()}
+        if checkpoint_interval is None:
+            sections = {version: CompactElementStore.from_model(model).to_bytes()
+                        for version, model in self._versions.items()}
+        else:
+            store = DeltaVersionStore(checkpoint_interval)
+            for version in sorted(self._versions.keys()):
+                store.add(version, self._versions[version])
+            sections = {version: store.entry_to_bytes(version) for version in store}
+            metadata["checkpoint_interval"] = checkpoint_interval
+        write_snapshot(path, "DataManipulation", metadata, sections)
+
+    @staticmethod
+    def load_from_snapshot(path=None):
+        if not path:
+            path = os.path.join(get_project_root(), "files", "model.snapshot")
+
+        with SnapshotReader(path, "DataManipulation") as reader:
+            new_object = DataManipulation(reader.metadata["path"])
+            if "checkpoint_interval" in reader.metadata:
+                store = _read_delta_store(reader)
+                for version in store:
+                    new_object._versions.add_loader(version, partial(store.model, version))
+            else:
+                for version in reader.keys():
+                    new_object._versions.add_loader(version, partial(_load_snapshot_version, path, version))
+            new_object._latest_version_number = reader.metadata["_latest_version_number"]
+            new_object._set_next_element_id(reader.metadata.get("next_element_id"))
+        return new_object
+
+    @staticmethod
+    def load_version_from_snapshot(version, path=None):
+        """Loads one model version from a snapshot without decoding the others, or for a delta snapshot, the ones
+        after it."""
+        if not path:
+            path = os.path.join(get_project_root(), "files", "model.snapshot")
+
+        with SnapshotReader(path, "DataManipulation") as reader:
+            if version not in reader:
+                raise VersionUnavailableError("Requested model version is unavailable.")
+            if "checkpoint_interval" in reader.metadata:
+                return _read_delta_store(reader, version).model(version)
+            return CompactElementStore.from_bytes(reader.read(version), version).to_model()
+
+    def compact_history(self, checkpoint_interval=DEFAULT_CHECKPOINT_INTERVAL):
+        """Moves every version but the latest into a DeltaVersionStore. They stay readable as before: a version is
+        rebuilt on access and kept in the LRU of LazyVersions."""
+        latest_version = self.get_latest_version_number()
+        if not isinstance(self._versions, LazyVersions):
+            versions = LazyVersions()
+            for version, model in self._versions.items():
+                versions[version] = model
+            self._versions = versions
+
+        store = DeltaVersionStore(checkpoint_interval)
+        for version in sorted(self._versions.keys()):
+            if version != latest_version:
+                # Reading a forked version materializes it, so the latest model no longer backs it.
+                store.add(version, self._versions[version])
+                self._versions.add_loader(version, partial(store.model, version))
+        store.forget_last_states()
+
+        if latest_version in self._versions:
+            self._versions[latest_version].detach_predecessor()
+        return store
+
+    def save_to_sqlite(self, path=None):
+        """Writes the versions to an SQLite version store, see versioning.sqlite_store, and keeps it for
+        get_element_by_id and changed_elements. Versions the store already holds unchanged are not written again,
+        and versions no longer in this object are deleted from it. Saved versions but the latest are then read back
+        from the store on access."""
+        if not path:
+            path = os.path.join(get_project_root(), "files", "model.sqlite")
+        if self._store is None or self._store.path != path:
+            self._store = SQLiteVersionStore(path)
+
+        stored_versions = set(self._store.versions())
+        saved = {}
+        for version in list(self._versions.keys()):
+            if version in stored_versions and self._in_store(version):
+                continue
+            model = self._versions[version]
+            model.materialize()
+            root_hash = model.root.content_hash if model.root is not None else None
+            if version not in stored_versions or self._store.root_hash(version) != root_hash:
+                self._store.write_version(version, model)
+            saved[version] = (partial(self._store.model, version), path)
+
+        for version in stored_versions - set(self._versions.keys()):
+            self._store.delete_version(version)
+        self._store.set_next_element_id(self.get_next_element_id())
+        self._release_saved_versions(saved)
+
+    def _release_saved_versions(self, saved):
+        # Swaps the saved history versions for loaders of what was written, so that their models can be freed and
+        # the next save skips them. saved maps a version to its loader and the file it reads. The latest version is
+        # edited in place and stays.
+        if not hasattr(self._versions, "add_loader"):
+            return
+        latest_version = self.get_latest_version_number()
+        for version, (loader, source) in saved.items():
+            if version != latest_version:
+                self._versions.add_loader(version, loader, source)
+        if self._versions.is_loaded(latest_version):
+            # Saving materialized every older version in memory, so none reads through the latest model any more.
+            self._versions[latest_version].detach_predecessor(materialize=False)
+
+    @staticmethod
+    def load_from_sqlite(path=None):
+        if not path:
+            path = os.path.join(get_project_root(), "files", "model.sqlite")
+
+        new_object = DataManipulation()
+        new_object._store = SQLiteVersionStore(path)
+        for version in new_object._store.versions():
+            new_object._versions.add_loader(version, partial(new_object._store.model, version), path)
+        if len(new_object._versions) > 0:
+            new_object._latest_version_number = max(new_object._versions.keys())
+        new_object._set_next_element_id(new_object._store.get_next_element_id())
+        return new_object
+
     @staticmethod
     def load_from_json(path=None):
         if not path:
             path = os.path.join(get_project_root(), "files", "model.json")
 
         try:
-            with open(path, "r") as file:
-                content = file.read()
-                loaded_content = json.loads(content)
+            with open(path, "rb") as file:
+                loaded_content = json_codec.load(file)
                 return DataManipulation.from_json(loaded_content)
         except OSError:
             print("Unable to load model.")
@@ -145,13 +412,19 @@ class DataManipulation(object):
             path = os.path.join(get_project_root(), "files", "model.json")
 
         try:
-            with open(path, "w") as file:
-                content = self.to_dict()
-                json.dump(content, file, default=lambda o: o.to_dict(), indent=4)
+            with open(path, "wb") as file:
+                json_codec.dump(self.to_dict(), file)
         except OSError:
             print("Unable to load model.")
 
-    def load_from_xmi(self, metamodel, path=None):
+    def load_from_xmi(self, metamodel, path=None, processes=None, metamodel_factory=None):
+        """Registers every versions/model_version_N.xmi file under path; see LazyVersions.
+
+        By default a file is parsed the first time its version is read. With processes, all files are parsed up
+        front in that many worker processes, which build their own metamodel with metamodel_factory (a module level
+        function such as recreate_dummy_structures.make, since the metamodel itself cannot be pickled). Files that
+        fail to parse, or whose content hash differs from the manifest written by save_to_xmi, are reported in a
+        VersionLoadError: when parsed up front, together after the other versions are registered."""
 
         if not path:
             path = os.path.join(get_project_root(), "files")
@@ -160,32 +433,53 @@ class DataManipulation(object):
         if not os.path.exists(versions_folder_path):
             raise FileNotFoundError("File %s was not found. Loading skipped.".format(versions_folder_path))
 
-        new_versions = {}
-
-        for file_name in os.listdir(versions_folder_path):
+        # Sorted, so that when two files name the same version the same one wins on every platform.
+        version_files = {}
+        for file_name in sorted(os.listdir(versions_folder_path)):
             file_path = os.path.join(versions_folder_path, file_name)
-            if os.path.isfile(file_path):
-                import re
+            # Skips the manifest and the temporary files of an interrupted save.
+            if os.path.isfile(file_path) and file_name.endswith(".xmi") and not file_name.startswith("."):
                 version = int(re.findall(r'\d+', file_name)[0])
-
-                rset = ResourceSet()
-                rset.metamodel_registry[metamodel.nsURI] = metamodel
-                resource = rset.get_resource(URI(file_path))
-                model = resource.contents[0]
-
-                if version not in new_versions:
-                    new_versions[version] = model
-                model.version = version
+                version_files.setdefault(version, file_path)
+
+        manifest = read_manifest(versions_folder_path)
+        new_versions = LazyVersions()
+        errors = {}
+
+        for version in manifest.keys() - version_files.keys():
+            errors[os.path.join(versions_folder_path, "model_version_{}.xmi".format(version))] = "file is missing"
+
+        if processes is not None:
+            if metamodel_factory is None:
+                raise ValueError("Loading versions in worker processes needs a metamodel_factory.")
+
+            expected_hashes = [manifest.get(version) for version in version_files]
+            with ProcessPoolExecutor(processes, initializer=_init_xmi_worker, initargs=(metamodel_factory,)) as pool:
+                results = pool.map(_parse_xmi_version, version_files.values(), expected_hashes)
+                for (version, file_path), (data, error) in zip(version_files.items(), results):
+                    if error is not None:
+                        errors[file_path] = error
+                    else:
+                        new_versions.add_loader(version, partial(_load_packed_version, data, version), file_path)
+        else:
+            for version, file_path in version_files.items():
+                new_versions.add_loader(version, partial(_load_xmi_version, metamodel, file_path,
+                                                         manifest.get(version)), file_path)
 
         self._versions = new_versions
 
         if len(self._versions) > 0:
             self._latest_version_number = max(self._versions.keys())
+        self._id_allocator = ElementIdAllocator(read_next_element_id(versions_folder_path),
+                                                self._find_next_element_id)
+
+        if errors:
+            raise VersionLoadError(errors)
 
     def save_to_xmi(self, metamodel, path=None):
-        from pyecore.resources.xmi import XMIOptions
-        from pyecore.resources import ResourceSet, URI
-        import os
+        """Writes the versions that differ from the manifest in the versions folder under path, each replacing its
+        file atomically, and then the manifest. Versions loaded lazily from that same folder and never read are left
+        alone without being loaded, and every saved version but the latest is swapped for a loader of its file."""
 
         if not path:
             path = os.path.join(get_project_root(), "files")
@@ -194,11 +488,24 @@ class DataManipulation(object):
         if not os.path.exists(versions_folder_path):
             os.makedirs(versions_folder_path)
 
-        for version, model in self._versions.items():
+        manifest = read_manifest(versions_folder_path)
+        hashes = {}
+        saved_versions = {}
+        for version in list(self._versions.keys()):
             model_path = os.path.join(versions_folder_path, "model_version_{}.xmi".format(version))
+            saved = version in manifest and os.path.exists(model_path)
+
+            if saved and hasattr(self._versions, "is_loaded") and not self._versions.is_loaded(version) \
+                    and self._versions.source(version) == model_path:
+                hashes[version] = manifest[version]
+                continue
 
-            with open(model_path, "w") as file:
-                file.write("")
+            model = self._versions[version]
+            model.materialize()
+            hashes[version] = model_hash(model)
+            saved_versions[version] = (partial(_load_xmi_version, metamodel, model_path, hashes[version]), model_path)
+            if saved and manifest[version] == hashes[version]:
+                continue
 
             rset = ResourceSet()
             resource = rset.create_resource(URI(model_path))
@@ -210,10 +517,15 @@ class DataManipulation(object):
             options = {
                 XMIOptions.OPTION_USE_XMI_TYPE: True
             }
-            resource.save(options=options)
+            output = _BufferURI(model_path)
+            resource.save(output=output, options=options)
+            atomic_write(model_path, output.buffer.getvalue())
+
+        write_manifest(versions_folder_path, hashes, self.get_next_element_id())
+        self._release_saved_versions(saved_versions)
 
     def to_json(self):
-        return json.dumps(self, cls=DataManipulationJSONEncoder)
+        return json_codec.dumps(self.to_dict()).decode()
 
     @classmethod
     def from_json(cls, data):
@@ -228,11 +540,11 @@ class DataManipulation(object):
 
         new_object = cls(path)
 
-        new_object._versions = {}
         for version_id, model_json in data['versions'].items():
-            new_object._versions[int(version_id)] = Model.from_json(model_json)
+            new_object._versions.add_loader(int(version_id), partial(Model.from_json, model_json))
 
         new_object._latest_version_number = data["_latest_version_number"]
+        new_object._set_next_element_id(data.get("next_element_id"))
         return new_object
 
     def to_dict(self):
@@ -268,7 +580,8 @@ class DataManipulationJSONEncoder(json.JSONEncoder):
         if isinstance(object_, DataManipulation):
 
             object_dict = {key: value for (key, value) in object_.__dict__.items() if
-                           key not in ['_versions']}
+                           key not in ['_versions', '_store', '_id_allocator']}
+            object_dict["next_element_id"] = object_.get_next_element_id()
 
             object_dict["versions"] = {}
 
@@ -7,6 +7,7 @@ from transformation.generators.generator_register import GeneratorRegister
 from transformation.conflict_resolution.question_registry import QuestionRegistry
 from transformation.tasks.task_heap import Heap
 from utilities.utilities import get_project_root
+from utilities import json_codec
 from diff.diff_store import DiffStore
 
 
@@ -64,26 +65,23 @@ class GeneratorHandler(object):
     def get_generator(self, generator_id):
         return self._generators[generator_id]
 
-    def to_json(self):
-        table = self.element_generator_table.to_dict()
-        generators = self._generators.to_dict()
-        question_registry = self._question_registry.to_dict()
-
-        return json.dumps({
+    def to_dict(self):
+        return {
             '_data_loading_path': self._data_loading_path,
-            'element_generator_table': table,
-            '_generators': generators,
-            "_question_registry": question_registry
-        }, indent=4)
+            'element_generator_table': self.element_generator_table.to_dict(),
+            '_generators': self._generators.to_dict(),
+            "_question_registry": self._question_registry.to_dict()
+        }
 
-    def save_to_json(self, path=None):
-        content = self.to_json()
+    def to_json(self):
+        return json_codec.dumps(self.to_dict()).decode()
 
+    def save_to_json(self, path=None):
         if path is None:
             path = os.path.join(self._data_loading_path, "handler.json")
 
-        with open(path, "w") as file:
-            file.write(content)
+        with open(path, "wb") as file:
+            json_codec.dump(self.to_dict(), file)
 
     def save_to_dill(self, path=None):
 
@@ -98,8 +96,8 @@ class GeneratorHandler(object):
             path = os.path.join(self._data_loading_path, "handler.json")
 
         try:
-            with open(path, "r") as file:
-                json_content = json.load(file)
+            with open(path, "rb") as file:
+                json_content = json_codec.load(file)
                 return self.from_json(json_content)
         except OSError:
             print("Unable to load generator handler.")
@@ -172,7 +170,13 @@ class GeneratorHandler(object):
                 data_manipulation.update_model_after_generation()
         else:
             for generator in generator_list:
-                generator.reload()
+                generator.restore()
+
+    @classmethod
+    def start_preview(cls, generator_list, write_to_files):
+        if not write_to_files:
+            for generator in generator_list:
+                generator.snapshot()
 
     def generate_diffs(self, diffs, task, last_generated_version, latest_model_version, outfolder):
         for property_diffs in diffs.values():
@@ -188,6 +192,7 @@ class GeneratorHandler(object):
 
         generator_list = self.get_active_generators()
         sorted_tasks = self.build_task_heap(generator_list)
+        self.start_preview(generator_list, write_to_files)
 
         model = data_manipulation.get_latest_model()
         latest_model_version = data_manipulation.get_latest_version_number()
@@ -223,6 +228,7 @@ class GeneratorHandler(object):
         generator = self._generators[generator_id]
 
         sorted_tasks = self.build_task_heap([generator])
+        self.start_preview([generator], write_to_files)
         latest_model_version = data_manipulation.get_latest_version_number()
 
         generator_element_table_update_pairs = []
@@ -261,6 +267,7 @@ class GeneratorHandler(object):
             generator_list.append(generator)
 
         sorted_tasks = self.build_task_heap(generator_list)
+        self.start_preview(generator_list, write_to_files)
 
         generator_element_table_update_pairs = []
         model = data_manipulation.get_latest_model()
@@ -1,7 +1,9 @@
+from concurrent.futures import ThreadPoolExecutor
 from multigen.generator import TemplateGenerator
+import hashlib
 import os
 import json
-from utilities.utilities import get_project_root, get_class_from_parent_module
+from utilities.utilities import get_project_root, get_class_from_parent_module, atomic_write
 from transformation.generators.encoders.generator_json_encoder import BaseGeneratorJSONEncoder
 
 
@@ -15,6 +17,9 @@ class BaseDiffGenerator(TemplateGenerator):
         self.parsers = {}
         self._parser_type = parser_type
         self._tracer = None
+        # file path -> (content hash, mtime_ns, size) of the last output written there
+        self._written_hashes = {}
+        self._snapshot_active = False
 
         super().__init__()
 
@@ -24,6 +29,9 @@ class BaseDiffGenerator(TemplateGenerator):
         'templates'
     )
 
+    # Threads used to write documents on flush, None writes them one by one.
+    flush_workers = None
+
     def initialize(self):
         raise NotImplementedError("Generators must implement initialize method.")
 
@@ -76,27 +84,90 @@ class BaseDiffGenerator(TemplateGenerator):
         self._tracer = new_ref
 
     def get_parser(self, file_path):
-        parser_path = file_path
         if file_path not in self.parsers:
-            if not os.path.isfile(file_path):
-                parser_path = None
-            parser = self._parser_type(parser_path)
+            parser = self._load_parser(file_path)
+            if self._snapshot_active:
+                parser.begin_snapshot()
 
             self.parsers[file_path] = parser
 
         return self.parsers[file_path]
 
+    def _load_parser(self, file_path):
+        parser_path = file_path
+        if not os.path.isfile(file_path):
+            parser_path = None
+        return self._parser_type(parser_path)
+
     def generate(self, model, outfolder):
         super().generate(model, outfolder)
 
     def flush(self):
-        for file_path, parser in self.parsers.items():
+        """Writes every document modified since it was loaded, skipping output identical to what
+        the file already holds."""
+        modified = [(file_path, parser) for file_path, parser in self.parsers.items() if parser.is_modified()]
+
+        if self.flush_workers and len(modified) > 1:
+            with ThreadPoolExecutor(max_workers=self.flush_workers) as executor:
+                written = list(executor.map(lambda item: self._flush_document(*item), modified))
+        else:
+            written = [self._flush_document(file_path, parser) for file_path, parser in modified]
+
+        for file_path, written_hash in written:
+            if written_hash is not None:
+                self._written_hashes[file_path] = written_hash
+            else:
+                self._written_hashes.pop(file_path, None)
+
+    def _flush_document(self, file_path, parser):
+        text = parser.serialize()
+        if text is None:
+            # Nothing to compare with the file, so the parser writes it as it always has.
             parser.write_to_file(file_path)
+            parser.mark_saved()
+            return file_path, None
+
+        content = text.encode('utf-8')
+        content_hash = hashlib.sha1(content).hexdigest()
+
+        if self._get_file_hash(file_path) != content_hash:
+            atomic_write(file_path, content)
+        parser.mark_saved()
+
+        stat = os.stat(file_path)
+        return file_path, (content_hash, stat.st_mtime_ns, stat.st_size)
+
+    def _get_file_hash(self, file_path):
+        if not os.path.isfile(file_path):
+            return None
+
+        stat = os.stat(file_path)
+        written_hash = self._written_hashes.get(file_path)
+        if written_hash is not None and written_hash[1:] == (stat.st_mtime_ns, stat.st_size):
+            return written_hash[0]
+
+        with open(file_path, 'rb') as file:
+            return hashlib.sha1(file.read()).hexdigest()
 
     def reload(self):
         for file_path, parser in self.parsers.items():
             self.parsers[file_path] = self.parser_type(file_path)
 
+    def snapshot(self):
+        """Starts a preview run. Documents are copied on their first mutation only, so restore
+        does not have to parse the documents the run left untouched."""
+        self._snapshot_active = True
+        for parser in self.parsers.values():
+            parser.begin_snapshot()
+
+    def restore(self):
+        """Undoes the changes made to the documents since snapshot. Documents without a snapshot
+        are loaded again."""
+        self._snapshot_active = False
+        for file_path, parser in self.parsers.items():
+            if not parser.restore_snapshot():
+                self.parsers[file_path] = self._load_parser(file_path)
+
     def to_json(self):
         return json.dumps(self.to_dict(), indent=4)
 
@@ -9,7 +9,8 @@ class BaseGeneratorJSONEncoder(JSONEncoder):
         if isinstance(object_, TemplateGenerator):
 
             object_dict = {key: value for (key, value) in object_.__dict__.items() if
-                           key not in ['tasks', '__len__', '_tracer', 'parsers', "_parser_type"]}
+                           key not in ['tasks', '__len__', '_tracer', 'parsers', "_parser_type",
+                                        "_written_hashes", "_snapshot_active"]}
 
             object_dict['class'] = type(object_).__name__
 
@@ -21,8 +21,7 @@ class BaseDiffTask(ValidationTask, PriorityMixin):
 
     def filtered_elements(self, model):
         """Return iterator over elements in model that are passed to the above template."""
-        for element in model:
-            yield element
+        yield from model.iter_depth_first()
 
     def relative_path_for_element(self, document):
         """Return relative file path receiving the generator output for given element."""
@@ -21,9 +21,7 @@ class DiffDemoManualTracingTask(BaseManualTracingTask):
 
     def filtered_elements(self, model):
         """Return iterator over elements in model that are passed to the above template."""
-        documents = (document for document in model.elements if type(document) == Document)
-        for document in documents:
-            yield document
+        yield from model.iter_depth_first(types=Document)
 
     def insert_additional_templates(self):
         self._additional_templates["field"] = "field_template.tpl"
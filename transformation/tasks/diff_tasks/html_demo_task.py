@@ -35,9 +35,7 @@ class DiffDemoTask(BaseDiffTask):
 
     def filtered_elements(self, model):
         """Return iterator over elements in model that are passed to the above template."""
-        documents = (document for document in model.elements.values() if type(document) == Document)
-        for document in documents:
-            yield document
+        yield from model.iter_depth_first(types=Document)
 
     def should_generate(self, model, element):
         for filtered_element in self.filtered_elements(model):
@@ -0,0 +1,52 @@
+"""Compact JSON encoding and decoding for the save files. orjson is used when it is installed and the json
+module otherwise; both write the same document, without indentation. Objects the backend cannot encode are
+converted with their to_dict method, as the rest of the code base does with json.dumps(default=...)."""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _to_dict(object_):
+    return object_.to_dict()
+
+
+def dumps(value):
+    """Returns value encoded as compact JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(value, default=_to_dict, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=_to_dict, separators=(',', ':')).encode()
+
+
+def _key(key):
+    # The conversion json.dumps applies to non-string keys.
+    return key if isinstance(key, str) else json.dumps(key)
+
+
+def dump(value, file, depth=2):
+    """Writes value to a file opened in binary mode. Dictionaries in the first depth levels are written item by
+    item, so a large document is never held as a single string."""
+    if depth > 0 and isinstance(value, dict):
+        file.write(b'{')
+        for index, (key, item) in enumerate(value.items()):
+            if index:
+                file.write(b',')
+            file.write(dumps(_key(key)))
+            file.write(b':')
+            dump(item, file, depth - 1)
+        file.write(b'}')
+    else:
+        file.write(dumps(value))
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def load(file):
+    """Reads a JSON document from a file opened in either mode, indented or not."""
+    return loads(file.read())
@@ -3,6 +3,7 @@ import importlib
 import pkgutil
 from pathlib import Path
 import os
+import tempfile
 
 
 def iterable(obj):
@@ -26,16 +27,30 @@ def import_submodules(package, recursive=True):
     return results
 
 
+# (package, recursive) -> {name: object} over every submodule, first module wins as in the original walk.
+_class_registries = {}
+
+
+def _build_class_registry(package, recursive=True):
+    registry = {}
+    for module in import_submodules(package, recursive).values():
+        for name, value in vars(module).items():
+            registry.setdefault(name, value)
+    _class_registries[(package, recursive)] = registry
+    return registry
+
+
 def get_class_from_parent_module(class_name, package, recursive=True):
-    modules = import_submodules(package, recursive)
-    for module in modules.values():
-        try:
-            type = getattr(module, class_name)
-            return type
-        except AttributeError:
-            continue
+    """Looks class_name up in the submodules of package. The package is walked once per process; a miss walks it
+    again in case modules were added since."""
+    registry = _class_registries.get((package, recursive))
+    if registry is None or class_name not in registry:
+        registry = _build_class_registry(package, recursive)
 
-    raise ImportError("Class %s is not part of %s module." % (class_name, package))
+    try:
+        return registry[class_name]
+    except KeyError:
+        raise ImportError("Class %s is not part of %s module." % (class_name, package))
 
 
 def get_project_root():
@@ -72,3 +87,23 @@ def class_name_to_underscore_format(class_name):
 def class_object_to_underscore_format(type_):
     class_name = type_.__name__
     return class_name_to_underscore_format(class_name)
+
+
+def atomic_write(file_path, content):
+    """Writes content (str or bytes) to a temporary file next to file_path and renames it over
+    file_path, so readers never see a partially written file."""
+    directory = os.path.dirname(os.path.abspath(file_path))
+    mode = os.stat(file_path).st_mode & 0o777 if os.path.exists(file_path) else 0o644
+    descriptor, temporary_path = tempfile.mkstemp(prefix="." + os.path.basename(file_path) + ".",
+                                                  suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(descriptor, "wb" if isinstance(content, bytes) else "w") as file:
+            file.write(content)
+            file.flush()
+            os.fsync(file.fileno())
+        os.chmod(temporary_path, mode)
+        os.replace(temporary_path, file_path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
@@ -0,0 +1,129 @@
+import struct
+
+from metamodel.model import Model, ElementState, capture_state, build_element
+from metamodel.compact_store import CompactElementStore, pack_states, unpack_states
+from utilities import json_codec
+from utilities.utilities import get_class_from_parent_module
+
+DEFAULT_CHECKPOINT_INTERVAL = 10
+
+# entry_to_bytes header: flags (_CHECKPOINT, _HAS_ROOT) and the root id, followed by the CompactElementStore rows of
+# a checkpoint or the pack_states rows of a delta.
+_ENTRY_HEADER = struct.Struct('<Bq')
+_CHECKPOINT = 1
+_HAS_ROOT = 2
+
+# A state with type None marks an element the version no longer has, as in Model's preimages.
+_REMOVED = ElementState(None, None, None)
+
+
+class DeltaVersionStore(object):
+    """Model versions kept as ElementStates: every checkpoint_interval-th version stored in full, the versions in
+    between as the states that differ from the version before. A version is rebuilt from the closest checkpoint
+    at or before it. Versions have to be added in increasing order."""
+
+    def __init__(self, checkpoint_interval=DEFAULT_CHECKPOINT_INTERVAL):
+        self.checkpoint_interval = checkpoint_interval
+        # version -> (root id, whether it is a checkpoint, element id -> ElementState)
+        self._entries = {}
+        self._versions = []
+        self._last_states = None
+
+    def add(self, version, model):
+        if self._versions and version <= self._versions[-1]:
+            raise ValueError("Version %d is not newer than version %d." % (version, self._versions[-1]))
+
+        if self._versions and self._last_states is None:
+            self._last_states = self.states(self._versions[-1])[1]
+
+        states = {element.id: capture_state(element) for element in model}
+        root_id = model.root.id if model.root is not None else None
+
+        if len(self._versions) % self.checkpoint_interval == 0:
+            self._entries[version] = (root_id, True, states)
+        else:
+            delta = {element_id: state for element_id, state in states.items()
+                     if self._last_states.get(element_id) != state}
+            for element_id in self._last_states.keys() - states.keys():
+                delta[element_id] = _REMOVED
+            self._entries[version] = (root_id, False, delta)
+
+        self._versions.append(version)
+        self._last_states = states
+
+    def forget_last_states(self):
+        """Drops the states of the newest version that add keeps to diff the next one against, a full copy of that
+        version. add works them out again through states() if another version comes."""
+        self._last_states = None
+
+    def states(self, version):
+        """Returns the root id and the element id -> ElementState map of version."""
+        position = self._versions.index(version)
+        checkpoint = position
+        while not self._entries[self._versions[checkpoint]][1]:
+            checkpoint -= 1
+
+        states = dict(self._entries[self._versions[checkpoint]][2])
+        for delta_version in self._versions[checkpoint + 1:position + 1]:
+            for element_id, state in self._entries[delta_version][2].items():
+                if state.type is None:
+                    states.pop(element_id, None)
+                else:
+                    states[element_id] = state
+        return self._entries[version][0], states
+
+    def model(self, version):
+        """Builds a new Model for version."""
+        root_id, states = self.states(version)
+        root = build_element(states.get, root_id) if root_id is not None else None
+        model = Model(root, version)
+        model.adopt_elements()
+        return model
+
+    def entry_to_bytes(self, version):
+        root_id, checkpoint, states = self._entries[version]
+        flags = (_CHECKPOINT if checkpoint else 0) | (_HAS_ROOT if root_id is not None else 0)
+        header = _ENTRY_HEADER.pack(flags, root_id if root_id is not None else 0)
+        if checkpoint:
+            return header + CompactElementStore.from_states(states.get, root_id, version).to_bytes()
+        return header + pack_states(states)
+
+    def add_entry_from_bytes(self, version, data):
+        """Adds an entry written by entry_to_bytes. Entries have to be added in the order they were written."""
+        if data[:1] == b'{':
+            root_id, checkpoint, states = self._entry_from_json(data)
+        else:
+            flags, root_id = _ENTRY_HEADER.unpack_from(data)
+            root_id = root_id if flags & _HAS_ROOT else None
+            checkpoint = bool(flags & _CHECKPOINT)
+            payload = memoryview(data)[_ENTRY_HEADER.size:]
+            if checkpoint:
+                states = CompactElementStore.from_bytes(payload, version).to_states()
+            else:
+                states = unpack_states(payload)
+        self._entries[version] = (root_id, checkpoint, states)
+        self._versions.append(version)
+        self._last_states = None
+
+    @staticmethod
+    def _entry_from_json(data):
+        # Entries of delta snapshots written before entries were packed.
+        entry = json_codec.loads(data)
+        states = {}
+        for element_id, state in entry["states"].items():
+            if state is None:
+                states[int(element_id)] = _REMOVED
+            else:
+                class_name, values, children = state
+                states[int(element_id)] = ElementState(get_class_from_parent_module(class_name, "metamodel"), values,
+                                                       tuple(children) if children is not None else None)
+        return entry["root"], entry["checkpoint"], states
+
+    def __contains__(self, version):
+        return version in self._entries
+
+    def __iter__(self):
+        return iter(self._versions)
+
+    def __len__(self):
+        return len(self._versions)
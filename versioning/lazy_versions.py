@@ -0,0 +1,74 @@
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+DEFAULT_CACHE_SIZE = 8
+
+
+class LazyVersions(MutableMapping):
+    """Version number -> Model mapping for DataManipulation._versions that loads a version on first access.
+
+    Loaded versions are kept in a least recently used cache of cache_size models. Models stored with
+    versions[number] = model, and the latest version, are never evicted: they are edited in place and may hold
+    changes that no file has. Membership, iteration and len answer from the index without loading anything."""
+
+    def __init__(self, cache_size=DEFAULT_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._loaders = {}
+        self._sources = {}
+        self._pinned = {}
+        self._cache = OrderedDict()
+
+    def add_loader(self, version, loader, source=None):
+        """Registers loader, a callable returning the Model of version, in place of any model held for it. source
+        names the file the loader reads, if any."""
+        self._pinned.pop(version, None)
+        self._cache.pop(version, None)
+        self._loaders[version] = loader
+        self._sources[version] = source
+
+    def source(self, version):
+        """The file an unmodified version was loaded from, None once a model was stored for it."""
+        return self._sources.get(version)
+
+    def is_loaded(self, version):
+        return version in self._pinned or version in self._cache
+
+    def __getitem__(self, version):
+        if version in self._pinned:
+            return self._pinned[version]
+        if version in self._cache:
+            self._cache.move_to_end(version)
+            return self._cache[version]
+
+        model = self._loaders[version]()
+        model.version = version
+        if version == max(self._pinned.keys() | self._loaders.keys()):
+            self._pinned[version] = model
+        else:
+            self._cache[version] = model
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return model
+
+    def __setitem__(self, version, model):
+        self._loaders.pop(version, None)
+        self._sources.pop(version, None)
+        self._cache.pop(version, None)
+        self._pinned[version] = model
+
+    def __delitem__(self, version):
+        if version not in self:
+            raise KeyError(version)
+        self._loaders.pop(version, None)
+        self._sources.pop(version, None)
+        self._cache.pop(version, None)
+        self._pinned.pop(version, None)
+
+    def __contains__(self, version):
+        return version in self._pinned or version in self._loaders
+
+    def __iter__(self):
+        return iter(sorted(self._pinned.keys() | self._loaders.keys()))
+
+    def __len__(self):
+        return len(self._pinned.keys() | self._loaders.keys())
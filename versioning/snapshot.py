@@ -0,0 +1,84 @@
+"""Binary snapshot files for DataManipulation, ElementGeneratorTable and Tracer.
+
+Layout, little-endian:
+
+    header   magic, format version, section count, metadata length
+    metadata compact JSON with the snapshot kind and the object's small fields
+    index    one (key, offset, length) entry per section
+    sections the encoded payloads, e.g. one model version each
+
+The index lets a reader seek to one section, such as a single model version, without decoding the rest."""
+import json
+import struct
+
+from utilities.utilities import atomic_write
+
+MAGIC = b'SMDDSNAP'
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct('<8sHxxIQ')
+_INDEX_ENTRY = struct.Struct('<qQQ')
+
+
+class SnapshotFormatError(Exception):
+    pass
+
+
+def write_snapshot(path, kind, metadata, sections):
+    """Atomically writes a snapshot. sections maps integer keys to bytes."""
+    metadata = json.dumps(dict(metadata, kind=kind), separators=(',', ':')).encode()
+    offset = _HEADER.size + len(metadata) + _INDEX_ENTRY.size * len(sections)
+
+    index = []
+    for key, payload in sections.items():
+        index.append(_INDEX_ENTRY.pack(key, offset, len(payload)))
+        offset += len(payload)
+
+    atomic_write(path, b''.join([_HEADER.pack(MAGIC, FORMAT_VERSION, len(sections), len(metadata)), metadata]
+                               + index + list(sections.values())))
+
+
+class SnapshotReader(object):
+    """Reads the header and index of a snapshot on open; sections are read on request."""
+
+    def __init__(self, path, kind=None):
+        self._file = open(path, "rb")
+        try:
+            magic, format_version, section_count, metadata_length = _HEADER.unpack(self._file.read(_HEADER.size))
+            if magic != MAGIC:
+                raise SnapshotFormatError("%s is not a snapshot file." % path)
+            if format_version > FORMAT_VERSION:
+                raise SnapshotFormatError("Snapshot format %d is newer than this version supports." % format_version)
+
+            self.metadata = json.loads(self._file.read(metadata_length))
+            if kind is not None and self.metadata.get("kind") != kind:
+                raise SnapshotFormatError("%s holds a %s snapshot, not %s." % (path, self.metadata.get("kind"), kind))
+
+            index = self._file.read(_INDEX_ENTRY.size * section_count)
+            self._sections = {key: (offset, length) for key, offset, length in _INDEX_ENTRY.iter_unpack(index)}
+        except (struct.error, ValueError) as error:
+            self._file.close()
+            raise SnapshotFormatError("%s is not a valid snapshot file: %s" % (path, error))
+        except Exception:
+            self._file.close()
+            raise
+
+    def keys(self):
+        return self._sections.keys()
+
+    def __contains__(self, key):
+        return key in self._sections
+
+    def read(self, key):
+        offset, length = self._sections[key]
+        self._file.seek(offset)
+        return self._file.read(length)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,167 @@
+"""Model versions in a local SQLite file, one row per element keyed by (version, id). Rows also hold the parent id,
+indexed so a subtree is one recursive query, the depth-first position and the element's content hash. The database
+runs in WAL mode, so readers in other connections are not blocked while a version is written."""
+import sqlite3
+import threading
+
+from metamodel.model import Model
+from metamodel.element import Element
+from metamodel.container import Container
+from utilities.utilities import get_class_from_parent_module
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS versions (
+    version INTEGER PRIMARY KEY,
+    root_id INTEGER
+);
+CREATE TABLE IF NOT EXISTS elements (
+    version INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    parent_id INTEGER,
+    position INTEGER NOT NULL,
+    class TEXT NOT NULL,
+    deleted INTEGER NOT NULL,
+    name TEXT,
+    label TEXT,
+    type TEXT,
+    content_hash BLOB NOT NULL,
+    PRIMARY KEY (version, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS elements_by_parent ON elements (version, parent_id);
+CREATE TABLE IF NOT EXISTS settings (
+    name TEXT PRIMARY KEY,
+    value
+);
+"""
+
+_COLUMNS = "id, parent_id, class, deleted, name, label, type"
+_ATTRIBUTES = (('_deleted', 'deleted'), ('_name', 'name'), ('_label', 'label'), ('_type', 'type'))
+
+
+class SQLiteVersionStore(object):
+
+    def __init__(self, path):
+        self.path = path
+        self._connect()
+
+    def _connect(self):
+        # One connection shared by the app's request threads; the lock keeps their statements apart.
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(_SCHEMA)
+
+    def __getstate__(self):
+        # Pickled, e.g. with a DataManipulation saved to dill, as its path only; the file is opened again on load.
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.path = state['path']
+        self._connect()
+
+    def close(self):
+        self._connection.close()
+
+    def _query(self, sql, parameters=()):
+        with self._lock:
+            return self._connection.execute(sql, parameters).fetchall()
+
+    def write_version(self, version, model):
+        """Stores model as version, replacing whatever the store held for it, in one transaction."""
+        rows = []
+        for position, element in enumerate(model):
+            parent = element.eContainer()
+            rows.append((version, element.id, parent.id if isinstance(parent, Element) else None, position,
+                         type(element).__name__, bool(element.deleted), getattr(element, '_name', None),
+                         getattr(element, '_label', None), getattr(element, '_type', None), element.content_hash))
+
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM elements WHERE version = ?", (version,))
+            self._connection.execute("INSERT OR REPLACE INTO versions VALUES (?, ?)",
+                                     (version, model.root.id if model.root is not None else None))
+            self._connection.executemany("INSERT OR REPLACE INTO elements VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def delete_version(self, version):
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM elements WHERE version = ?", (version,))
+            self._connection.execute("DELETE FROM versions WHERE version = ?", (version,))
+
+    def get_next_element_id(self):
+        rows = self._query("SELECT value FROM settings WHERE name = 'next_element_id'")
+        return rows[0][0] if rows else None
+
+    def set_next_element_id(self, next_element_id):
+        with self._lock, self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO settings VALUES ('next_element_id', ?)",
+                                     (next_element_id,))
+
+    def versions(self):
+        return [version for version, in self._query("SELECT version FROM versions ORDER BY version")]
+
+    def __contains__(self, version):
+        return bool(self._query("SELECT 1 FROM versions WHERE version = ?", (version,)))
+
+    def root_hash(self, version):
+        rows = self._query("SELECT content_hash FROM elements JOIN versions USING (version) "
+                           "WHERE version = ? AND id = root_id", (version,))
+        return rows[0][0] if rows else None
+
+    def content_hash(self, version, element_id):
+        rows = self._query("SELECT content_hash FROM elements WHERE version = ? AND id = ?", (version, element_id))
+        return rows[0][0] if rows else None
+
+    def model(self, version):
+        """Builds a new Model for version."""
+        rows = self._query("SELECT %s FROM elements WHERE version = ? ORDER BY position" % _COLUMNS, (version,))
+        model = Model(self._build(rows), version)
+        model.adopt_elements()
+        return model
+
+    def element(self, version, element_id):
+        """Builds the element and its subtree as stored for version, without a parent or model; None if version
+        has no such element."""
+        rows = self._query(
+            "WITH RECURSIVE subtree (id) AS ("
+            "    SELECT id FROM elements WHERE version = ?1 AND id = ?2"
+            "    UNION ALL"
+            "    SELECT elements.id FROM elements JOIN subtree ON elements.parent_id = subtree.id"
+            "    WHERE elements.version = ?1"
+            ") SELECT %s FROM elements JOIN subtree USING (id) WHERE version = ?1 ORDER BY position" % _COLUMNS,
+            (version, element_id))
+        return self._build(rows)
+
+    def changed_elements(self, old_version, new_version):
+        """Ids of the elements that were added, removed, moved or had an attribute changed between the two versions.
+        Changes below an element do not count for it; compare content_hash for that."""
+        rows = self._query(
+            "SELECT new.id FROM elements AS new LEFT JOIN elements AS old ON old.version = ?1 AND old.id = new.id"
+            " WHERE new.version = ?2 AND (old.id IS NULL OR old.parent_id IS NOT new.parent_id"
+            "     OR old.class IS NOT new.class OR old.deleted IS NOT new.deleted OR old.name IS NOT new.name"
+            "     OR old.label IS NOT new.label OR old.type IS NOT new.type)"
+            " UNION"
+            " SELECT old.id FROM elements AS old WHERE old.version = ?1"
+            "     AND NOT EXISTS (SELECT 1 FROM elements AS new WHERE new.version = ?2 AND new.id = old.id)",
+            (old_version, new_version))
+        return sorted(element_id for element_id, in rows)
+
+    @staticmethod
+    def _build(rows):
+        # Rows come in depth-first order, so a parent is always built before its children.
+        elements = {}
+        root = None
+        for element_id, parent_id, class_name, deleted, name, label, type_ in rows:
+            element = get_class_from_parent_module(class_name, "metamodel")()
+            element.id = element_id
+            values = {'deleted': bool(deleted), 'name': name, 'label': label, 'type': type_}
+            for attribute, column in _ATTRIBUTES:
+                if attribute in element.attributes_for_dict:
+                    setattr(element, attribute, values[column])
+
+            parent = elements.get(parent_id)
+            if isinstance(parent, Container):
+                parent.add(element)
+            elif root is None:
+                root = element
+            elements[element_id] = element
+        return root
@@ -0,0 +1,106 @@
+"""Drops model versions nothing needs any more: those older than the retention window that no element of the
+ElementGeneratorTable was last generated from. Their version files are deleted, or moved to an archive folder
+that load_from_xmi can read."""
+import os
+import sys
+from collections import namedtuple
+
+from versioning.version_manifest import read_manifest, write_manifest
+
+DEFAULT_RETENTION = 5
+
+VersionCollection = namedtuple('VersionCollection', ['kept', 'removed', 'reclaimed_memory', 'reclaimed_disk'])
+
+
+def select_versions(versions, referenced_versions, retention=DEFAULT_RETENTION):
+    """The versions to keep: the newest retention ones, always including the latest, and the referenced ones."""
+    versions = sorted(versions)
+    kept = set(versions[-max(retention, 1):])
+    kept.update(version for version in referenced_versions if version in versions)
+    return kept
+
+
+def estimate_model_size(model):
+    """Approximate bytes held by the elements of a loaded model: each element with its attribute dictionary and
+    values. Frozen versions share their elements with a later version and only count their preimages."""
+    if model.frozen:
+        size = sys.getsizeof(model._preimages)
+        for state in model._preimages.values():
+            size += sys.getsizeof(state) + sys.getsizeof(state.values) + sys.getsizeof(state.children)
+            if state.values is not None:
+                size += sum(sys.getsizeof(value) for value in state.values.values())
+        return size
+    if model.root is None:
+        return 0
+
+    size = 0
+    for element in model:
+        attributes = vars(element)
+        size += sys.getsizeof(element) + sys.getsizeof(attributes)
+        size += sum(sys.getsizeof(value) for value in attributes.values())
+    return size
+
+
+def collect_versions(data_manipulation, element_generator_table, retention=DEFAULT_RETENTION, path=None,
+                     archive_path=None):
+    """Removes the versions select_versions does not keep from data_manipulation and from the versions folder under
+    path, if given. With archive_path, their files are moved to archive_path/versions instead of deleted. Versions
+    that were not loaded reclaim no memory, and kept versions older than a removed one are materialized."""
+    versions = data_manipulation.versions
+    kept = select_versions(versions.keys(), element_generator_table.get_referenced_versions(), retention)
+    removed = sorted(set(versions.keys()) - kept)
+
+    def is_loaded(version):
+        return not hasattr(versions, "is_loaded") or versions.is_loaded(version)
+
+    # A frozen version reads through the preimages of the later ones, so a kept version older than a removed one
+    # gets its own tree first.
+    if removed:
+        for version in kept:
+            if version < removed[-1] and is_loaded(version):
+                versions[version].materialize()
+
+    reclaimed_memory = 0
+    removed_models = []
+    for version in removed:
+        if is_loaded(version):
+            removed_models.append(versions[version])
+            reclaimed_memory += estimate_model_size(versions[version])
+        del versions[version]
+
+    # Otherwise the latest model keeps the removed versions alive and goes on recording preimages into them.
+    if kept and is_loaded(max(kept)):
+        latest_model = versions[max(kept)]
+        if any(model is latest_model._predecessor for model in removed_models):
+            latest_model.detach_predecessor(materialize=False)
+
+    reclaimed_disk = 0
+    versions_folder_path = os.path.join(path, "versions") if path else None
+    if versions_folder_path is not None and os.path.exists(versions_folder_path):
+        manifest = read_manifest(versions_folder_path)
+        archived = {}
+        for version in removed:
+            model_path = os.path.join(versions_folder_path, "model_version_{}.xmi".format(version))
+            if not os.path.exists(model_path):
+                continue
+
+            reclaimed_disk += os.path.getsize(model_path)
+            if archive_path is not None:
+                archive_folder_path = os.path.join(archive_path, "versions")
+                os.makedirs(archive_folder_path, exist_ok=True)
+                os.replace(model_path, os.path.join(archive_folder_path, os.path.basename(model_path)))
+                if version in manifest:
+                    archived[version] = manifest[version]
+            else:
+                os.remove(model_path)
+            manifest.pop(version, None)
+
+        if removed:
+            write_manifest(versions_folder_path, manifest)
+        if archived:
+            archive_folder_path = os.path.join(archive_path, "versions")
+            archive_manifest = read_manifest(archive_folder_path)
+            archive_manifest.update(archived)
+            write_manifest(archive_folder_path, archive_manifest)
+
+    return VersionCollection(sorted(kept), removed, reclaimed_memory, reclaimed_disk)
@@ -0,0 +1,44 @@
+"""manifest.json next to the model_version_N.xmi files: the content hash of the model each file holds, written after
+the files, so a file that does not match its entry is known to be stale, and the next element id to hand out."""
+import json
+import os
+
+from utilities.utilities import atomic_write
+
+MANIFEST_NAME = "manifest.json"
+
+
+def model_hash(model):
+    """Hex content hash of a model's root, None for an empty model."""
+    return model.root.content_hash.hex() if model.root is not None else None
+
+
+def _load(versions_folder_path):
+    manifest_path = os.path.join(versions_folder_path, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return {}
+
+    with open(manifest_path) as file:
+        return json.load(file)
+
+
+def read_manifest(versions_folder_path):
+    """Returns version -> content hash, empty when the folder has no manifest."""
+    versions = _load(versions_folder_path).get("versions", {})
+    return {int(version): content_hash for version, content_hash in versions.items()}
+
+
+def read_next_element_id(versions_folder_path):
+    """None when the manifest does not record one."""
+    return _load(versions_folder_path).get("next_element_id")
+
+
+def write_manifest(versions_folder_path, hashes, next_element_id=None):
+    """Without next_element_id, keeps the one the manifest already records."""
+    if next_element_id is None:
+        next_element_id = read_next_element_id(versions_folder_path)
+
+    manifest = {"versions": {str(version): hashes[version] for version in sorted(hashes)}}
+    if next_element_id is not None:
+        manifest["next_element_id"] = next_element_id
+    atomic_write(os.path.join(versions_folder_path, MANIFEST_NAME), json.dumps(manifest, indent=4))